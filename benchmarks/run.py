@@ -0,0 +1,377 @@
+"""
+Benchmarks do pipeline com dados sintéticos no layout do Metrô.
+
+    python -m benchmarks.run --scales 1 10 100
+    python -m benchmarks.run --compare benchmarks/results/A.json benchmarks/results/B.json
+
+Cada escala roda em um processo próprio, sobre uma pasta temporária
+(METRO_DATA_DIR / METRO_FIGURES_DIR): os dados e gráficos do projeto
+não são tocados. O resultado (tempo e pico de memória por etapa) é
+salvo em JSON em benchmarks/results/ para comparar commits.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+#ESCALAS PADRÃO (MÚLTIPLOS DO VOLUME DE HOJE)
+DEFAULT_SCALES = [1, 10, 100]
+
+#RAZÃO DE TEMPO (DEPOIS / ANTES) A PARTIR DA QUAL A COMPARAÇÃO ACUSA REGRESSÃO
+DEFAULT_THRESHOLD = 1.2
+
+#==============================================================================
+# ETAPAS (MESMAS FUNÇÕES DE main.py, SOBRE A BASE HISTÓRICA INTEIRA)
+
+def build_stages(anos) -> list:
+    """
+    Etapas do benchmark como (nome, função). Cada função recebe e
+    atualiza o dict de estado com os insumos das etapas seguintes.
+    """
+    import main
+
+    from src.data_processing import create_paulista_dummy
+    from src.group_index import build_group_index
+    from src.ingestion import ingest_years
+    from src.paths import HISTORICAL_DATASET
+    from src.storage import load_fact_table
+
+    def ingest(estado):
+        #SEM CACHE E EM SÉRIE: MEDE O PARSE DE TODOS OS ANOS NESTE PROCESSO
+        ingest_years(anos, force=True, max_workers=1)
+
+    def load(estado):
+        df = create_paulista_dummy(load_fact_table(HISTORICAL_DATASET))
+        estado["df"] = df
+        estado["grupos"] = build_group_index(df)
+        estado["linhas"] = len(df)
+
+    def describe(estado):
+        estado["resumos"] = main.run_describe(estado["grupos"])
+
+    def infer(estado):
+        main.run_infer(estado["df"], estado["grupos"])
+
+    def correlate(estado):
+        estado["correlacao"] = main.run_correlate(estado["df"], estado["grupos"])
+
+    def monthly(estado):
+        estado["medias_mensais"] = main.run_monthly(estado["df"], estado["grupos"])
+
+    def interannual(estado):
+        estado["media_cluster_ano"] = main.run_interannual()
+
+    def plot(estado):
+        main.run_plot(
+            estado["resumos"],
+            estado["medias_mensais"],
+            estado["correlacao"],
+            estado["media_cluster_ano"],
+            force=True
+        )
+
+    return [
+        ("ingest", ingest),
+        ("load", load),
+        ("describe", describe),
+        ("infer", infer),
+        ("correlate", correlate),
+        ("monthly", monthly),
+        ("interannual", interannual),
+        ("plot", plot)
+    ]
+
+
+def _max_rss_mb() -> float:
+    #ru_maxrss EM KB NO LINUX (BYTES NO macOS)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1e6 if sys.platform == "darwin" else 1e3)
+
+
+def time_stages(anos):
+    """
+    Primeira passada: tempo de parede de cada etapa e pico de RSS do
+    processo ao fim dela (marca d'água, só cresce). Retorna
+    (resultado por etapa, número de registros da base).
+    """
+    estado = {}
+    resultado = {}
+
+    for nome, funcao in build_stages(anos):
+        inicio = time.perf_counter()
+        funcao(estado)
+
+        resultado[nome] = {
+            "segundos": time.perf_counter() - inicio,
+            "rss_max_mb": _max_rss_mb()
+        }
+
+    return resultado, estado.get("linhas")
+
+
+def trace_stages(anos) -> dict:
+    """
+    Segunda passada (tracemalloc): pico de memória alocada durante cada
+    etapa, acima do que já estava alocado no início dela. Feita à parte
+    porque o rastreamento deixa a execução mais lenta.
+    """
+    estado = {}
+    resultado = {}
+
+    tracemalloc.start()
+
+    try:
+        for nome, funcao in build_stages(anos):
+            tracemalloc.reset_peak()
+            atual, _ = tracemalloc.get_traced_memory()
+
+            funcao(estado)
+
+            _, pico = tracemalloc.get_traced_memory()
+            resultado[nome] = (pico - atual) / 1e6
+    finally:
+        tracemalloc.stop()
+
+    return resultado
+#==============================================================================
+
+
+#==============================================================================
+# EXECUÇÃO DE UMA ESCALA (PROCESSO PRÓPRIO)
+
+def run_scale(scale: int, memory: bool = True, seed: int = 0) -> dict:
+    """
+    Gera os dados sintéticos da escala e mede as etapas. Deve rodar em
+    um processo cujo METRO_DATA_DIR aponta para uma pasta temporária.
+    """
+    from benchmarks.synthetic import write_synthetic_dataset
+    from src.paths import RAW_DIR
+
+    inicio = time.perf_counter()
+    dataset = write_synthetic_dataset(RAW_DIR, scale, seed=seed)
+    geracao = time.perf_counter() - inicio
+
+    bytes_brutos = sum(f.stat().st_size for f in RAW_DIR.glob("*.csv"))
+
+    #RELATÓRIOS DAS ETAPAS NÃO INTERESSAM AQUI
+    with redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+
+        etapas, linhas = time_stages(dataset["anos"])
+
+        if memory:
+            for nome, pico in trace_stages(dataset["anos"]).items():
+                etapas[nome]["pico_mb"] = pico
+
+    return {
+        "anos": len(dataset["anos"]),
+        "copias_linhas": dataset["copias_linhas"],
+        "estacoes": dataset["estacoes"],
+        "registros": linhas,
+        "mb_brutos": bytes_brutos / 1e6,
+        "geracao_segundos": geracao,
+        "etapas": etapas,
+        "total_segundos": sum(etapa["segundos"] for etapa in etapas.values())
+    }
+
+
+def spawn_scale(scale: int, memory: bool, seed: int) -> dict:
+    """
+    Roda uma escala em um subprocesso, com dados e gráficos em uma pasta
+    temporária removida ao final.
+    """
+    with tempfile.TemporaryDirectory(prefix=f"metro_bench_{scale}x_") as work:
+        saida = Path(work) / "resultado.json"
+
+        env = {
+            **os.environ,
+            "METRO_DATA_DIR": str(Path(work) / "data"),
+            "METRO_FIGURES_DIR": str(Path(work) / "figures"),
+            "MPLBACKEND": "Agg"
+        }
+
+        comando = [
+            sys.executable, "-m", "benchmarks.run",
+            "--worker", str(scale), "--output", str(saida), "--seed", str(seed)
+        ]
+        if not memory:
+            comando.append("--no-memory")
+
+        subprocess.run(comando, cwd=PROJECT_ROOT, env=env, check=True)
+
+        return json.loads(saida.read_text(encoding="utf-8"))
+#==============================================================================
+
+
+#==============================================================================
+# RESULTADOS EM JSON E COMPARAÇÃO
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def environment() -> dict:
+    import matplotlib
+    import numpy
+    import pandas
+    import pyarrow
+    import scipy
+
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "alterado": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versoes": {
+            "numpy": numpy.__version__,
+            "pandas": pandas.__version__,
+            "scipy": scipy.__version__,
+            "matplotlib": matplotlib.__version__,
+            "pyarrow": pyarrow.__version__
+        }
+    }
+
+
+def save_results(resultado: dict, output=None) -> Path:
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        commit = (resultado["ambiente"]["commit"] or "sem-git")[:10]
+        carimbo = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{carimbo}_{commit}.json"
+
+    output = Path(output)
+    output.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    return output
+
+
+def print_results(resultado: dict):
+    for scale, dados in resultado["escalas"].items():
+        print(
+            f"\nEscala {scale}x: {dados['anos']} anos, {dados['estacoes']} estações, "
+            f"{dados['registros']} registros ({dados['mb_brutos']:.1f} MB brutos)"
+        )
+        print(f"{'etapa':<12}{'segundos':>10}{'pico (MB)':>12}{'RSS máx. (MB)':>15}")
+
+        for nome, etapa in dados["etapas"].items():
+            pico = etapa.get("pico_mb")
+            pico = f"{pico:.1f}" if pico is not None else "-"
+            print(f"{nome:<12}{etapa['segundos']:>10.3f}{pico:>12}{etapa['rss_max_mb']:>15.1f}")
+
+        print(f"{'total':<12}{dados['total_segundos']:>10.3f}")
+
+
+def compare_results(antes: dict, depois: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compara dois resultados escala a escala e etapa a etapa. Retorna as
+    regressões de tempo (razão depois/antes acima de 'threshold').
+    """
+    regressoes = []
+
+    print(f"Antes:  {antes['ambiente']['commit'][:10]} ({antes['ambiente']['data']})")
+    print(f"Depois: {depois['ambiente']['commit'][:10]} ({depois['ambiente']['data']})")
+
+    for scale in antes["escalas"]:
+        if scale not in depois["escalas"]:
+            continue
+
+        print(f"\nEscala {scale}x")
+        print(f"{'etapa':<12}{'antes (s)':>11}{'depois (s)':>12}{'razão':>8}{'Δ pico (MB)':>13}")
+
+        etapas_antes = antes["escalas"][scale]["etapas"]
+        etapas_depois = depois["escalas"][scale]["etapas"]
+
+        for nome in etapas_antes:
+            if nome not in etapas_depois:
+                continue
+
+            a, d = etapas_antes[nome], etapas_depois[nome]
+            razao = d["segundos"] / a["segundos"] if a["segundos"] else float("inf")
+
+            if "pico_mb" in a and "pico_mb" in d:
+                delta = f"{d['pico_mb'] - a['pico_mb']:+.1f}"
+            else:
+                delta = "-"
+
+            marca = ""
+            if razao > threshold:
+                marca = "  REGRESSÃO"
+                regressoes.append((scale, nome, razao))
+
+            print(f"{nome:<12}{a['segundos']:>11.3f}{d['segundos']:>12.3f}{razao:>8.2f}{delta:>13}{marca}")
+
+    return regressoes
+#==============================================================================
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks do pipeline com dados sintéticos no layout do Metrô."
+    )
+    parser.add_argument("--scales", nargs="+", type=int, default=DEFAULT_SCALES,
+                        help="múltiplos do volume atual (padrão: 1 10 100)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="sem a passada de tracemalloc (só tempo e RSS)")
+    parser.add_argument("--seed", type=int, default=0, help="semente dos dados sintéticos")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DEPOIS"),
+                        help="compara dois resultados JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="razão de tempo considerada regressão na comparação")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.worker is not None:
+        resultado = run_scale(args.worker, memory=not args.no_memory, seed=args.seed)
+        Path(args.output).write_text(json.dumps(resultado), encoding="utf-8")
+        return 0
+
+    if args.compare:
+        antes, depois = (json.loads(Path(p).read_text(encoding="utf-8")) for p in args.compare)
+        regressoes = compare_results(antes, depois, args.threshold)
+
+        if regressoes:
+            print(f"\n{len(regressoes)} etapa(s) acima de {args.threshold:.2f}x o tempo anterior")
+        return 1 if regressoes else 0
+
+    resultado = {"ambiente": environment(), "escalas": {}}
+
+    for scale in args.scales:
+        print(f"Escala {scale}x...", flush=True)
+        resultado["escalas"][str(scale)] = spawn_scale(scale, not args.no_memory, args.seed)
+
+    print_results(resultado)
+    print(f"\nResultados salvos em: {save_results(resultado, args.output)}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
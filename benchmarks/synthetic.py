@@ -0,0 +1,216 @@
+import calendar
+import math
+
+import numpy as np
+
+from pathlib import Path
+
+from src.data_processing import STATION_MAPPING, MONTH_ABBREVIATIONS
+
+#LINHAS PRESENTES NOS ARQUIVOS DO METRÔ (A 4-AMARELA NÃO VEM NA BASE)
+TEMPLATE_LINES = ["1-AZUL", "2-VERDE", "3-VERMELHA", "15-PRATA"]
+
+#VOLUME DE HOJE (ESCALA 1x): 3 ANOS, UMA CÓPIA DE CADA LINHA
+BASE_YEARS = 3
+LAST_YEAR = 2025
+
+#MARCAS DE NOTA DE RODAPÉ NAS FAIXAS (COMO NO ARQUIVO DE 2025)
+FOOTNOTE_MARKS = {"1-AZUL": "¹", "2-VERDE": "²", "3-VERMELHA": "³"}
+
+#LINHA CUJAS SIGLAS VÊM COM ESPAÇOS NO CABEÇALHO (' VPM '), EXCETO A ÚLTIMA
+PADDED_LINES = {"15-PRATA"}
+
+#FRAÇÃO DE CÉLULAS COM '-' (SEM REGISTRO)
+PLACEHOLDER_RATE = 0.002
+
+#FATOR DO FLUXO POR DIA DA SEMANA (SEG..DOM)
+WEEKDAY_FACTOR = np.array([1.0, 1.02, 1.03, 1.02, 0.98, 0.6, 0.4])
+
+MONTH_NAMES = {mes: sigla for sigla, mes in MONTH_ABBREVIATIONS.items()}
+
+FOOTNOTES = [
+    "¹ Corresponde às entradas pelas linhas de bloqueio incluindo as transferências da CPTM",
+    "² Corresponde às entradas pelas linhas de bloqueio incluindo as transferências da CPTM",
+    "³ Corresponde às entradas pelas linhas de bloqueio incluindo as transferências da CPTM",
+    "Fonte: Diretoria de Operações - dados sintéticos para benchmark"
+]
+
+
+def layout_for_scale(scale: int) -> dict:
+    """
+    Distribui o fator de escala entre anos e cópias das linhas:
+    as cópias são o maior divisor de 'scale' que não passa de sqrt(scale)
+    e os anos completam o fator (10x -> 15 anos x 2 cópias,
+    100x -> 30 anos x 10 cópias).
+    """
+    copias = max(d for d in range(1, math.isqrt(scale) + 1) if scale % d == 0)
+    n_anos = BASE_YEARS * scale // copias
+
+    return {
+        "anos": [str(ano) for ano in range(LAST_YEAR - n_anos + 1, LAST_YEAR + 1)],
+        "copias_linhas": copias
+    }
+
+
+def synthetic_lines(copias: int = 1) -> list:
+    """
+    Linhas do arquivo sintético: (nome, siglas). A primeira cópia usa as
+    linhas reais; as demais repetem as siglas com a numeração deslocada
+    em 100 (ex.: '101-AZUL'), então aparecem como estações DESCONHECIDAS.
+    """
+    linhas = []
+
+    for copia in range(copias):
+        for linha in TEMPLATE_LINES:
+            numero, cor = linha.split("-", 1)
+            nome = linha if copia == 0 else f"{int(numero) + 100 * copia}-{cor}"
+            linhas.append((nome, list(STATION_MAPPING[linha])))
+
+    return linhas
+
+
+def station_levels(linhas, rng) -> list:
+    """
+    Nível médio (em milhares) de cada estação, um vetor por linha.
+    """
+    return [rng.lognormal(mean=2.2, sigma=0.8, size=len(siglas)) for _, siglas in linhas]
+
+
+#==============================================================================
+# ESCRITA NO LAYOUT DO ARQUIVO DO METRÔ
+
+def _format_values(values) -> list:
+    """
+    Valores em milhares com uma casa e vírgula decimal; NaN vira '-'.
+    """
+    return ["-" if np.isnan(v) else f"{v:.1f}".replace(".", ",") for v in values]
+
+
+def _block_header(linha: str, siglas: list) -> list:
+    if linha in PADDED_LINES:
+        siglas = [f" {s} " for s in siglas[:-1]] + siglas[-1:]
+    return ["DIA"] + siglas + ["TOTAL"]
+
+
+def _join_blocks(blocks: list) -> str:
+    """
+    Junta os blocos das linhas com uma coluna vazia entre eles (';;').
+    """
+    campos = []
+
+    for i, block in enumerate(blocks):
+        if i:
+            campos.append("")
+        campos.extend(block)
+
+    return ";".join(campos) + "\n"
+
+
+def write_synthetic_year(path, year, linhas, levels, rng) -> int:
+    """
+    Grava um ano no layout do arquivo do Metrô (latin-1, ';'): cabeçalho
+    do arquivo, e para cada mês a faixa 'ENTRADAS POR ESTAÇÃO - LINHA X -
+    MES/ANO (MIL)' no início de cada bloco, a linha 'DIA;siglas;TOTAL' de
+    cada bloco, 31 linhas de dias (vazias após o fim do mês), a linha
+    'Total' e linhas em branco; no fim, as notas de rodapé.
+    Retorna o número de registros estação-dia com valor.
+    """
+    year = int(year)
+    larguras = [len(siglas) + 2 for _, siglas in linhas]
+    n_campos = sum(larguras) + len(linhas) - 1
+    vazia = ";" * (n_campos - 1) + "\n"
+
+    def cabecalho(texto):
+        return texto + ";" * (n_campos - 1) + "\n"
+
+    partes = [
+        cabecalho("METRÔ DE SÃO PAULO"),
+        cabecalho(f"INFORMAÇÕES SOBRE A DEMANDA - {year}"),
+        cabecalho("Entrada de Passageiros por Estação - Diária (em milhares)"),
+        cabecalho("Obs.: Arquivo com a Sigla das Estações está disponível em Infraestrutura"),
+        vazia
+    ]
+
+    header = _join_blocks([_block_header(nome, siglas) for nome, siglas in linhas])
+    registros = 0
+
+    for mes in range(1, 13):
+        n_dias = calendar.monthrange(year, mes)[1]
+        semana = np.array([calendar.weekday(year, mes, dia) for dia in range(1, n_dias + 1)])
+        fator_dia = WEEKDAY_FACTOR[semana] * (1 + 0.02 * (year - LAST_YEAR))
+
+        faixa = []
+        for (nome, _), largura in zip(linhas, larguras):
+            marca = FOOTNOTE_MARKS.get(nome)
+            titulo = f"ENTRADAS POR ESTAÇÃO - LINHA {nome}{' ' + marca if marca else ''} - {MONTH_NAMES[mes]}/{year} (MIL)"
+            faixa.append([titulo] + [""] * (largura - 1))
+
+        partes.append(_join_blocks(faixa))
+        partes.append(header)
+
+        #FLUXO DIA x ESTAÇÃO DE CADA LINHA (UMA CASA DECIMAL, COMO NO ARQUIVO)
+        valores = []
+        for nivel in levels:
+            ruido = rng.lognormal(mean=0.0, sigma=0.1, size=(n_dias, len(nivel)))
+            v = np.round(fator_dia[:, None] * nivel[None, :] * ruido, 1)
+            v[rng.random(v.shape) < PLACEHOLDER_RATE] = np.nan
+            registros += int((~np.isnan(v)).sum())
+            valores.append(v)
+
+        for dia in range(31):
+            if dia >= n_dias:
+                partes.append(vazia)
+                continue
+
+            blocos = []
+            for v in valores:
+                linha_dia = v[dia]
+                blocos.append(
+                    [str(dia + 1)]
+                    + _format_values(linha_dia)
+                    + _format_values([np.nansum(linha_dia)])
+                )
+            partes.append(_join_blocks(blocos))
+
+        #LINHA 'Total' DO MÊS EM CADA BLOCO
+        total = []
+        for v in valores:
+            somas = np.nansum(v, axis=0)
+            total.append(["Total"] + _format_values(somas) + _format_values([somas.sum()]))
+        partes.append(_join_blocks(total))
+        partes.extend([vazia, vazia])
+
+    partes.append(vazia)
+    partes.extend(cabecalho(nota) for nota in FOOTNOTES)
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="latin-1", newline="") as f:
+        f.writelines(partes)
+
+    return registros
+#==============================================================================
+
+
+def write_synthetic_dataset(raw_dir, scale: int = 1, seed: int = 0) -> dict:
+    """
+    Gera os arquivos brutos de uma escala ('passageiros_dia_ANO.csv' em
+    raw_dir). Retorna o layout, o número de estações e de registros.
+    """
+    layout = layout_for_scale(scale)
+    linhas = synthetic_lines(layout["copias_linhas"])
+
+    rng = np.random.default_rng(seed)
+    levels = station_levels(linhas, rng)
+
+    registros = 0
+    for ano in layout["anos"]:
+        registros += write_synthetic_year(
+            Path(raw_dir) / f"passageiros_dia_{ano}.csv", ano, linhas, levels, rng
+        )
+
+    return {
+        **layout,
+        "estacoes": sum(len(siglas) for _, siglas in linhas),
+        "registros": registros
+    }
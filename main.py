@@ -1,336 +1,763 @@
-import pandas as pd
+import time
 
-from src.descriptive_analysis import summarize_group
-from src.data_processing import (
-    parse_raw_file,
-    create_paulista_dummy,
-    create_analysis_groups
-    )
-from src.inferential_analysis import (
-    test_normality,
-    welch_t_test,
-    mann_whitney_test,
-    cohens_d,
-    anova_teste,
-    anova_eta_squared,
-    correlation_test
-    )
-from src.visualization import (
-    plot_group_means,
-    plot_monthly_trends,
-    plot_cluster_correlation,
-    plot_group_boxplot,
-    plot_interannual_comparison
-    )
+#MARCO DO INÍCIO DO PROCESSO (TEMPO DE INICIALIZAÇÃO DO INGEST)
+START = time.perf_counter()
 
+import argparse
 
-def main():
-    #==============================================================================
-    # BLOCO 1 - REPROCESSAMENTO DA BASE BRUTA
-    # (Descomentar apenas quando alterar parsing/mapping))
-    # (para funcionar você deve, descomentar, rodar o programa, comentar esta parte novamente, rodar novamente para carregar a base processada)
-    
-    anos = ["2023", "2024", "2025"]
-    
-    dfs = []
-    
-    for ano in anos:
-        print(f"\nReprocessamento base {ano}...")
-        
-        df_temp = parse_raw_file(
-            f"projeto-metro-sp/data/raw/passageiros_dia_{ano}.csv",
-            year=ano
+#IMPORTS PESADOS (PANDAS, SCIPY, MATPLOTLIB, SEABORN) FICAM DENTRO DE CADA
+#ETAPA: UM SUBCOMANDO SÓ CARREGA AS BIBLIOTECAS DE QUE PRECISA
+
+#ANOS DA BASE HISTÓRICA
+ANOS = ["2023", "2024", "2025"]
+
+#ORÇAMENTO DE INICIALIZAÇÃO DO 'ingest' COM A BASE EM CACHE (SEGUNDOS)
+INGEST_STARTUP_BUDGET = 0.5
+
+
+#==============================================================================
+# BLOCO 1 - REPROCESSAMENTO DA BASE BRUTA (COM CACHE)
+# (Só reprocessa os anos cujo arquivo bruto ou código de parsing/mapping mudou;
+# numa execução normal nenhum arquivo bruto é lido)
+
+def run_ingest(anos=ANOS, force: bool = False, append: bool = False):
+    from src.ingestion import ingest_years, append_months
+    from src.paths import HISTORICAL_DATASET, CURRENT_YEAR_DATASET
+
+    #Modo incremental: só os meses novos do arquivo do ano corrente
+    if append and not force:
+        meses = append_months(anos)
+
+        if meses is not None:
+            if meses:
+                print("\nMeses acrescentados:", meses)
+            else:
+                print("\nNenhum mês novo no arquivo de", anos[-1])
+            return meses
+
+        print("\nIngestão incremental não se aplica (cache ausente ou mês já armazenado alterado): reprocessamento completo")
+
+    reprocessados = ingest_years(anos, force=force)
+
+    if reprocessados:
+        from src.storage import load_processed, export_csv
+
+        print("\nAnos reprocessados:", reprocessados)
+
+        #CSVs apenas como exportação
+        df_historico = load_processed(HISTORICAL_DATASET)
+        export_csv(df_historico, HISTORICAL_DATASET)
+        export_csv(
+            df_historico[df_historico["ano"] == int(anos[-1])].drop(columns=["ano"]),
+            CURRENT_YEAR_DATASET
         )
-        
-        df_temp["ano"] = ano
-        
-        dfs.append(df_temp)
-        
-        print(f"Linhas processadas ({ano}):", len(df_temp))
-    
-    #Concatenar todos os anos
-    df_historico = pd.concat(dfs, ignore_index=True)
-    
-    print("\nTotal consolidade:", len(df_historico))
-    
-    df_historico.to_csv(
-        "projeto-metro-sp/data/processed/metro_2023_2024_2025_clean.csv",
-        index=False
-    )
-    
-    print("Dataset histórico salvo com sucesso")
-    #==============================================================================
-    
-    
+
+        print("Dataset histórico salvo com sucesso")
+    else:
+        print("\nBase processada atualizada (cache), nenhum reprocessamento necessário")
+
+    return reprocessados
+#==============================================================================
+
+
+def run_validate(anos=ANOS, fail: bool = True):
+    import pandas as pd
+
+    from src.fact_table import FactTable
+    from src.ingestion import load_year, load_year_totals
+    from src.validation import validate, print_quality_report, QUALITY_REPORT
+
+    fact = FactTable.from_frame(pd.concat([load_year(ano) for ano in anos], ignore_index=True))
+    totais = pd.concat([load_year_totals(ano) for ano in anos], ignore_index=True)
+
+    report = validate(fact, totais, fail=False)
+    print_quality_report(report)
+    print(f"Relatório salvo em: {QUALITY_REPORT}")
+
+    if fail and not report["aprovada"]:
+        raise SystemExit(1)
+
+    return report
+
+
+def load_analysis_base():
+    """
+    Blocos 2 a 4: base do último ano como tabela fato, dummy do
+    Cluster Paulista e índice dos grupos.
+    """
+    from src.data_processing import create_paulista_dummy
+    from src.group_index import build_group_index
+    from src.storage import HISTORICAL_DATASET, load_fact_table
+
     #==============================================================================
     # BLOCO 2 - CARREGAR BASE PROCESSADA
-    
-    df = pd.read_csv(
-        "projeto-metro-sp/data/processed/metro_2025_clean.csv",
-    parse_dates=["data"]
-    )
-    
+
+    df = load_fact_table(HISTORICAL_DATASET, anos=[int(ANOS[-1])])
+    print(f"Memória da base: {df.memory_usage() / 1e6:.2f} MB (tabela fato)")
+
     #==============================================================================
-    
-    
+
+
     #==============================================================================
-    # BLOCO 3 - VALIDAÇÃO DE INTEGRIDADE (DEBUG OPCIONAL)
-    #(Descomentar se quiser validar mapping)
-    
-    #------------verificar estações desconhecidas------------------
-    #print("\nQuantidade de estações DESCONHECIDAS:")
-    #print((df["estacao"] == "DESCONHECIDA").sum())
-    #------------verificar siglas não mapeadas---------------------
-    #print("\nSiglas com estacao DESCONHECIDA:")
-    #print(df[df["estacao"] == "DESCONHECIDA"]["sigla"].unique())
-    #-------------verificar desconhecidas por linha----------------
-    #print("\nDESCONHECIDAS POR LINHA:")
-    #print(
-        #df[df["estacao"] == "DESCONHECIDA"]
-        #.groupby("linha")
-        #.size()
-    #)
-    
-    #------------verificar siglas da linha X----------------------
-    #print("\nSIGLAS DA LINHA 2:")
-    #print(df[df["linha"] == "2-VERDE"]["sigla"].unique())
-    #------------verificar sigla x estação da linha X-------------
-    #print("\nLINHA 2 - SIGLA X ESTACAO:")
-    #print(
-        #df[df["linha"] == "2-VERDE"][["sigla", "estacao"]]
-        #.drop_duplicates()
-        #.sort_values("sigla")
-    #)
+    # BLOCO 3 - VALIDAÇÃO DE INTEGRIDADE
+    #(Estações desconhecidas, chaves duplicadas, dias faltantes e conciliação
+    #com a coluna TOTAL: etapa 'validate' do pipeline / python main.py validate)
     #==============================================================================
-    
-    
+
+
     #==============================================================================
     # BLOCO 4 - PREPARAÇÃO PARA ANÁLISE
-    
+
     df = create_paulista_dummy(df)
-    
-    df_paulista, df_linha2_sem_paulista, df_outras_linhas = create_analysis_groups(df)
-    
+
+    #Índice dos grupos (calculado uma vez, entrega views do fluxo por grupo)
+    grupos = build_group_index(df)
+
     #------------verificar cluster paulista----------------------
     #print("\nEstações no Cluster Paulista:")
     #print(df[df["cluster_paulista"] == 1]["estacao"].unique())
     #==============================================================================
-    
-    
-    #==============================================================================
-    # BLOCO 5 - ANÁLISE DESCRITIVA
-    
+
+    return df, grupos
+
+
+#==============================================================================
+# BLOCO 5 - ANÁLISE DESCRITIVA
+
+def run_describe(grupos):
+    from src.descriptive_analysis import summarize_group
+
     print("\n" + "="*50)
     print("ANÁLISE COMPARATIVA - CLUSTER PAULISTA")
     print("="*50)
-    
-    summarize_group(df_paulista, "Cluster Paulista")
-    summarize_group(df_linha2_sem_paulista, "Linha 2 (sem Paulista)")
-    summarize_group(df_outras_linhas, "Outras Linhas")
-    #==============================================================================
-    
-    
-    #==============================================================================
-    # BLOCO 6 - ANÁLISE INFERENCIAL
-    
+
+    #Resumos (média, quartis, bigodes, outliers) reaproveitados nos gráficos
+    resumos = [
+        summarize_group(grupos, "Cluster Paulista"),
+        summarize_group(grupos, "Linha 2 (sem Paulista)"),
+        summarize_group(grupos, "Outras Linhas")
+    ]
+
+    return resumos
+#==============================================================================
+
+
+#==============================================================================
+# BLOCO 6 - ANÁLISE INFERENCIAL
+
+def run_infer(df, grupos):
+    from src.inferential_analysis import (
+        GroupMoments,
+        test_normality,
+        normality_table,
+        welch_t_test,
+        mann_whitney_test,
+        cohens_d,
+        anova_teste,
+        anova_eta_squared,
+        batch_comparisons
+        )
+    from src.resampling import daily_moments, block_bootstrap, permutation_test
+
     print("\n" + "="*50)
     print("TESTES INFERENCIAIS")
     print("="*50)
-    
+
     #------------teste de normalidade----------------------
-    test_normality(df_paulista["fluxo"], "Cluster Paulista")
-    test_normality(df_linha2_sem_paulista["fluxo"], "Linha 2 (sem Paulista)")
-    test_normality(df_outras_linhas["fluxo"], "Outras Linhas")
-    
+    test_normality(grupos, "Cluster Paulista")
+    test_normality(grupos, "Linha 2 (sem Paulista)")
+    test_normality(grupos, "Outras Linhas")
+
+    #------------normalidade de todos os grupos e estações----
+    normalidade = normality_table(df, grupos)
+    estacoes = normalidade[normalidade["nivel"] == "estacao"]
+
+    print("\nNormalidade por grupo (teste escolhido pelo tamanho da amostra):")
+    print(normalidade.loc[normalidade["nivel"] == "grupo", ["grupo", "n", "metodo", "p_valor", "anderson_p"]].to_string(index=False))
+    print(f"\nEstações com distribuição aproximadamente normal: {estacoes['normal'].sum()} de {len(estacoes)}")
+
+    #------------momentos suficientes por grupo-------------
+    #(n, soma, soma dos quadrados: base de Welch, Cohen's d, ANOVA e Eta^2)
+    momentos = GroupMoments.from_index(grupos)
+
     #------------teste t de welch-------------------------
     welch_t_test(
-        df_paulista["fluxo"],
-        df_linha2_sem_paulista["fluxo"],
+        momentos,
+        momentos,
         "Cluster Paulista",
         "Linha 2 (sem Paulista)"
     )
     #------------teste de Mann-Whitney----------------------
     mann_whitney_test(
-        df_paulista["fluxo"],
-        df_linha2_sem_paulista["fluxo"],
+        grupos,
+        grupos,
         "Cluster Paulista",
         "Linha 2 (sem Paulista)"
     )
     #------------teste de Cohen's d------------------------
     cohens_d(
-        df_paulista["fluxo"],
-        df_linha2_sem_paulista["fluxo"],
+        momentos,
+        momentos,
+        "Cluster Paulista",
+        "Linha 2 (sem Paulista)"
+    )
+    #------------todas as estações e linhas em lote----------
+    #(estação vs restante da linha, linha vs restante do sistema;
+    #p-valores corrigidos por Benjamini-Hochberg)
+    comparacoes = batch_comparisons(df)
+    estacoes_lote = comparacoes[comparacoes["nivel"] == "estacao"]
+
+    print("\nComparações em lote (Welch, Mann-Whitney e Cohen's d, correção BH):")
+    print(comparacoes.loc[comparacoes["nivel"] == "linha", ["grupo", "n", "media", "welch_p_ajustado", "mw_p_ajustado", "cohens_d"]].round(4).to_string(index=False))
+    print(f"\nEstações diferentes do restante da linha (Welch e Mann-Whitney): {estacoes_lote['significativo'].sum()} de {len(estacoes_lote)}")
+    print("\nMaiores efeitos entre estações (|d|):")
+    print(
+        estacoes_lote
+        .reindex(estacoes_lote["cohens_d"].abs().sort_values(ascending=False).index)
+        .head(10)[["grupo", "referencia", "media", "media_referencia", "cohens_d"]]
+        .round(2)
+        .to_string(index=False)
+    )
+    #------------bootstrap por blocos de datas--------------
+    #(IC 95% para diferença de médias, Cohen's d e participação do cluster)
+    diarios = daily_moments(df, grupos, ["Cluster Paulista", "Linha 2 (sem Paulista)"])
+
+    bootstrap = block_bootstrap(
+        diarios,
         "Cluster Paulista",
         "Linha 2 (sem Paulista)"
     )
+    print("\nBootstrap por blocos de 7 dias (IC 95%):")
+    print(bootstrap.to_string(index=False))
+
+    #------------teste de permutação------------------------
+    #(diferença de médias sem supor distribuição, réplicas em lotes)
+    diferenca, p_permutacao = permutation_test(
+        grupos.fluxo("Cluster Paulista"),
+        grupos.fluxo("Linha 2 (sem Paulista)")
+    )
+    print(f"\nTeste de permutação (2000 réplicas): diferença de médias = {diferenca:.2f}, p = {p_permutacao:.4f}")
+
     #--------------teste ANOVA------------------------------
     anova_teste(
-        df[df["linha"] == "1-AZUL"]["fluxo"],
-        df[df["linha"] == "2-VERDE"]["fluxo"],
-        df[df["linha"] == "3-VERMELHA"]["fluxo"],
-        df[df["linha"] == "15-PRATA"]["fluxo"]
+        momentos,
+        "1-AZUL",
+        "2-VERDE",
+        "3-VERMELHA",
+        "15-PRATA"
     )
     #--------------eta squared para ANOVA-------------------
     anova_eta_squared(
-        df[df["linha"] == "1-AZUL"]["fluxo"].values,
-        df[df["linha"] == "2-VERDE"]["fluxo"].values,
-        df[df["linha"] == "3-VERMELHA"]["fluxo"].values,
-        df[df["linha"] == "15-PRATA"]["fluxo"].values
+        momentos,
+        "1-AZUL",
+        "2-VERDE",
+        "3-VERMELHA",
+        "15-PRATA"
     )
-    #==============================================================================
-    
-    
-    #==============================================================================
-    # BLOCO 7 - ANÁLISE DE CORRELAÇÃO ENTRE ESTAÇÕES DO CLUSTER PAULISTA
-    
+#==============================================================================
+
+
+#==============================================================================
+# BLOCO 7 - ANÁLISE DE CORRELAÇÃO ENTRE ESTAÇÕES DO CLUSTER PAULISTA
+
+def run_correlate(df, grupos):
+    from src.correlation import station_correlation, correlation_pairs
+
     print("\n" + "="*50)
     print("CORRELAÇÃO - CLUSTER PAULISTA")
     print("="*50)
-    
+
     #Filtrar apenas as estações do cluster paulista
-    df_cluster = df[df["cluster_paulista"] == 1]
-    
-    #Criar tabela pivot: fatas nas linhas, estações nas colunas
-    df_pivot = df_cluster.pivot_table(
-        index="data",
-        columns="estacao",
-        values="fluxo"
-    )
-    
+    df_cluster = grupos.take(df, "Cluster Paulista")
+
     #Matriz de correlação entre as estações do cluster
-    correlation_matrix = df_pivot.corr()
-    
+    #(matriz datas x estações + correlação com pares completos)
+    correlation_matrix = station_correlation(df_cluster)
+
     print("\nMatriz de Correlação *(Pearson):")
     print(correlation_matrix)
-    #==============================================================================
-    
-    
-    #==============================================================================
-    # BLOCO 8 - ANÁLISE TEMPORAL MENSAL
-    
+
+    #Correlação entre todas as estações da rede, uma por plataforma (p-valor e IC de Fisher-z)
+    pares = correlation_pairs(df, column="rotulo")
+
+    print(f"\nPares de estações na rede: {len(pares)}")
+    print(f"Pares com correlação significativa (p < 0.05): {(pares['p_valor'] < 0.05).sum()}")
+    print("\nPares com menor correlação:")
+    print(pares.nsmallest(5, "r").to_string(index=False))
+
+    return correlation_matrix
+#==============================================================================
+
+
+#==============================================================================
+# BLOCOS 8 E 9 - ANÁLISE TEMPORAL MENSAL E VARIAÇÃO PERCENTUAL
+
+def run_monthly(df, grupos):
     print("\n" + "="*50)
     print("ANÁLISE TEMPORAL - MÉDIA MENSAL")
     print("="*50)
-    
+
     #Criar coluna de mês
     df["mes"] = df["data"].dt.month
-    
-    #Separar grupos novamente
-    df_paulista, df_linha2_sem_paulista, df_outras_linhas = create_analysis_groups(df)
-    
-    #Média mensal por grupo
-    media_mensal_paulista = df_paulista.groupby("mes")["fluxo"].mean()
-    media_mensal_linha2 = df_linha2_sem_paulista.groupby("mes")["fluxo"].mean()
-    media_mensal_outras = df_outras_linhas.groupby("mes")["fluxo"].mean()
-    
+
+    #Média mensal por grupo (reaproveita o índice dos grupos)
+    media_mensal_paulista = grupos.mean_by("Cluster Paulista", df["mes"])
+    media_mensal_linha2 = grupos.mean_by("Linha 2 (sem Paulista)", df["mes"])
+    media_mensal_outras = grupos.mean_by("Outras Linhas", df["mes"])
+
     print("\nCluster Paulista - Média Mensal:")
     print(media_mensal_paulista)
-    
+
     print("\nLinha 2 (sem Paulista) - Média Mensal:")
     print(media_mensal_linha2)
-    
+
     print("\nOutras Linhas - Média Mensal:")
     print(media_mensal_outras)
-    #==============================================================================
-    
-    
-    #==============================================================================
-    # BLOCO 9 - VARIAÇÃO PERCENTUAL MENSAL
-    
+
     print("\n" + "="*50)
     print("ANÁLISE TEMPORAL - VARIAÇÃO PERCENTUAL MENSAL")
     print("="*50)
-    
+
     #Calcular variação percentual mensal
     var_pct_paulista = media_mensal_paulista.pct_change() * 100
     var_pct_linha2 = media_mensal_linha2.pct_change() * 100
     var_pct_outras = media_mensal_outras.pct_change() * 100
-    
+
     print("\nCluster Paulista - Variação %:")
     print(var_pct_paulista.round(2))
-    
+
     print("\nLinha 2 (sem Paulista) - Variação %:")
     print(var_pct_linha2.round(2))
-    
+
     print("\nOutras Linhas - Variação %:")
     print(var_pct_outras.round(2))
-    #==============================================================================
-    
-    
-    #==============================================================================
-    # BLOCO 10 - VISUALIZAÇÕES
-    
-    plot_group_means(df_paulista,
-                    df_linha2_sem_paulista,
-                    df_outras_linhas)
-    
-    plot_monthly_trends(media_mensal_paulista,
-                        media_mensal_linha2,
-                        media_mensal_outras)
-    
-    plot_cluster_correlation(correlation_matrix)
-    
-    plot_group_boxplot(df_paulista,
-                    df_linha2_sem_paulista,
-                    df_outras_linhas)
-    #=============================================================================
-    
-    
-    #=============================================================================
-    #BLOCO 11 - ANÁLISE INTERANUAL
+
+    return media_mensal_paulista, media_mensal_linha2, media_mensal_outras
+#==============================================================================
+
+
+#===========================================================================
+#BLOCO 11 - ANÁLISE INTERANUAL
+
+def run_interannual():
+    import pandas as pd
+
+    from src.clusters import SYSTEM_CLUSTER, cluster_statistics
+    from src.correlation import correlation_pairs_by_year
+    from src.flow_cube import load_flow_cube
+    from src.storage import HISTORICAL_DATASET
+
     print("\n" + "="*50)
     print("ANÁLISE INTERANUAL")
     print("="*50)
-    
-    df_hist = pd.read_csv(
-        "projeto-metro-sp/data/processed/metro_2023_2024_2025_clean.csv",
-        parse_dates=["data"]
-    )
-    
-    df_hist = create_paulista_dummy(df_hist)
-    
-    # Garantir coluna ano
-    df_hist["ano"] = df_hist["data"].dt.year
-    
+
+    # Cubo dia x estação (memmap), reconstruído só quando a base muda
+    cubo = load_flow_cube(HISTORICAL_DATASET)
+    anos_cubo = cubo.day_keys("year")
+    cluster = cubo.stations["cluster_paulista"].to_numpy() == 1
+
     # Média geral por ano
-    media_ano = (
-        df_hist
-        .groupby("ano")["fluxo"]
-        .mean()
-    )
-    
+    media_ano = cubo.mean_by(anos_cubo).rename_axis("ano")
+
     print("\nMédia Geral por Ano:")
     print(media_ano.round(0))
-    
+
     # Média anual por cluster vs não cluster
-    media_cluster_ano = (
-        df_hist
-        .groupby(["ano", "cluster_paulista"])["fluxo"]
-        .mean()
-        .unstack()
-    )
-    
+    media_cluster_ano = pd.DataFrame({
+        0: cubo.mean_by(anos_cubo, ~cluster),
+        1: cubo.mean_by(anos_cubo, cluster)
+    }).rename_axis(index="ano", columns="cluster_paulista")
+
     print("\nMédia ANual - Cluster vs Não Cluster")
     print(media_cluster_ano.round(0))
-    
-    #Gráfico Interanual
-    plot_interannual_comparison(media_cluster_ano)
-    
-    #Participação percentual do cluster
+
+    #Participação, média e crescimento de todos os clusters candidatos
+    #(um produto esparso sobre o cubo dia x estação)
+    clusters_ano = cluster_statistics(cubo, "year")
+    clusters_ano["ano"] = clusters_ano["periodo"].dt.year
+
     participacao = (
-    df_hist
-        .groupby("ano")
-        .apply(
-            lambda x: (
-                x.loc[x["cluster_paulista"] == 1, "fluxo"].sum()
-                /
-                x["fluxo"].sum()
-            )
-        )
+        clusters_ano
+        .loc[clusters_ano["cluster"] == "Cluster Paulista"]
+        .set_index("ano")["participacao"]
+        .rename(None)
     )
-    
+
     print("\nParticipação do Cluster no Total do Sistema (%):")
     print((participacao * 100).round(2))
-    #===========================================================================
+
+    comparacao = clusters_ano.loc[clusters_ano["cluster"] != SYSTEM_CLUSTER].assign(
+        participacao=lambda x: x["participacao"] * 100
+    )
+
+    print("\nClusters Candidatos por Ano (participação %, média e crescimento % da média):")
+    print(
+        comparacao
+        .set_index(["ano", "cluster"])[["estacoes", "participacao", "media", "crescimento_pct"]]
+        .round(2)
+    )
+
+    #Correlação entre estações da rede, ano a ano
+    pares_ano = correlation_pairs_by_year(cubo)
+
+    print("\nCorrelação entre Estações da Rede por Ano (mediana e mínimo de r):")
+    print(pares_ano.groupby("ano")["r"].agg(["median", "min"]).round(4))
+
+    return media_cluster_ano
+#===========================================================================
+
+
+#===========================================================================
+#BLOCOS 10 E 12 - VISUALIZAÇÕES (RENDERIZAÇÃO SEM INTERFACE)
+
+def run_plot(resumos, medias_mensais, correlation_matrix, media_cluster_ano, force: bool = False):
+    from src.rendering import render_figures
+
+    #Gráficos renderizados sem interface (render_figures),
+    #em paralelo e só quando dados ou estilo mudaram
+    figuras = [
+        ("plot_group_means", (resumos,)),
+        ("plot_monthly_trends", tuple(medias_mensais)),
+        ("plot_cluster_correlation", (correlation_matrix,)),
+        ("plot_group_boxplot", (resumos,)),
+        ("plot_interannual_comparison", (media_cluster_ano,))
+    ]
+
+    status = render_figures(figuras, force=force)
+
+    print("\nGráficos:")
+    for figura, situacao in status.items():
+        print(f"{figura}: {situacao}")
+
+    return status
+#===========================================================================
+
+
+#===========================================================================
+# PIPELINE: ETAPAS COM ENTRADAS/SAÍDAS DECLARADAS E ARTEFATOS EM CACHE
+
+def stage_ingest_year(ano):
+    from src.ingestion import load_year, load_year_totals
+
+    df_ano = load_year(ano)
+    print(f"Linhas processadas ({ano}):", len(df_ano))
+
+    return {f"ano_{ano}": df_ano, f"totais_{ano}": load_year_totals(ano)}
+
+
+def stage_validate(**entradas):
+    import pandas as pd
+
+    from src.fact_table import FactTable
+    from src.validation import validate, print_quality_report
+
+    #Base inteira e TOTAL publicado; interrompe o pipeline se passar dos limites
+    fact = FactTable.from_frame(pd.concat([entradas[f"ano_{ano}"] for ano in ANOS], ignore_index=True))
+    totais = pd.concat([entradas[f"totais_{ano}"] for ano in ANOS], ignore_index=True)
+
+    report = validate(fact, totais)
+    print_quality_report(report)
+
+    return {"qualidade": report}
+
+
+def stage_consolidate(**anos):
+    import pandas as pd
+
+    from src.fact_table import FactTable
+    from src.paths import HISTORICAL_DATASET, CURRENT_YEAR_DATASET
+    from src.storage import save_processed_parts, export_csv, to_storage_types
+
+    frames = [anos[f"ano_{ano}"] for ano in ANOS]
+
+    total = save_processed_parts(frames, HISTORICAL_DATASET)
+    print("\nTotal consolidado:", total)
+
+    #CSVs apenas como exportação
+    df_historico = pd.concat([to_storage_types(df) for df in frames], ignore_index=True)
+    export_csv(df_historico, HISTORICAL_DATASET)
+    export_csv(frames[-1].drop(columns=["ano"]), CURRENT_YEAR_DATASET)
+
+    print("Dataset histórico salvo com sucesso")
+
+    return {"historico": FactTable.from_frame(df_historico)}
+
+
+def stage_groups(**entradas):
+    from src.data_processing import create_paulista_dummy
+    from src.fact_table import FactTable
+    from src.group_index import build_group_index
+
+    #Blocos 2 e 4 sobre o último ano (só depende do arquivo bruto desse ano)
+    df = create_paulista_dummy(FactTable.from_frame(entradas[f"ano_{ANOS[-1]}"]))
+
+    return {"base": df, "grupos": build_group_index(df)}
+
+
+def stage_descriptive(grupos):
+    return {"resumos": run_describe(grupos)}
+
+
+def stage_inferential(base, grupos):
+    run_infer(base, grupos)
+    return {}
+
+
+def stage_correlation(base, grupos):
+    return {"correlacao_cluster": run_correlate(base, grupos)}
+
+
+def stage_temporal(base, grupos):
+    return {"medias_mensais": run_monthly(base, grupos)}
+
+
+def stage_interannual(historico):
+    #'historico' só ordena a etapa depois da consolidação: a análise lê o
+    #cubo dia x estação, conferido contra o parquet gravado nela
+    return {"media_cluster_ano": run_interannual()}
+
+
+def stage_chart(figura, **entradas):
+    from src.rendering import render_figures
+
+    #Entradas em tupla (ex.: médias mensais dos 3 grupos) viram vários argumentos
+    args = []
+    for valor in entradas.values():
+        args.extend(valor if isinstance(valor, tuple) else [valor])
+
+    status = render_figures([(figura, tuple(args))], force=True)
+    print(f"{figura}: {status[figura]}")
+
+    return {}
+
+
+def build_pipeline():
+    """
+    Grafo do pipeline completo. Cada etapa declara entradas, saídas e o
+    código de que depende: mudar o arquivo bruto de um ano refaz só a
+    ingestão desse ano e o que depende dele; mudar o estilo de um gráfico
+    refaz só esse gráfico.
+    """
+    from pathlib import Path
+
+    from src.ingestion import PARSER_SOURCES
+    from src.paths import raw_file_path
+    from src.pipeline import Pipeline, Stage
+    from src.rendering import figure_code
+
+    src = Path(__file__).resolve().parent / "src"
+    base = [src / "fact_table.py", src / "group_index.py"]
+
+    stages = [
+        Stage(
+            f"ingest_{ano}", stage_ingest_year,
+            outputs=[f"ano_{ano}", f"totais_{ano}"],
+            code=[stage_ingest_year, src / "ingestion.py", src / "storage.py"] + PARSER_SOURCES,
+            files=[raw_file_path(ano)],
+            params={"ano": ano}
+        )
+        for ano in ANOS
+    ]
+
+    stages += [
+        Stage(
+            "validate", stage_validate,
+            inputs=[f"{nome}_{ano}" for ano in ANOS for nome in ["ano", "totais"]], outputs=["qualidade"],
+            code=[stage_validate, src / "validation.py", src / "fact_table.py"]
+        ),
+        Stage(
+            "consolidate", stage_consolidate,
+            inputs=[f"ano_{ano}" for ano in ANOS] + ["qualidade"], outputs=["historico"],
+            code=[stage_consolidate, src / "storage.py", src / "fact_table.py"]
+        ),
+        Stage(
+            "groups", stage_groups,
+            inputs=[f"ano_{ANOS[-1]}", "qualidade"], outputs=["base", "grupos"],
+            code=[stage_groups, src / "data_processing.py"] + base
+        ),
+        Stage(
+            "descriptive", stage_descriptive,
+            inputs=["grupos"], outputs=["resumos"],
+            code=[stage_descriptive, run_describe, src / "descriptive_analysis.py"] + base
+        ),
+        Stage(
+            "inferential", stage_inferential,
+            inputs=["base", "grupos"],
+            code=[stage_inferential, run_infer, src / "inferential_analysis.py", src / "resampling.py"] + base
+        ),
+        Stage(
+            "correlation", stage_correlation,
+            inputs=["base", "grupos"], outputs=["correlacao_cluster"],
+            code=[stage_correlation, run_correlate, src / "correlation.py"] + base
+        ),
+        Stage(
+            "temporal", stage_temporal,
+            inputs=["base", "grupos"], outputs=["medias_mensais"],
+            code=[stage_temporal, run_monthly] + base
+        ),
+        Stage(
+            "interannual", stage_interannual,
+            inputs=["historico"], outputs=["media_cluster_ano"],
+            code=[stage_interannual, run_interannual, src / "flow_cube.py", src / "clusters.py", src / "correlation.py"] + base
+        )
+    ]
+
+    #UMA ETAPA POR GRÁFICO, DEPENDENTE SÓ DO CÓDIGO DO PRÓPRIO GRÁFICO
+    graficos = {
+        "plot_group_means": ["resumos"],
+        "plot_monthly_trends": ["medias_mensais"],
+        "plot_cluster_correlation": ["correlacao_cluster"],
+        "plot_group_boxplot": ["resumos"],
+        "plot_interannual_comparison": ["media_cluster_ano"]
+    }
+
+    stages += [
+        Stage(
+            figura, stage_chart,
+            inputs=entradas,
+            code=[stage_chart] + figure_code(figura),
+            params={"figura": figura}
+        )
+        for figura, entradas in graficos.items()
+    ]
+
+    return Pipeline(stages)
+
+
+def run_pipeline(force=()):
+    status = build_pipeline().run(force=force)
+
+    executadas = [etapa for etapa, situacao in status.items() if situacao == "executada"]
+    print(f"\nEtapas: {len(executadas)} executadas, {len(status) - len(executadas)} em cache")
+    if executadas:
+        print("Executadas:", ", ".join(executadas))
+
+    return status
+#===========================================================================
+
+
+#===========================================================================
+# LINHA DE COMANDO
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Análise do fluxo de passageiros do Metrô de SP (Cluster Paulista)."
+    )
+    parser.add_argument("--log-level", metavar="NÍVEL", help="log estruturado em stderr (DEBUG, INFO, WARNING...)")
+    parser.add_argument("--log-json", action="store_true", help="log em JSON, um evento por linha")
+    parser.add_argument("--profile", metavar="ARQUIVO", help="perfil por etapa e função: .json (árvore) ou .folded (flamegraph)")
+    parser.add_argument("--profile-no-memory", action="store_true", help="perfil sem tracemalloc (só tempo e registros)")
+
+    subparsers = parser.add_subparsers(dest="comando")
+
+    ingest = subparsers.add_parser("ingest", help="reprocessa a base bruta (só anos alterados)")
+    ingest.add_argument("--force", action="store_true", help="reprocessa todos os anos")
+    ingest.add_argument("--append", action="store_true", help="acrescenta só os meses novos do arquivo do ano corrente")
+
+    validate = subparsers.add_parser("validate", help="relatório de qualidade da base (JSON em data/processed)")
+    validate.add_argument("--no-fail", action="store_true", help="não interrompe quando um limite é excedido")
+
+    subparsers.add_parser("describe", help="estatísticas descritivas e evolução mensal")
+    subparsers.add_parser("infer", help="testes inferenciais")
+    subparsers.add_parser("correlate", help="correlação entre estações")
+    subparsers.add_parser("interannual", help="análise interanual")
+
+    plot = subparsers.add_parser("plot", help="renderiza os gráficos (sem interface)")
+    plot.add_argument("--force", action="store_true", help="renderiza mesmo sem alterações")
+
+    pipeline = subparsers.add_parser("all", help="pipeline completo com cache por etapa (padrão)")
+    pipeline.add_argument("--force", nargs="*", default=[], metavar="ETAPA", help="etapas a refazer mesmo em cache")
+
+    return parser
+
+
+def run_command(args):
+    comando = args.comando or "all"
+
+    if comando == "ingest":
+        processados = run_ingest(force=args.force, append=args.append)
+
+        #Tempo desde o início do processo (imports + verificação do cache)
+        elapsed = time.perf_counter() - START
+        status = "dentro do" if elapsed <= INGEST_STARTUP_BUDGET else "ACIMA DO"
+        print(f"Tempo do ingest: {elapsed * 1000:.0f} ms ({status} orçamento de {INGEST_STARTUP_BUDGET * 1000:.0f} ms)")
+
+        #O orçamento vale para a base em cache (nada reprocessado): acima dele
+        #o comando falha, para que uma regressão não passe despercebida
+        if not processados and elapsed > INGEST_STARTUP_BUDGET and not args.profile:
+            import logging
+
+            from src.instrumentation import get_logger, log_event
+
+            log_event(
+                get_logger("main"), logging.WARNING, "orcamento excedido",
+                etapa="ingest",
+                tempo_ms=round(elapsed * 1000),
+                orcamento_ms=round(INGEST_STARTUP_BUDGET * 1000)
+            )
+            return 1
+        return
+
+    if comando == "validate":
+        run_validate(fail=not args.no_fail)
+        return
+
+    if comando == "interannual":
+        run_interannual()
+        return
+
+    if comando == "all":
+        run_pipeline(force=getattr(args, "force", []))
+        return
+
+    df, grupos = load_analysis_base()
+
+    if comando == "describe":
+        run_describe(grupos)
+        run_monthly(df, grupos)
+    elif comando == "infer":
+        run_infer(df, grupos)
+    elif comando == "correlate":
+        run_correlate(df, grupos)
+    elif comando == "plot":
+        from contextlib import redirect_stdout
+        from io import StringIO
+
+        #Só os insumos dos gráficos: relatórios das etapas não são exibidos
+        with redirect_stdout(StringIO()):
+            resumos = run_describe(grupos)
+            correlation_matrix = run_correlate(df, grupos)
+            medias_mensais = run_monthly(df, grupos)
+            media_cluster_ano = run_interannual()
+
+        run_plot(resumos, medias_mensais, correlation_matrix, media_cluster_ano, force=args.force)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    #INSTRUMENTAÇÃO SÓ QUANDO PEDIDA (SEM ELA O INGEST NÃO IMPORTA NADA A MAIS)
+    if args.log_level or args.log_json:
+        from src.instrumentation import configure_logging
+        configure_logging(args.log_level, as_json=args.log_json)
+
+    if not args.profile:
+        return run_command(args)
+
+    import sys
+
+    from src.instrumentation import enable_profiling, instrument_module, export_profile, print_profile_summary
+
+    enable_profiling(memory=not args.profile_no_memory)
+    instrument_module(sys.modules[__name__], prefix="main")
+
+    try:
+        return run_command(args)
+    finally:
+        print(f"\nPerfil salvo em: {export_profile(args.profile)}", file=sys.stderr)
+        print_profile_summary(file=sys.stderr)
+#===========================================================================
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
@@ -0,0 +1,156 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.data_processing import PAULISTA_STATIONS
+from src.flow_cube import MISSING
+from src.instrumentation import get_logger, log_event
+
+logger = get_logger("clusters")
+
+#REGISTRO DE CLUSTERS CANDIDATOS: NOME -> ESTAÇÕES (NOMES DO STATION_MAPPING)
+#ESTAÇÕES DE TRANSFERÊNCIA ENTRAM POR TODAS AS LINHAS EM QUE APARECEM
+#(SÓ CLUSTERS COM ESTAÇÕES NA BASE: UM CLUSTER SEM ESTAÇÕES GERA AVISO NO LOG)
+CLUSTER_DEFINITIONS = {
+    "Cluster Paulista": PAULISTA_STATIONS,
+    "Centro (Sé/República)": ["Sé", "São Bento", "República", "Liberdade"]
+}
+
+#COLUNA EXTRA DA MATRIZ DE PERTINÊNCIA COM TODAS AS ESTAÇÕES (DENOMINADOR DA PARTICIPAÇÃO)
+SYSTEM_CLUSTER = "Sistema"
+
+#DIAS POR BLOCO NO ACÚMULO DO PRODUTO (MEMÓRIA INDEPENDENTE DO HISTÓRICO)
+DEFAULT_BLOCK_DAYS = 366
+
+#FREQUÊNCIAS ACEITAS -> UNIDADE DO datetime64
+PERIOD_UNITS = {"year": "Y", "month": "M", "day": "D"}
+
+
+def register_cluster(name: str, stations):
+    """
+    Inclui (ou substitui) um cluster candidato no registro.
+    """
+    CLUSTER_DEFINITIONS[name] = list(stations)
+
+
+def membership_matrix(stations: pd.DataFrame, clusters: dict = None):
+    """
+    Matriz esparsa estação x cluster (1 = estação pertence ao cluster),
+    na ordem das estações da dimensão. Retorna (matriz CSR, nomes dos
+    clusters).
+    """
+    clusters = CLUSTER_DEFINITIONS if clusters is None else clusters
+    nomes = stations["estacao"].astype(str).to_numpy()
+
+    linhas, colunas = [], []
+    for j, membros in enumerate(clusters.values()):
+        posicoes = np.flatnonzero(np.isin(nomes, list(membros)))
+        linhas.append(posicoes)
+        colunas.append(np.full(len(posicoes), j))
+
+    linhas = np.concatenate(linhas) if linhas else np.array([], dtype=int)
+    colunas = np.concatenate(colunas) if colunas else np.array([], dtype=int)
+
+    matriz = sparse.csr_matrix(
+        (np.ones(len(linhas)), (linhas, colunas)),
+        shape=(len(nomes), len(clusters))
+    )
+
+    return matriz, list(clusters)
+
+
+def present_clusters(stations: pd.DataFrame, clusters: dict = None) -> dict:
+    """
+    Clusters com ao menos uma estação na base. Os demais ficam de fora
+    (participação 0% não seria uma medida) e são registrados em log.
+    """
+    clusters = CLUSTER_DEFINITIONS if clusters is None else clusters
+    nomes = stations["estacao"].astype(str).to_numpy()
+
+    presentes = {nome: membros for nome, membros in clusters.items() if np.isin(list(membros), nomes).any()}
+    ausentes = [nome for nome in clusters if nome not in presentes]
+
+    if ausentes:
+        log_event(logger, logging.WARNING, "clusters sem estacoes na base", clusters=ausentes)
+
+    return presentes
+
+
+def cluster_sums(cube, freq: str = "year", clusters: dict = None,
+                block_days: int = DEFAULT_BLOCK_DAYS):
+    """
+    Fluxo e número de registros estação-dia por período e cluster.
+
+    Fluxo e máscara de registros ficam lado a lado ([F | R], dias x
+    2 estações) e um único produto P · [F | R] · diag(M, M) reduz os dias
+    ao período (P, indicador período x dia) e as estações aos clusters
+    (M, pertinência + coluna do sistema). O produto é acumulado em
+    blocos de dias. Retorna (períodos, nomes, fluxo, registros).
+    """
+    membership, nomes = membership_matrix(cube.stations, clusters)
+
+    #COLUNA DO SISTEMA (TODAS AS ESTAÇÕES) NO MESMO PRODUTO
+    todas = sparse.csr_matrix(np.ones((membership.shape[0], 1)))
+    membership = sparse.hstack([membership, todas], format="csr")
+    nomes = nomes + [SYSTEM_CLUSTER]
+
+    pesos = sparse.block_diag([membership, membership], format="csr")
+
+    dias = cube.dates.astype(f"datetime64[{PERIOD_UNITS[freq]}]")
+    periodos, periodo_dia = np.unique(dias, return_inverse=True)
+
+    n_dias, n_clusters = len(dias), len(nomes)
+    acumulado = np.zeros((len(periodos), 2 * n_clusters))
+
+    for inicio in range(0, n_dias, block_days):
+        fim = min(inicio + block_days, n_dias)
+        bloco = np.asarray(cube.values[inicio:fim])
+        registros = bloco != MISSING
+
+        lado_a_lado = np.hstack([np.where(registros, bloco, 0), registros]).astype(np.float64)
+
+        indicador = sparse.csr_matrix(
+            (np.ones(fim - inicio), (periodo_dia[inicio:fim], np.arange(fim - inicio))),
+            shape=(len(periodos), fim - inicio)
+        )
+
+        acumulado += indicador @ (lado_a_lado @ pesos)
+
+    return periodos, nomes, acumulado[:, :n_clusters], acumulado[:, n_clusters:]
+
+
+def cluster_statistics(cube, freq: str = "year", clusters: dict = None,
+                        block_days: int = DEFAULT_BLOCK_DAYS) -> pd.DataFrame:
+    """
+    Tabela por período e cluster: estações na base, fluxo total,
+    participação no fluxo do sistema, média por registro estação-dia e
+    crescimento (%) da média frente ao período anterior. 'freq' é
+    'year', 'month' ou 'day'. Clusters sem estações na base não entram
+    (present_clusters).
+    """
+    clusters = present_clusters(cube.stations, clusters)
+
+    periodos, nomes, fluxo, registros = cluster_sums(cube, freq, clusters, block_days)
+    membership, _ = membership_matrix(cube.stations, clusters)
+
+    n_periodos, n_clusters = fluxo.shape
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media = fluxo / registros
+        participacao = fluxo / fluxo[:, [-1]]
+        crescimento = np.full_like(media, np.nan)
+        crescimento[1:] = (media[1:] / media[:-1] - 1) * 100
+
+    estacoes = np.append(np.asarray(membership.sum(axis=0)).ravel(), membership.shape[0]).astype(int)
+
+    return pd.DataFrame({
+        "periodo": np.repeat(pd.PeriodIndex(periodos, freq=PERIOD_UNITS[freq]), n_clusters),
+        "cluster": np.tile(nomes, n_periodos),
+        "estacoes": np.tile(estacoes, n_periodos),
+        "fluxo": fluxo.ravel().astype(np.int64),
+        "participacao": participacao.ravel(),
+        "media": media.ravel(),
+        "crescimento_pct": crescimento.ravel()
+    })
@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from src.fact_table import key_codes
+
+#LINHAS (DATAS) POR BLOCO NO ACÚMULO DAS SOMAS DA CORRELAÇÃO
+DEFAULT_BLOCK_ROWS = 366
+
+
+#==============================================================================
+# MATRIZ DATA x ESTAÇÃO
+
+def station_matrix(df, column: str = "estacao") -> pd.DataFrame:
+    """
+    Matriz densa data x estação do fluxo (NaN nos dias sem registro),
+    montada em uma única passada de bincount.
+
+    Equivale a df.pivot_table(index="data", columns=column, values="fluxo"):
+    linhas e colunas ordenadas e média quando a mesma chave aparece mais
+    de uma vez no dia. 'estacao' junta as plataformas de um complexo pelo
+    nome; 'station_id' ou 'rotulo' mantêm cada plataforma separada.
+    """
+    datas, dia_codes = np.unique(np.asarray(df["data"]), return_inverse=True)
+    estacao_codes, nomes = key_codes(df, column)
+
+    flat = dia_codes * len(nomes) + estacao_codes
+    size = len(datas) * len(nomes)
+
+    soma = np.bincount(flat, weights=np.asarray(df["fluxo"], dtype=np.float64), minlength=size)
+    contagem = np.bincount(flat, minlength=size)
+
+    with np.errstate(invalid="ignore"):
+        matriz = (soma / contagem).reshape(len(datas), len(nomes))
+
+    return pd.DataFrame(
+        matriz,
+        index=pd.Index(datas, name="data"),
+        columns=pd.Index(nomes, name=column)
+    )
+#==============================================================================
+
+
+#==============================================================================
+# CORRELAÇÃO DE PEARSON COM PARES COMPLETOS (EM BLOCOS DE DATAS)
+
+def correlation_sums(matrix, block_rows: int = DEFAULT_BLOCK_ROWS) -> dict:
+    """
+    Somas suficientes da correlação de cada par de colunas, considerando
+    só as datas em que as duas têm valor (pares completos).
+
+    As somas são aditivas entre datas, então a matriz é percorrida em
+    blocos de 'block_rows' datas: a memória depende do número de
+    estações, não do tamanho do histórico.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n_cols = matrix.shape[1]
+
+    #CENTRAR PELA MÉDIA DE CADA COLUNA (NÃO ALTERA r, REDUZ CANCELAMENTO)
+    center = np.nan_to_num(np.nanmean(matrix, axis=0)) if len(matrix) else np.zeros(n_cols)
+
+    sums = {key: np.zeros((n_cols, n_cols)) for key in ["n", "x", "xx", "xy"]}
+
+    for start in range(0, len(matrix), block_rows):
+        bloco = matrix[start:start + block_rows] - center
+
+        mask = ~np.isnan(bloco)
+        m = mask.astype(np.float64)
+        x = np.where(mask, bloco, 0.0)
+
+        sums["n"] += m.T @ m
+        sums["x"] += x.T @ m
+        sums["xx"] += (x * x).T @ m
+        sums["xy"] += x.T @ x
+
+    return sums
+
+
+def pairwise_correlation(matrix, block_rows: int = DEFAULT_BLOCK_ROWS):
+    """
+    Correlação de Pearson de todos os pares de colunas (pares completos),
+    via produtos matriciais. Retorna (r, n): matrizes coluna x coluna com
+    a correlação e o número de datas usadas em cada par.
+    """
+    s = correlation_sums(matrix, block_rows)
+
+    n = s["n"]
+    sx, sy = s["x"], s["x"].T
+    sxx, syy = s["xx"], s["xx"].T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = n * s["xy"] - sx * sy
+        var_x = n * sxx - sx ** 2
+        var_y = n * syy - sy ** 2
+
+        r = cov / np.sqrt(var_x * var_y)
+
+    r = np.clip(r, -1.0, 1.0)
+
+    return r, n.astype(np.int64)
+
+
+def correlation_inference(r, n, confidence: float = 0.95) -> dict:
+    """
+    P-valores (teste t, bilateral) e intervalos de confiança de Fisher-z
+    para todas as correlações de uma vez.
+    """
+    r = np.asarray(r, dtype=np.float64)
+    n = np.asarray(n, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df_t = n - 2
+        t = r * np.sqrt(df_t / (1 - r ** 2))
+        p_value = np.where(df_t > 0, 2 * stats.t.sf(np.abs(t), df_t), np.nan)
+
+        z = np.arctanh(r)
+        se = 1 / np.sqrt(n - 3)
+        z_crit = stats.norm.ppf(0.5 + confidence / 2)
+
+        lower = np.where(n > 3, np.tanh(z - z_crit * se), np.nan)
+        upper = np.where(n > 3, np.tanh(z + z_crit * se), np.nan)
+
+    return {"p_valor": p_value, "ic_inferior": lower, "ic_superior": upper}
+#==============================================================================
+
+
+#==============================================================================
+# RESULTADOS: MATRIZ E TABELA DE PARES
+
+def station_correlation(df, column: str = "estacao",
+                        block_rows: int = DEFAULT_BLOCK_ROWS) -> pd.DataFrame:
+    """
+    Matriz de correlação entre estações (mesmo resultado de
+    pivot_table(...).corr(), calculado em blocos de datas).
+    """
+    matrix = station_matrix(df, column)
+    r, _ = pairwise_correlation(matrix.to_numpy(), block_rows)
+
+    return pd.DataFrame(r, index=matrix.columns, columns=matrix.columns)
+
+
+def matrix_pairs(matrix: pd.DataFrame,
+                confidence: float = 0.95,
+                block_rows: int = DEFAULT_BLOCK_ROWS) -> pd.DataFrame:
+    """
+    Tabela de pares (correlação, p-valor e IC) das colunas de uma matriz
+    data x estação.
+    """
+    r, n = pairwise_correlation(matrix.to_numpy(), block_rows)
+    inference = correlation_inference(r, n, confidence)
+
+    i, j = np.triu_indices(len(matrix.columns), k=1)
+    nomes = matrix.columns.to_numpy()
+
+    return pd.DataFrame({
+        "estacao_1": nomes[i],
+        "estacao_2": nomes[j],
+        "n": n[i, j],
+        "r": r[i, j],
+        "p_valor": inference["p_valor"][i, j],
+        "ic_inferior": inference["ic_inferior"][i, j],
+        "ic_superior": inference["ic_superior"][i, j]
+    })
+
+
+def correlation_pairs(df, column: str = "estacao",
+                    confidence: float = 0.95,
+                    block_rows: int = DEFAULT_BLOCK_ROWS) -> pd.DataFrame:
+    """
+    Tabela com um registro por par de estações: n de datas em comum,
+    correlação, p-valor e IC de Fisher-z.
+    """
+    return matrix_pairs(station_matrix(df, column), confidence, block_rows)
+
+
+def correlation_pairs_by_year(df, column: str = "estacao", **kwargs) -> pd.DataFrame:
+    """
+    correlation_pairs para cada ano da base, em uma única tabela
+    (coluna 'ano'). Aceita também o cubo dia x estação (FlowCube): a
+    matriz sai direto do memmap, sem a tabela fato.
+    """
+    matriz = df.mean_matrix(column) if hasattr(df, "mean_matrix") else station_matrix(df, column)
+    anos = pd.DatetimeIndex(matriz.index).year.to_numpy()
+
+    tabelas = []
+
+    for ano in np.unique(anos):
+        #SÓ AS DATAS DO ANO E AS ESTAÇÕES COM REGISTRO NELE
+        matriz_ano = matriz[anos == ano]
+
+        tabela = matrix_pairs(matriz_ano.loc[:, matriz_ano.notna().any()], **kwargs)
+        tabela.insert(0, "ano", int(ano))
+        tabelas.append(tabela)
+
+    return pd.concat(tabelas, ignore_index=True)
+#==============================================================================
@@ -1,6 +1,15 @@
-import pandas as pd
+import hashlib
+import io
+import logging
 import re
 
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import get_logger, log_event
+
+logger = get_logger("data_processing")
+
 # MAPEAMENTO DE ESTAÇÕES
 
 LINE_1_MAPPING = {
@@ -99,6 +108,78 @@ STATION_MAPPING = {
     "15-PRATA": LINE_15_MAPPING
 }
 
+#GRAFIAS DO MAPEAMENTO CORRIGIDAS NA DIMENSÃO (NOME -> NOME CANÔNICO)
+CANONICAL_STATION_NAMES = {
+    "CHácara Klabin": "Chácara Klabin"
+}
+
+#COMPLEXOS COM NOMES DIFERENTES LIGADOS POR TRANSFERÊNCIA INTERNA
+TRANSFER_LINKS = [
+    ("Consolação", "Paulista")
+]
+
+#TABELA DE BUSCA (LINHA, SIGLA) -> ESTAÇÃO
+def build_station_lookup(mapping: dict = STATION_MAPPING) -> pd.DataFrame:
+    """
+    Achata o STATION_MAPPING em uma tabela (linha, sigla, estacao),
+    já com o nome canônico da estação.
+    """
+    registros = [
+        (linha, sigla, CANONICAL_STATION_NAMES.get(estacao, estacao))
+        for linha, estacoes in mapping.items()
+        for sigla, estacao in estacoes.items()
+    ]
+    return pd.DataFrame(registros, columns=["linha", "sigla", "estacao"])
+
+#DIMENSÃO DE ESTAÇÕES: UM REGISTRO POR PLATAFORMA (LINHA, SIGLA)
+def build_station_dimension(mapping: dict = STATION_MAPPING) -> pd.DataFrame:
+    """
+    Dimensão de estações com chaves inteiras estáveis (ordem do mapeamento):
+    station_id por plataforma (linha, sigla), complex_id por nome canônico
+    (ANR, PSO, PSE, LUZ e REP de linhas diferentes caem no mesmo complexo)
+    e transfer_group_id, que junta também os complexos de TRANSFER_LINKS.
+    'rotulo' leva a linha entre parênteses nas estações de transferência.
+    """
+    dimensao = build_station_lookup(mapping)
+    dimensao.insert(0, "station_id", np.arange(len(dimensao), dtype=np.int16))
+
+    complex_codes, complexos = pd.factorize(dimensao["estacao"])
+    dimensao["complex_id"] = complex_codes.astype(np.int16)
+
+    #GRUPO DE TRANSFERÊNCIA = MENOR complex_id ENTRE OS COMPLEXOS LIGADOS
+    grupo = np.arange(len(complexos))
+    for estacao_a, estacao_b in TRANSFER_LINKS:
+        a, b = grupo[complexos.get_loc(estacao_a)], grupo[complexos.get_loc(estacao_b)]
+        grupo[grupo == max(a, b)] = min(a, b)
+    dimensao["transfer_group_id"] = grupo[complex_codes].astype(np.int16)
+
+    plataformas = np.bincount(complex_codes)[complex_codes]
+    dimensao["rotulo"] = np.where(
+        plataformas > 1,
+        dimensao["estacao"] + " (" + dimensao["linha"] + ")",
+        dimensao["estacao"]
+    )
+
+    return dimensao
+
+UNKNOWN_STATION = "DESCONHECIDA"
+
+STATION_DIMENSION = build_station_dimension()
+STATION_LOOKUP = STATION_DIMENSION[["linha", "sigla", "estacao"]]
+
+#COLUNAS DE CHAVE INTEIRA DA DIMENSÃO
+STATION_KEYS = ["station_id", "complex_id", "transfer_group_id"]
+
+#ÍNDICE (LINHA, SIGLA) E CATEGORIAS DE ESTAÇÃO USADOS NO MAPEAMENTO VETORIZADO
+STATION_LOOKUP_INDEX = pd.MultiIndex.from_frame(STATION_LOOKUP[["linha", "sigla"]])
+STATION_CATEGORIES = pd.Index(
+    list(dict.fromkeys(STATION_LOOKUP["estacao"])) + [UNKNOWN_STATION]
+)
+STATION_LOOKUP_CODES = np.append(
+    STATION_CATEGORIES.get_indexer(STATION_LOOKUP["estacao"]),
+    len(STATION_CATEGORIES) - 1
+)
+
 #DEFINIÇÃO DAS ESTAÇÕES DENTRO DO CLUSTER PAULISTA
 PAULISTA_STATIONS = [
     "Trianon-MASP",
@@ -107,9 +188,29 @@ PAULISTA_STATIONS = [
     "Paulista"
 ]
 
+#MARCADORES DE VALOR AUSENTE NO ARQUIVO BRUTO (CÉLULA VAZIA, '-' E OBSERVAÇÕES '*')
+RAW_NA_VALUES = ["", "-", "*", "**"]
+
+#LINHA DE DADOS: COMEÇA PELO NÚMERO DO DIA, COM OU SEM MARCA DE NOTA ('23*' = DIA DE GREVE)
+DATA_ROW_PATTERN = re.compile(r"\s*\d+\**\s*(;|$)")
+
+#FAIXA QUE IDENTIFICA A LINHA DE CADA BLOCO ('ENTRADAS POR ESTAÇÃO - LINHA 1-AZUL ...')
+BANNER_LINE_PATTERN = re.compile(r"LINHA\s+(\d+-[^\s;]+)")
+
+#MÊS DE REFERÊNCIA NA MESMA FAIXA ('... - JAN/2023 (MIL)')
+MONTH_ABBREVIATIONS = {
+    "JAN": 1, "FEV": 2, "MAR": 3, "ABR": 4, "MAI": 5, "JUN": 6,
+    "JUL": 7, "AGO": 8, "SET": 9, "OUT": 10, "NOV": 11, "DEZ": 12
+}
+BANNER_MONTH_PATTERN = re.compile(r"\b(" + "|".join(MONTH_ABBREVIATIONS) + r")/(\d{4})\b")
+
 #FUNÇÕES DE PROCESSAMENTO DE DADOS
 def create_paulista_dummy(df: pd.DataFrame) -> pd.DataFrame:
-    df["cluster_paulista"] = df["estacao"].isin(PAULISTA_STATIONS).astype(int) #PUXAR A COLUNA DE ESTAÇÃO E CRIAR A DUMMY
+    if hasattr(df, "station_mask"):
+        #TABELA FATO: TESTE NA DIMENSÃO DE ESTAÇÕES, LEVADO AOS REGISTROS PELO CÓDIGO
+        df["cluster_paulista"] = df.station_mask("estacao", PAULISTA_STATIONS).astype(int)
+    else:
+        df["cluster_paulista"] = df["estacao"].isin(PAULISTA_STATIONS).astype(int) #PUXAR A COLUNA DE ESTAÇÃO E CRIAR A DUMMY
     return df
 
 #FUNÇÃO DE DIVISÃO DO DATAFRAME EM 3 CLUSTERS
@@ -124,177 +225,381 @@ def create_analysis_groups(df: pd.DataFrame):
     df_outras_linhas = df[df["linha"] != "2-VERDE"]
     return df_paulista, df_linha2_sem_paulista, df_outras_linhas
 
-#FUNÇÃO DE PARSE DO ARQUIVO BRUTO
-def parse_raw_file(file_path, year: str) -> pd.DataFrame:
-    print("ano recebido na função:", year)
-    
-    lista_dfs = []
-    
-    #Ler arquivo bruto como texto primeiro
-    with open(file_path, "r", encoding="latin1") as f:
-        lines = f.readlines()
+#FUNÇÃO DE DETECÇÃO DOS BLOCOS DE LINHA
+def detect_line_blocks(header: list, banner: list) -> list:
+    """
+    Associa cada coluna do cabeçalho ao bloco de linha a que pertence.
+    
+    O nome da linha vem da faixa 'ENTRADAS POR ESTAÇÃO - LINHA X', que fica
+    na mesma posição da coluna DIA de cada bloco. Retorna uma lista de
+    (posição, linha, campo) apenas para colunas não vazias.
+    """
+    colunas = []
+    linha_atual = None
+    
+    for i, campo in enumerate(header):
+        if i < len(banner):
+            match = BANNER_LINE_PATTERN.search(banner[i])
+            if match:
+                linha_atual = match.group(1)
         
-    #Encontrar lin que começa com dia
-    header_index = None
-    for i, line in enumerate(lines):
-        if line.strip().startswith("DIA;"):
-            header_index = i
-            break
-    
-    if header_index is None:
-        raise ValueError("Cabeçalho 'DIA' não encontrado no arquivo.")
-    
-    #Agora ler o csv a partir da linha correta
-    df_raw = pd.read_csv(
-        file_path,
-        sep=";",
-        header=header_index,
-        encoding="latin-1"
-        
-    )
-    
-    print("Colunas detectadas:")
-    print(df_raw.columns)
-    
-    #REMOVER COLUNAS VAZIAS
-    df_raw = df_raw.loc[:, ~df_raw.columns.str.contains("^Unnamed")]
-    
-    #TRABALHAR COM A PRIMEIRA COLUNA DIA PARA DETECTAR O MÊS
-    df_raw["DIA"] = pd.to_numeric(df_raw["DIA"], errors="coerce")
-    
-    #REMOVER LINHAS ONDE DIA É NaN
-    df_raw = df_raw.dropna(subset=["DIA"])
-    
-    #DETECTAR REÍNICIO DE CICLO MENSAL
-    df_raw["novo_mes"] = df_raw["DIA"] < df_raw["DIA"].shift(1)
+        if campo and linha_atual is not None:
+            colunas.append((i, linha_atual, campo))
     
-    #CRIAR CONTADOR DE MÊS
-    df_raw["mes"] = df_raw["novo_mes"].cumsum() + 1
+    if not colunas:
+        raise ValueError("Faixa 'ENTRADAS POR ESTAÇÃO - LINHA X' não encontrada no arquivo.")
     
-    print(df_raw[["DIA", "mes"]].head(50))#degub temp
-    
-    line1 = extract_line_block(df_raw, "DIA", "TOTAL", "1-AZUL")
-    line2 = extract_line_block(df_raw, "DIA.1", "TOTAL.1", "2-VERDE")
-    line3 = extract_line_block(df_raw, "DIA.2", "TOTAL.2", "3-VERMELHA")
-    line15 = extract_line_block(df_raw, "DIA.3", "TOTAL.3", "15-PRATA")
+    return colunas
+
+#FUNÇÃO DE LEITURA DO MÊS NA FAIXA DO BLOCO
+def parse_banner_month(line: str):
+    """
+    Extrai o mês de referência ('JAN/2023') de uma faixa de bloco.
+    Retorna um datetime64[M] ou None se a faixa não trouxer o mês.
+    """
+    match = BANNER_MONTH_PATTERN.search(line)
+    
+    if match is None:
+        return None
+    
+    mes = MONTH_ABBREVIATIONS[match.group(1)]
+    return np.datetime64(f"{match.group(2)}-{mes:02d}", "M")
+
+#FUNÇÃO DE IDENTIFICAÇÃO DOS MESES DO ARQUIVO BRUTO
+def raw_file_months(file_path) -> dict:
+    """
+    Meses presentes no arquivo bruto, com o hash SHA-256 das linhas de
+    dados de cada mês ({'2025-01': hash}), sem montar a tabela. Permite
+    achar os meses novos de um arquivo republicado e os meses já
+    armazenados que voltaram com outros valores.
+    """
+    digests = {}
+    mes_atual = None
+    
+    with open(file_path, "r", encoding="latin-1") as f:
+        for line in f:
+            if BANNER_LINE_PATTERN.search(line):
+                mes_atual = parse_banner_month(line)
+                continue
+            
+            if mes_atual is not None and DATA_ROW_PATTERN.match(line):
+                digests.setdefault(str(mes_atual), hashlib.sha256()).update(line.encode("latin-1"))
+    
+    return {mes: digest.hexdigest() for mes, digest in digests.items()}
+
+#FUNÇÃO DE LEITURA DO ARQUIVO BRUTO
+def read_raw_file(file_path, months=None) -> pd.DataFrame:
+    """
+    Lê o arquivo bruto em uma única passada.
+    
+    O cabeçalho 'DIA;' é localizado durante a leitura e apenas as linhas de
+    dados (que começam com o número do dia) são repassadas ao parser C do
+    pandas, já com vírgula decimal, '-' como ausente e tipos explícitos.
+    As colunas saem como MultiIndex (linha, campo), onde campo é 'DIA',
+    'TOTAL' ou a sigla da estação, e o índice é o mês lido da faixa
+    'JAN/2023' que precede cada bloco mensal. Com 'months' (ex.:
+    ['2025-10']) só as linhas desses meses vão para o parser.
+    """
+    meses_lidos = None if months is None else {np.datetime64(mes, "M") for mes in months}
+    header = None
+    banner = []
+    linhas_dados = []
+    numeros_linha = []
+    meses = []
+    mes_atual = None
+    
+    with open(file_path, "r", encoding="latin-1") as f:
+        for numero, line in enumerate(f, start=1):
+            
+            #FAIXA DE LINHA/MÊS: DEFINE O MÊS DAS LINHAS DE DADOS SEGUINTES
+            if BANNER_LINE_PATTERN.search(line):
+                mes_atual = parse_banner_month(line)
+                if header is None:
+                    banner = line.rstrip("\n").split(";")
+                continue
+            
+            #PROCURAR O CABEÇALHO ENQUANTO LÊ
+            if header is None:
+                if line.split(";", 1)[0].strip() == "DIA":
+                    header = [col.strip() for col in line.rstrip("\n").split(";")]
+                continue
+            
+            #MANTER APENAS LINHAS DE DADOS (DIA NUMÉRICO, EX.: '5' OU '23*')
+            if DATA_ROW_PATTERN.match(line):
+                if mes_atual is None:
+                    raise ValueError("Faixa com o mês (ex.: 'JAN/2023') não encontrada antes dos dados.")
+                if meses_lidos is not None and mes_atual not in meses_lidos:
+                    continue
+                linhas_dados.append(line)
+                numeros_linha.append(numero)
+                meses.append(mes_atual)
+    
+    if header is None:
+        raise ValueError("Cabeçalho 'DIA' não encontrado no arquivo.")
     
-    #CONCATENAR LINHAS
-    df_final = pd.concat([line1, line2, line3, line15], ignore_index=True)
+    colunas = detect_line_blocks(header, banner)
+    usecols = [i for i, _, _ in colunas]
+    
+    #TIPOS EXPLÍCITOS: FLUXO EM FLOAT, DIA COMO TEXTO (PODE VIR COMO '23*')
+    dtypes = {
+        i: (str if campo == "DIA" else np.float64)
+        for i, _, campo in colunas
+    }
+    
+    texto = "".join(linhas_dados)
+    
+    def ler(tipos):
+        return pd.read_csv(
+            io.StringIO(texto),
+            sep=";",
+            header=None,
+            usecols=usecols,
+            decimal=",",
+            na_values=RAW_NA_VALUES,
+            keep_default_na=False,
+            dtype=tipos
+        )
     
-    #PADRONIZAR SIGLAS
-    df_final["sigla"] = (
-        df_final["sigla"]
-        .str.strip()
-        .str.replace(r"\.\d+$", "", regex=True)
+    try:
+        df_raw = ler(dtypes)
+    except ValueError:
+        #CÉLULA DE TEXTO EM COLUNA DE FLUXO (EX.: 'n/d'): RELEITURA COMO TEXTO
+        #E CONVERSÃO COLUNA A COLUNA, COM A CÉLULA INVÁLIDA VIRANDO NaN
+        df_raw = ler(str)
+        for i, linha, campo in colunas:
+            if campo != "DIA":
+                df_raw[i] = coerce_flow_column(df_raw[i], linha, campo, numeros_linha, file_path)
+    df_raw.columns = pd.MultiIndex.from_tuples(
+        [(linha, campo) for _, linha, campo in colunas],
+        names=["linha", "campo"]
     )
     
-    print(df_final["dia"].unique()[:20])
-    print(df_final["dia"].dtype)
-    print("Valores únicos de fluxo_raw (amostra):")
-    print(df_final["fluxo_raw"].unique()[:20])
-    print("Tipo fluxo_raw:", df_final["fluxo_raw"].dtype)
-    
-    #FILTROS
+    #ÍNDICE = PRIMEIRO DIA DO MÊS DE CADA LINHA DE DADOS
+    df_raw.index = pd.DatetimeIndex(np.array(meses, dtype="datetime64[M]"), name="mes")
     
-    #REMOVER CABEÇALHOS REPETIDOS
-    df_final = df_final[df_final["dia"] != "DIA"]
+    #EXTRAIR APENAS NÚMEROS DO INÍCIO DAS COLUNAS DIA
+    for col in df_raw.columns[df_raw.columns.get_level_values("campo") == "DIA"]:
+        df_raw[col] = pd.to_numeric(
+            df_raw[col].str.extract(r"^(\d+)", expand=False),
+            errors="coerce"
+        )
     
-    print(df_final[df_final["fluxo_raw"].str.contains("[A-Za-z]", na=False)].head())
+    return df_raw
+
+#FUNÇÃO DE CONVERSÃO TOLERANTE DE UMA COLUNA DE FLUXO
+def coerce_flow_column(coluna: pd.Series, linha, campo, numeros_linha, file_path) -> pd.Series:
+    """
+    Converte uma coluna de fluxo lida como texto (vírgula decimal).
+    Células não numéricas viram NaN e são registradas em log (WARNING)
+    com a linha do arquivo.
+    """
+    texto = coluna.str.strip()
+    valores = pd.to_numeric(texto.str.replace(",", ".", regex=False), errors="coerce")
+    
+    invalidas = np.flatnonzero(valores.isna().to_numpy() & texto.notna().to_numpy())
+    
+    if len(invalidas):
+        log_event(
+            logger, logging.WARNING, "celulas invalidas",
+            arquivo=str(file_path),
+            linha=linha,
+            campo=campo,
+            celulas=[
+                {"linha_arquivo": numeros_linha[j], "valor": texto.iloc[j]}
+                for j in invalidas
+            ]
+        )
     
-    #CONVERTER FLUXO
-    df_final["fluxo"] = (
-        df_final["fluxo_raw"]
-        .str.replace(",", ".", regex=False)
-        .replace("-", None)
+    return valores.astype(np.float64)
+
+#FUNÇÃO DE DATAS DOS BLOCOS
+def block_dates(df_raw: pd.DataFrame):
+    """
+    Datas de cada bloco de linha: (posições das colunas DIA, matriz de
+    datas linha do arquivo x bloco, máscara de datas válidas).
+    """
+    campos = df_raw.columns.get_level_values("campo")
+    pos_dia = np.flatnonzero(campos == "DIA")
+    
+    #DATAS POR (LINHA DO ARQUIVO, BLOCO): INÍCIO DO MÊS + (DIA - 1)
+    inicio_mes = df_raw.index.to_numpy().astype("datetime64[M]")
+    dias = df_raw.iloc[:, pos_dia].to_numpy(dtype=np.float64)
+    dias_validos = ~np.isnan(dias)
+    
+    datas = (
+        inicio_mes.astype("datetime64[D]")[:, None]
+        + np.where(dias_validos, dias - 1, 0).astype("timedelta64[D]")
     )
-    df_final["fluxo"] = (
-        pd.to_numeric(df_final["fluxo"], errors="coerce")
-        .mul(1000)
-        .round(0)
-        .astype("Int64")
-        )
     
-    #REMOVER LINHAS ONDE O FLUXO VIROU NaN
-    df_final = df_final.dropna(subset=["fluxo"])
+    #DIA VÁLIDO = PERMANECE NO MÊS DA FAIXA (DESCARTA 31/02, 0, 32...)
+    datas_validas = dias_validos & (datas.astype("datetime64[M]") == inicio_mes[:, None])
     
-    #REMOVER COLUNA DE FLUXO BRUTO
-    df_final = df_final.drop(columns=["fluxo_raw"])
+    return pos_dia, datas, datas_validas
+
+#FUNÇÃO DE TRANSFORMAÇÃO DOS BLOCOS PARA FORMATO LONGO
+def reshape_line_blocks(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte todos os blocos de linha do formato largo para o longo
+    em uma única operação NumPy (sem melt/concat por bloco).
+    
+    As datas são montadas uma vez por bloco (início do mês + dia - 1) e
+    repassadas a cada estação pelo índice do bloco. Dias inexistentes
+    (ex.: 31/02) e fluxos ausentes são descartados na mesma máscara.
+    A ordem de saída é bloco -> estação -> dia, igual à ordem das colunas
+    no arquivo.
+    """
+    campos = df_raw.columns.get_level_values("campo")
+    linhas = df_raw.columns.get_level_values("linha")
+    
+    pos_estacao = np.flatnonzero((campos != "DIA") & (campos != "TOTAL"))
+    
+    #BLOCO DE CADA COLUNA DE ESTAÇÃO = ÚLTIMA COLUNA DIA À ESQUERDA
+    pos_dia, datas, datas_validas = block_dates(df_raw)
+    bloco = np.searchsorted(pos_dia, pos_estacao, side="right") - 1
+    
+    n_dias = len(df_raw)
+    
+    #REPASSAR PARA AS ESTAÇÕES PELO ÍNDICE DO BLOCO E ACHATAR (COLUNA A COLUNA)
+    valores = df_raw.iloc[:, pos_estacao].to_numpy(dtype=np.float64)
+    
+    mascara = (datas_validas[:, bloco] & ~np.isnan(valores)).ravel(order="F")
+    
+    #NOMES MAPEADOS UMA VEZ POR COLUNA E REPETIDOS PARA CADA DIA
+    linha_col = pd.Categorical(linhas[pos_estacao])
+    sigla_col = pd.Categorical(campos[pos_estacao])
+    estacao_col = map_station_names(linhas[pos_estacao], campos[pos_estacao])
+    
+    def repetir(categorias: pd.Categorical) -> pd.Categorical:
+        return pd.Categorical.from_codes(
+            np.repeat(categorias.codes, n_dias)[mascara],
+            categories=categorias.categories
+        )
     
-    #EXTRAIR APENAS NÚMEROS DO INÍCIO DA STRING
-    df_final["dia"] = (
-        df_final["dia"]
-        .astype(str)
-        .str.extract(r"^(\d+)", expand=False)
+    return pd.DataFrame({
+        "data": datas[:, bloco].ravel(order="F")[mascara].astype("datetime64[us]"),
+        "linha": repetir(linha_col),
+        "sigla": repetir(sigla_col),
+        "estacao": repetir(estacao_col),
+        "fluxo_raw": valores.ravel(order="F")[mascara]
+    })
+
+#FUNÇÃO DE EXTRAÇÃO DA COLUNA TOTAL PUBLICADA
+def line_totals(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coluna TOTAL de cada bloco em formato longo: (data, linha, total),
+    com o total convertido para passageiros como o fluxo. Usada na
+    conciliação com a soma das estações (validation.py).
+    """
+    campos = df_raw.columns.get_level_values("campo")
+    linhas = df_raw.columns.get_level_values("linha")
+    
+    pos_total = np.flatnonzero(campos == "TOTAL")
+    
+    pos_dia, datas, datas_validas = block_dates(df_raw)
+    bloco = np.searchsorted(pos_dia, pos_total, side="right") - 1
+    
+    valores = df_raw.iloc[:, pos_total].to_numpy(dtype=np.float64)
+    mascara = (datas_validas[:, bloco] & ~np.isnan(valores)).ravel(order="F")
+    
+    linha_col = pd.Categorical(linhas[pos_total])
+    
+    return pd.DataFrame({
+        "data": datas[:, bloco].ravel(order="F")[mascara].astype("datetime64[us]"),
+        "linha": pd.Categorical.from_codes(
+            np.repeat(linha_col.codes, len(df_raw))[mascara],
+            categories=linha_col.categories
+        ),
+        "total": np.rint(valores.ravel(order="F")[mascara] * 1000).astype(np.int64)
+    })
+
+#FUNÇÃO DE PARSE DO ARQUIVO BRUTO
+def parse_raw_file(file_path, year: str, totals: bool = False, months=None):
+    """
+    Parse de um ano do arquivo bruto para a tabela longa
+    (data, linha, sigla, estacao, fluxo). Com totals=True retorna também
+    a coluna TOTAL publicada (line_totals). 'months' restringe o parse a
+    alguns meses (ingestão incremental).
+    """
+    df_raw = read_raw_file(file_path, months)
+    
+    #DIAGNÓSTICO SÓ COM LOG EM DEBUG (COLUNAS/MESES NÃO SÃO MONTADOS SEM ELE)
+    log_event(
+        logger, logging.DEBUG, "colunas detectadas",
+        ano=year,
+        colunas=lambda: df_raw.columns.tolist()
     )
     
-    df_final["dia"] = pd.to_numeric(df_final["dia"], errors="coerce")
-    df_final = df_final.dropna(subset=["dia"])
+    #TODOS OS BLOCOS DE LINHA PARA O FORMATO LONGO (JÁ COM DATA)
+    df_final = reshape_line_blocks(df_raw)
     
+    #CONVERTER FLUXO (MILHARES -> PASSAGEIROS, INTEIRO EXATO)
+    df_final["fluxo"] = np.rint(df_final["fluxo_raw"].to_numpy() * 1000).astype(np.int64)
     
-    #REMOVER DIAS INVÁLIDOS
-    df_final = df_final[df_final["dia"].between(1, 31)]
-    df_final["dia"] = df_final["dia"].astype(int)
-    
-    print("ano recebido", year)
-    print("Valores únicos de mes:", df_final["mes"].unique()[:5])
-    
-    #CRIAR COLUNA DE DATA COMPLETA
-    df_final["data"] = pd.to_datetime(
-        dict(
-            year=year,
-            month=df_final["mes"],
-            day=df_final["dia"]
-        ),
-        errors="coerce"
+    log_event(
+        logger, logging.DEBUG, "meses detectados",
+        ano=year,
+        meses=lambda: df_raw.index.unique().strftime("%m/%Y").tolist(),
+        registros=len(df_final)
     )
     
-    #APLICAR MAPEAMENTO
-    df_final["estacao"] = df_final.apply(map_station_name, axis=1)
-    
     #REORDENAR COLUNAS
     df_final = df_final[["data", "linha", "sigla", "estacao",  "fluxo"]]
     
-    #SALVA O DATASET LIMPO
-    df_final.to_csv("projeto-metro-sp/data/processed/metro_2025_clean.csv", index=False)
+    if totals:
+        return df_final, line_totals(df_raw)
     
     return df_final
 
 
-def extract_line_block(df_raw, dia_col, total_col, line_name):
+def lookup_station_ids(linha, sigla) -> np.ndarray:
+    """
+    station_id de cada par (linha, sigla) em uma única busca vetorizada
+    (-1 quando o par não está no mapeamento).
+    """
+    chaves = pd.MultiIndex.from_arrays([np.asarray(linha), np.asarray(sigla)])
+    
+    #POSIÇÃO NA TABELA DE BUSCA = station_id
+    return STATION_LOOKUP_INDEX.get_indexer(chaves)
 
-    #SELECIONAR AS COLUNAS DO BLOCO
-    start_idx = df_raw.columns.get_loc(dia_col)
-    end_idx = df_raw.columns.get_loc(total_col)
-    
-    block = df_raw.iloc[:, start_idx:end_idx + 1]
-    
-    #RENOMEAR A COLUNA DIA PARA PADRÃO
-    block = block.rename(columns={dia_col: "dia"})
-    
-    #REMOVER COLUNA TOTAL
-    block = block.drop(columns=[total_col])
-    
-    #GARANTE QUE O MêS ESTEJA DENTRO DO BLOCO
-    block["mes"] = df_raw["mes"]
-    
-    #TRANSFORMAR O FORMATO DE DADOS DE LARGO PARA LONGO
-    block_long = block.melt(
-        id_vars=["dia", "mes"],
-        var_name="sigla",
-        value_name="fluxo_raw"
-    )
-    
-    #ADICIONAR NOME DA LINHA
-    block_long["linha"] = line_name
-    
-    return block_long
 
-def map_station_name(row):
-    line = row["linha"]
-    sigla = row["sigla"]
-    
-    if line in STATION_MAPPING:
-        return STATION_MAPPING[line].get(sigla, "DESCONHECIDA")
-    return "DESCONHECIDA"
+def map_station_names(linha, sigla) -> pd.Categorical:
+    """
+    Mapeia pares (linha, sigla) para o nome da estação em uma única busca
+    vetorizada. Pares sem mapeamento viram 'DESCONHECIDA'.
+    """
+    #-1 QUANDO NÃO ENCONTRADO -> ÚLTIMO CÓDIGO
+    codes = STATION_LOOKUP_CODES.take(lookup_station_ids(linha, sigla))
+    
+    return pd.Categorical.from_codes(codes, categories=STATION_CATEGORIES)
+
+
+def station_dimension_rows(linha, sigla, estacao) -> pd.DataFrame:
+    """
+    Registros da dimensão para as estações (linha, sigla) de uma base.
+    Pares fora do mapeamento recebem IDs novos depois dos do mapeamento
+    (um complexo e um grupo de transferência próprios por par).
+    """
+    ids = lookup_station_ids(linha, sigla)
+    linhas = STATION_DIMENSION.iloc[np.maximum(ids, 0)].reset_index(drop=True)
+
+    desconhecidas = np.flatnonzero(ids < 0)
+    novos = np.arange(len(desconhecidas))
+
+    for coluna in STATION_KEYS:
+        valores = linhas[coluna].to_numpy(dtype=np.int32)
+        valores[desconhecidas] = STATION_DIMENSION[coluna].max() + 1 + novos
+        linhas[coluna] = valores
+
+    #PARES DESCONHECIDOS: LINHA, SIGLA E NOME VÊM DA PRÓPRIA BASE
+    for coluna, valores in [("linha", linha), ("sigla", sigla), ("estacao", estacao)]:
+        coluna_dim = linhas[coluna].to_numpy(dtype=object)
+        coluna_dim[desconhecidas] = np.asarray(valores, dtype=object)[desconhecidas]
+        linhas[coluna] = coluna_dim
 
+    linhas["rotulo"] = linhas["rotulo"].to_numpy(dtype=object)
+    linhas.loc[desconhecidas, "rotulo"] = [
+        f"{linhas['estacao'].iloc[i]} ({linhas['linha'].iloc[i]} {linhas['sigla'].iloc[i]})"
+        for i in desconhecidas
+    ]
 
+    return linhas
@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from src.group_index import group_values
+
 #def calculate_descriptive_stats(df: pd.DataFrame) -> dict:
    # return {
    #    "std": df["flow"].std(),
@@ -7,13 +10,50 @@ import pandas as pd
    #     "median": df["flow"].median()
    # }
    
-def calculate_descriptive_stats(df):
-   stats = df["fluxo"].describe()
+def calculate_descriptive_stats(df, group_name=None):
+   #ACEITA TABELA COM 'fluxo' OU GroupIndex + NOME DO GRUPO
+   stats = pd.Series(group_values(df, group_name), name="fluxo").describe()
    return stats
 
+def box_summary(df, group_name=None, max_outliers=200, seed=0):
+   #RESUMO DO GRUPO PARA OS GRÁFICOS (FORMATO DO Axes.bxp DO MATPLOTLIB):
+   #QUARTIS, BIGODES (1.5 x IQR), MÉDIA E AMOSTRA LIMITADA DOS OUTLIERS
+   fluxo = np.asarray(group_values(df, group_name), dtype=np.float64)
+   
+   q1, med, q3 = np.percentile(fluxo, [25, 50, 75])
+   iqr = q3 - q1
+   
+   dentro = fluxo[(fluxo >= q1 - 1.5 * iqr) & (fluxo <= q3 + 1.5 * iqr)]
+   outliers = np.sort(fluxo[(fluxo < dentro.min()) | (fluxo > dentro.max())])
+   
+   #MANTÉM OS EXTREMOS E SORTEIA (COM SEMENTE) O RESTANTE ATÉ O LIMITE
+   if len(outliers) > max_outliers:
+      rng = np.random.default_rng(seed)
+      meio = rng.choice(len(outliers) - 2, size=max_outliers - 2, replace=False) + 1
+      outliers = outliers[np.sort(np.concatenate([[0, len(outliers) - 1], meio]))]
+   
+   return {
+      "label": group_name,
+      "n": len(fluxo),
+      "mean": fluxo.mean(),
+      "std": fluxo.std(ddof=1),
+      "q1": q1,
+      "med": med,
+      "q3": q3,
+      "whislo": dentro.min(),
+      "whishi": dentro.max(),
+      "fliers": outliers
+   }
+
 def summarize_group(df, group_name):
+   #ACEITA TABELA COM 'fluxo' OU GroupIndex (GRUPO SELECIONADO PELO NOME)
+   fluxo = group_values(df, group_name)
+   
    print(f"\n{group_name}")
    print("-" * len(group_name))
-   print(f"Observações: {len(df):,}")
-   print(f"Média diária: {df['fluxo'].mean():,.0f} passageiros")
-   print(f"Desvio padrão: {df['fluxo'].std():,.0f}")
\ No newline at end of file
+   print(f"Observações: {len(fluxo):,}")
+   print(f"Média diária: {fluxo.mean():,.0f} passageiros")
+   print(f"Desvio padrão: {fluxo.std(ddof=1):,.0f}")
+   
+   #RESUMO REAPROVEITADO PELOS GRÁFICOS (MÉDIAS E BOXPLOT)
+   return box_summary(df, group_name)
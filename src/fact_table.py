@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+
+from src.data_processing import STATION_KEYS, station_dimension_rows
+
+#COLUNAS DA TABELA LONGA QUE A TABELA FATO CONSEGUE RECONSTRUIR
+FACT_COLUMNS = ["data", "linha", "sigla", "estacao", "fluxo"]
+
+#COLUNAS QUE VÊM DA DIMENSÃO DE ESTAÇÕES
+STATION_COLUMNS = ["linha", "sigla", "estacao", "rotulo"] + STATION_KEYS
+
+
+class FactTable:
+    """
+    Tabela fato compacta do fluxo diário.
+
+    Cada registro guarda apenas o código inteiro da estação (int16), o dia
+    como ordinal int32 (dias desde 1970-01-01) e o fluxo em int32. Linha,
+    sigla, nome da estação e as chaves station_id, complex_id e
+    transfer_group_id ficam na dimensão 'stations' (um registro por par
+    linha/sigla, em ordem de station_id). Colunas como df["estacao"] ou
+    df["data"] são montadas sob demanda, então create_paulista_dummy,
+    create_analysis_groups e as funções estatísticas funcionam direto
+    sobre ela; agrupamentos usam codes() (chaves inteiras).
+    """
+
+    def __init__(self, station, day, fluxo, stations: pd.DataFrame, extra: dict = None):
+        self.station = station
+        self.day = day
+        self.fluxo = fluxo
+        self.stations = stations
+        self.extra = dict(extra or {})
+
+    #--------------------------------------------------------------------------
+    # CONSTRUÇÃO
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "FactTable":
+        """
+        Monta a tabela fato a partir da tabela longa
+        (data, linha, sigla, estacao, fluxo).
+        """
+        linha = pd.Categorical(df["linha"])
+        sigla = pd.Categorical(df["sigla"])
+        estacao = pd.Categorical(df["estacao"])
+
+        #UMA ESTAÇÃO POR PAR (LINHA, SIGLA): ESTAÇÕES DE TRANSFERÊNCIA
+        #APARECEM EM MAIS DE UMA LINHA E CONTINUAM SEPARADAS
+        chave = linha.codes.astype(np.int64) * len(sigla.categories) + sigla.codes
+        _, primeiro, station = np.unique(chave, return_index=True, return_inverse=True)
+
+        #DIMENSÃO EM ORDEM DE station_id: O CÓDIGO DE CADA ESTAÇÃO NÃO
+        #DEPENDE DA ORDEM DOS REGISTROS NEM DE QUAIS LINHAS ESTÃO NA BASE
+        stations = station_dimension_rows(linha[primeiro], sigla[primeiro], estacao[primeiro])
+        ordem = np.argsort(stations["station_id"].to_numpy(), kind="stable")
+        posicao = np.empty_like(ordem)
+        posicao[ordem] = np.arange(len(ordem))
+
+        stations = stations.iloc[ordem].reset_index(drop=True)
+        for coluna in ["linha", "sigla", "estacao", "rotulo"]:
+            stations[coluna] = stations[coluna].astype("category")
+        stations.index.name = "station_code"
+
+        station = posicao[station]
+
+        day = (
+            pd.to_datetime(df["data"]).to_numpy()
+            .astype("datetime64[D]")
+            .astype(np.int64)
+            .astype(np.int32)
+        )
+
+        return cls(
+            station=station.astype(np.int16),
+            day=day,
+            fluxo=df["fluxo"].to_numpy(dtype=np.int32),
+            stations=stations
+        )
+
+    def take(self, indexer) -> "FactTable":
+        """
+        Subconjunto por máscara booleana ou posições inteiras
+        (compartilha as tabelas de dimensão).
+        """
+        return FactTable(
+            station=self.station[indexer],
+            day=self.day[indexer],
+            fluxo=self.fluxo[indexer],
+            stations=self.stations,
+            extra={name: values[indexer] for name, values in self.extra.items()}
+        )
+
+    #--------------------------------------------------------------------------
+    # ACESSO ESTILO DATAFRAME
+
+    @property
+    def columns(self) -> list:
+        return FACT_COLUMNS + [name for name in self.extra if name not in FACT_COLUMNS]
+
+    def __len__(self) -> int:
+        return len(self.fluxo)
+
+    def __contains__(self, name) -> bool:
+        return name in self.columns
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+
+        if isinstance(key, list):
+            return self.to_frame(key)
+
+        return self.take(np.asarray(key, dtype=bool))
+
+    def __setitem__(self, name: str, values):
+        values = np.asarray(values)
+
+        if len(values) != len(self):
+            raise ValueError(f"Coluna '{name}' com {len(values)} valores, esperado {len(self)}.")
+
+        self.extra[name] = values
+
+    def column(self, name: str) -> pd.Series:
+        """
+        Reconstrói uma coluna da tabela longa a partir dos códigos.
+        """
+        if name in self.extra:
+            values = self.extra[name]
+        elif name == "fluxo":
+            values = self.fluxo
+        elif name == "data":
+            values = self.day.astype("datetime64[D]").astype("datetime64[us]")
+        elif name in STATION_COLUMNS:
+            values = self.stations[name].array.take(self.station)
+        else:
+            raise KeyError(name)
+
+        return pd.Series(values, name=name, copy=False)
+
+    def codes(self, column: str):
+        """
+        Códigos inteiros por registro e rótulos (ordenados) de uma coluna
+        da dimensão de estações, só com as estações presentes na tabela.
+        A fatoração é feita na dimensão (um registro por estação) e levada
+        aos registros pelo código da estação, sem montar a coluna de texto.
+        """
+        presentes = np.bincount(self.station, minlength=len(self.stations)) > 0
+
+        codes, labels = pd.factorize(self.stations[column][presentes], sort=True)
+        codigo_estacao = np.full(len(self.stations), -1, dtype=np.int64)
+        codigo_estacao[presentes] = codes
+
+        return codigo_estacao[self.station], np.asarray(labels)
+
+    def station_mask(self, column: str, values) -> np.ndarray:
+        """
+        Máscara por registro das estações cuja coluna da dimensão está em 'values'.
+        """
+        return self.stations[column].isin(values).to_numpy()[self.station]
+
+    def to_frame(self, columns=None) -> pd.DataFrame:
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({name: self.column(name) for name in columns})
+
+    def groupby(self, by, **kwargs):
+        """
+        Agrupa montando apenas as colunas necessárias (chaves, fluxo e
+        colunas derivadas), sem reconstruir a tabela longa inteira.
+        """
+        chaves = [by] if isinstance(by, str) else list(by)
+        columns = list(dict.fromkeys(chaves + ["fluxo"] + list(self.extra)))
+
+        return self.to_frame(columns).groupby(by, observed=True, **kwargs)
+
+    def pivot_table(self, index, columns, values, **kwargs) -> pd.DataFrame:
+        frame = self.to_frame(list(dict.fromkeys([index, columns, values])))
+        return frame.pivot_table(index=index, columns=columns, values=values, **kwargs)
+
+    #--------------------------------------------------------------------------
+    # MEMÓRIA
+
+    def memory_usage(self) -> int:
+        """
+        Bytes ocupados pelos arrays da tabela fato e pelas dimensões.
+        """
+        total = self.station.nbytes + self.day.nbytes + self.fluxo.nbytes
+        total += sum(values.nbytes for values in self.extra.values())
+        total += int(self.stations.memory_usage(deep=True).sum())
+
+        return total
+
+
+def key_codes(df, column: str):
+    """
+    Códigos inteiros por registro e rótulos ordenados de uma coluna
+    (tabela fato: pela dimensão de estações; DataFrame: fatoração da coluna).
+    """
+    if isinstance(df, FactTable) and column in STATION_COLUMNS:
+        return df.codes(column)
+
+    codes, labels = pd.factorize(np.asarray(df[column]), sort=True)
+    return codes, np.asarray(labels)
@@ -0,0 +1,307 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing import PAULISTA_STATIONS, STATION_KEYS
+from src.fact_table import FactTable
+from src.storage import PROCESSED_DIR, HISTORICAL_DATASET, dataset_signature, load_fact_table
+
+#DIRETÓRIO DO CUBO (MATRIZ .npy + DIMENSÃO DE ESTAÇÕES + METADADOS)
+CUBE_DIR = PROCESSED_DIR / "cube"
+
+#SENTINELA DE DIA SEM REGISTRO NO CUBO INT32
+MISSING = np.iinfo(np.int32).min
+
+
+class FlowCube:
+    """
+    Cubo dia x estação do fluxo diário (int32).
+
+    Os dias formam um intervalo contínuo (um por linha da matriz) e as
+    estações seguem a dimensão da tabela fato (uma coluna por par
+    linha/sigla). Dias sem registro guardam MISSING. Carregado do disco
+    como memmap, então abrir o cubo não lê a matriz. O arquivo vai até o
+    fim do último ano, para que meses novos sejam gravados no lugar.
+    """
+
+    def __init__(self, values, start, stations: pd.DataFrame):
+        self.values = values
+        self.start = np.datetime64(start, "D")
+        self.stations = stations
+
+    #--------------------------------------------------------------------------
+    # EIXOS
+
+    @property
+    def shape(self) -> tuple:
+        return self.values.shape
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self.start + np.arange(self.shape[0])
+
+    @property
+    def mask(self) -> np.ndarray:
+        """
+        True nas células com registro.
+        """
+        return self.values != MISSING
+
+    def day_keys(self, freq: str) -> np.ndarray:
+        """
+        Chave de cada dia para reduções: 'month' (1-12) ou 'year'.
+        """
+        dates = pd.DatetimeIndex(self.dates)
+        return (dates.month if freq == "month" else dates.year).to_numpy()
+
+    #--------------------------------------------------------------------------
+    # RECORTES
+
+    def slice(self, start=None, end=None, linhas=None, cluster: bool = None) -> "FlowCube":
+        """
+        Recorte por intervalo de datas (inclusivo), linhas e/ou Cluster
+        Paulista. O recorte de datas é uma view do memmap; o de estações
+        copia só as colunas escolhidas.
+        """
+        dates = self.dates
+        i0 = 0 if start is None else np.searchsorted(dates, np.datetime64(start, "D"))
+        i1 = len(dates) if end is None else np.searchsorted(dates, np.datetime64(end, "D"), side="right")
+
+        keep = np.ones(len(self.stations), dtype=bool)
+
+        if linhas is not None:
+            keep &= self.stations["linha"].isin(linhas).to_numpy()
+
+        if cluster is not None:
+            keep &= self.stations["cluster_paulista"].to_numpy() == int(cluster)
+
+        values = self.values[i0:i1]
+
+        if not keep.all():
+            values = values[:, keep]
+
+        return FlowCube(
+            values,
+            dates[i0] if i0 < len(dates) else self.start,
+            self.stations[keep].reset_index(drop=True)
+        )
+
+    #--------------------------------------------------------------------------
+    # REDUÇÕES
+
+    def as_float(self) -> np.ndarray:
+        """
+        Matriz float64 com NaN nos dias sem registro (entrada da correlação).
+        """
+        return np.where(self.mask, self.values, np.nan)
+
+    def sum_by(self, day_keys, columns=None):
+        """
+        Soma e contagem de registros por chave de dia, somando as colunas
+        selecionadas (máscara booleana de estações; todas por padrão).
+        """
+        values = self.values if columns is None else self.values[:, columns]
+        mask = values != MISSING
+
+        uniques, inverse = np.unique(day_keys, return_inverse=True)
+
+        soma_dia = np.where(mask, values, 0).sum(axis=1, dtype=np.int64)
+        contagem_dia = mask.sum(axis=1)
+
+        soma = np.bincount(inverse, weights=soma_dia, minlength=len(uniques))
+        contagem = np.bincount(inverse, weights=contagem_dia, minlength=len(uniques))
+
+        return uniques, soma, contagem
+
+    def mean_by(self, day_keys, columns=None) -> pd.Series:
+        """
+        Média do fluxo (sobre todos os registros estação-dia) por chave
+        de dia, ex.: cube.mean_by(cube.day_keys("month")).
+        """
+        uniques, soma, contagem = self.sum_by(day_keys, columns)
+        return pd.Series(soma / contagem, index=uniques, name="fluxo")
+
+    def share_by(self, day_keys, columns) -> pd.Series:
+        """
+        Participação das estações selecionadas no fluxo total, por chave de dia.
+        """
+        uniques, parte, _ = self.sum_by(day_keys, columns)
+        _, total, _ = self.sum_by(day_keys)
+
+        return pd.Series(parte / total, index=uniques, name="fluxo")
+
+    def mean_matrix(self, column: str = "estacao") -> pd.DataFrame:
+        """
+        Matriz data x chave da dimensão (ex.: 'estacao', que junta as
+        plataformas de um complexo pelo nome) com a média das colunas com
+        registro no dia. Mesmo resultado de station_matrix sobre a tabela
+        fato, sem montar a tabela.
+        """
+        codes, nomes = pd.factorize(self.stations[column].astype(str), sort=True)
+
+        membros = np.zeros((len(self.stations), len(nomes)))
+        membros[np.arange(len(self.stations)), codes] = 1
+
+        mask = self.mask
+        soma = np.where(mask, self.values, 0).astype(np.float64) @ membros
+        contagem = mask.astype(np.float64) @ membros
+
+        with np.errstate(invalid="ignore"):
+            matriz = soma / contagem
+
+        return pd.DataFrame(
+            matriz,
+            index=pd.Index(self.dates.astype("datetime64[us]"), name="data"),
+            columns=pd.Index(nomes, name=column)
+        )
+
+    def to_frame(self, column: str = "estacao") -> pd.DataFrame:
+        """
+        Matriz data x estação como DataFrame (NaN nos dias sem registro).
+        """
+        return pd.DataFrame(
+            self.as_float(),
+            index=pd.Index(self.dates.astype("datetime64[us]"), name="data"),
+            columns=pd.Index(self.stations[column], name=column)
+        )
+
+
+#==============================================================================
+# CONSTRUÇÃO E PERSISTÊNCIA
+
+def cube_paths(name: str) -> dict:
+    return {
+        "values": CUBE_DIR / f"{name}.npy",
+        "stations": CUBE_DIR / f"{name}_stations.parquet",
+        "meta": CUBE_DIR / f"{name}.json"
+    }
+
+
+def build_flow_cube(name: str = HISTORICAL_DATASET) -> FlowCube:
+    """
+    Monta o cubo a partir do dataset processado (via tabela fato) e grava
+    matriz, dimensão de estações e metadados em CUBE_DIR.
+    """
+    fact = load_fact_table(name)
+    paths = cube_paths(name)
+
+    start = int(fact.day.min())
+    end = int(fact.day.max())
+
+    #LINHAS ATÉ 31/12 DO ÚLTIMO ANO (MESES NOVOS ENTRAM SEM REALOCAR)
+    ultimo_ano = np.datetime64(end, "D").astype("datetime64[Y]")
+    n_days = int((ultimo_ano + 1).astype("datetime64[D]").astype(np.int64)) - start
+
+    stations = fact.stations.reset_index(drop=True)
+    stations["cluster_paulista"] = stations["estacao"].isin(PAULISTA_STATIONS).astype(int)
+
+    CUBE_DIR.mkdir(parents=True, exist_ok=True)
+
+    values = np.lib.format.open_memmap(
+        paths["values"], mode="w+", dtype=np.int32, shape=(n_days, len(stations))
+    )
+    values[:] = MISSING
+    values[fact.day - start, fact.station] = fact.fluxo
+    values.flush()
+    del values
+
+    stations.to_parquet(paths["stations"])
+
+    with open(paths["meta"], "w", encoding="utf-8") as f:
+        json.dump({
+            "source_signature": dataset_signature(name),
+            "start": str(np.datetime64(start, "D")),
+            "end": str(np.datetime64(end, "D")),
+            "missing": int(MISSING),
+            "station_keys": STATION_KEYS
+        }, f, indent=2)
+
+    return open_flow_cube(name)
+
+
+def open_flow_cube(name: str = HISTORICAL_DATASET) -> FlowCube:
+    """
+    Abre o cubo gravado (matriz como memmap somente leitura).
+    """
+    paths = cube_paths(name)
+
+    with open(paths["meta"], "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    values = np.load(paths["values"], mmap_mode="r")
+
+    #SÓ OS DIAS JÁ PREENCHIDOS (O ARQUIVO VAI ATÉ O FIM DO ANO)
+    if "end" in meta:
+        values = values[:(np.datetime64(meta["end"], "D") - np.datetime64(meta["start"], "D")).astype(int) + 1]
+
+    return FlowCube(
+        values,
+        meta["start"],
+        pd.read_parquet(paths["stations"])
+    )
+
+
+def load_flow_cube(name: str = HISTORICAL_DATASET, rebuild: bool = False) -> FlowCube:
+    """
+    Abre o cubo do dataset, reconstruindo-o quando não existe, quando
+    o dataset processado mudou desde a última construção ou quando a
+    dimensão gravada não tem as chaves atuais de estação.
+    """
+    paths = cube_paths(name)
+
+    if not rebuild and all(path.exists() for path in paths.values()):
+        with open(paths["meta"], "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if (meta.get("source_signature") == dataset_signature(name)
+                and meta.get("station_keys") == STATION_KEYS):
+            return open_flow_cube(name)
+
+    return build_flow_cube(name)
+
+
+def update_flow_cube(df_new: pd.DataFrame, source_signature: str,
+                    name: str = HISTORICAL_DATASET) -> bool:
+    """
+    Grava no cubo, no lugar, os registros acrescentados ao dataset
+    (ingestão incremental). 'source_signature' é a assinatura do dataset antes do
+    acréscimo: se o cubo não corresponde a ele, ou se os registros caem
+    fora das linhas/estações do cubo, nada é gravado e o cubo é
+    reconstruído na próxima leitura. Retorna True se atualizou.
+    """
+    paths = cube_paths(name)
+
+    if not all(path.exists() for path in paths.values()):
+        return False
+
+    with open(paths["meta"], "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    if meta.get("source_signature") != source_signature or meta.get("station_keys") != STATION_KEYS:
+        return False
+
+    fact = FactTable.from_frame(df_new)
+    stations = pd.read_parquet(paths["stations"])
+
+    #COLUNA DO CUBO DE CADA ESTAÇÃO NOVA, PELO station_id
+    colunas = pd.Index(stations["station_id"]).get_indexer(fact.stations["station_id"])
+    linhas = fact.day.astype(np.int64) - np.datetime64(meta["start"], "D").astype(np.int64)
+
+    values = np.load(paths["values"], mmap_mode="r+")
+
+    if (colunas < 0).any() or linhas.min() < 0 or linhas.max() >= len(values):
+        return False
+
+    values[linhas, colunas[fact.station]] = fact.fluxo
+    values.flush()
+    del values
+
+    meta["end"] = str(max(np.datetime64(meta["end"], "D"), np.datetime64(int(fact.day.max()), "D")))
+    meta["source_signature"] = dataset_signature(name)
+
+    with open(paths["meta"], "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    return True
+#==============================================================================
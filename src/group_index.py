@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+from src.fact_table import key_codes
+
+#GRUPOS DA ANÁLISE COMPARATIVA (MESMA DEFINIÇÃO DE create_analysis_groups)
+ANALYSIS_GROUPS = [
+    "Cluster Paulista",
+    "Linha 2 (sem Paulista)",
+    "Outras Linhas"
+]
+
+
+class GroupIndex:
+    """
+    Índice de grupos calculado uma única vez sobre a tabela.
+
+    Cada partição (ex.: 'grupo', 'linha') ordena as posições das linhas
+    pelo código do grupo, então cada grupo vira um intervalo contíguo.
+    Uma partição é um array de rótulos ou um par (códigos inteiros, nomes).
+    index.fluxo(nome) e index.positions(nome) devolvem views (sem cópia)
+    desses intervalos.
+    """
+
+    def __init__(self, df, partitions: dict):
+        fluxo = np.asarray(df["fluxo"])
+
+        self.n_rows = len(fluxo)
+        self._order = {}
+        self._values = {}
+        self._slices = {}
+
+        for partition, labels in partitions.items():
+            if isinstance(labels, tuple):
+                #CÓDIGOS JÁ INTEIROS: SÓ RENUMERA NA ORDEM DE APARIÇÃO
+                #(-1 = SEM GRUPO, FICA FORA DA FATORAÇÃO E CONTINUA -1)
+                codes, nomes = labels
+                codes = np.asarray(codes)
+                com_grupo = codes >= 0
+
+                renumerados, primeiros = pd.factorize(codes[com_grupo])
+                codes = np.full(len(codes), -1, dtype=renumerados.dtype)
+                codes[com_grupo] = renumerados
+                uniques = np.asarray(nomes, dtype=object)[primeiros]
+            else:
+                codes, uniques = pd.factorize(np.asarray(labels), use_na_sentinel=True)
+
+            #LINHAS SEM GRUPO (CÓDIGO -1) FICAM FORA DA PARTIÇÃO
+            validos = np.flatnonzero(codes >= 0)
+            order = validos[np.argsort(codes[validos], kind="stable")]
+
+            counts = np.bincount(codes[validos], minlength=len(uniques))
+            bounds = np.concatenate([[0], np.cumsum(counts)])
+
+            self._order[partition] = order
+            self._values[partition] = fluxo[order]
+
+            for i, name in enumerate(uniques):
+                self._slices[name] = (partition, bounds[i], bounds[i + 1])
+
+    @property
+    def names(self) -> list:
+        return list(self._slices)
+
+    def __contains__(self, name) -> bool:
+        return name in self._slices
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self.fluxo(name)
+
+    def positions(self, name) -> np.ndarray:
+        """
+        Posições (na tabela original) das linhas do grupo.
+        """
+        partition, start, end = self._slices[name]
+        return self._order[partition][start:end]
+
+    def fluxo(self, name) -> np.ndarray:
+        """
+        Fluxo diário do grupo (view do array da partição, sem cópia).
+        """
+        partition, start, end = self._slices[name]
+        return self._values[partition][start:end]
+
+    def take(self, df, name):
+        """
+        Linhas do grupo na tabela original (DataFrame ou FactTable).
+        """
+        positions = self.positions(name)
+
+        if isinstance(df, pd.DataFrame):
+            return df.iloc[positions]
+
+        return df.take(positions)
+
+    def mean_by(self, name, keys) -> pd.Series:
+        """
+        Média do fluxo do grupo por chave (ex.: mês), com uma única
+        passada de bincount. 'keys' é alinhado à tabela original.
+        """
+        key_name = getattr(keys, "name", None)
+        keys = np.asarray(keys)[self.positions(name)]
+        uniques, inverse = np.unique(keys, return_inverse=True)
+
+        sums = np.bincount(inverse, weights=self.fluxo(name), minlength=len(uniques))
+        counts = np.bincount(inverse, minlength=len(uniques))
+
+        return pd.Series(
+            sums / counts,
+            index=pd.Index(uniques, name=key_name),
+            name="fluxo"
+        )
+
+
+def build_group_index(df) -> GroupIndex:
+    """
+    Índice com os grupos da análise comparativa e os grupos por linha.
+
+    Requer a coluna cluster_paulista (create_paulista_dummy). O Cluster
+    Paulista tem precedência sobre a Linha 2. Outras Linhas segue
+    create_analysis_groups (linha != '2-VERDE') e fica em partição
+    própria, então inclui estações do cluster de outras linhas.
+    """
+    cluster = np.asarray(df["cluster_paulista"]) == 1
+    linha_codes, linhas = key_codes(df, "linha")
+
+    linha2 = (linhas == "2-VERDE")[linha_codes]
+    grupo = np.where(cluster, 0, np.where(linha2, 1, -1))
+    outras = np.where(linha2, -1, 0)
+
+    return GroupIndex(df, {
+        "grupo": (grupo, ANALYSIS_GROUPS[:2]),
+        "outras": (outras, ANALYSIS_GROUPS[2:]),
+        "linha": (linha_codes, linhas)
+    })
+
+
+def group_values(data, name: str = None) -> np.ndarray:
+    """
+    Fluxo de um grupo a partir de um GroupIndex (selecionado por nome),
+    de uma tabela com coluna 'fluxo' ou de uma série/array já pronto.
+    """
+    if isinstance(data, GroupIndex):
+        return data.fluxo(name)
+
+    if isinstance(data, (pd.Series, np.ndarray)):
+        return np.asarray(data)
+
+    return np.asarray(data["fluxo"])
@@ -1,20 +1,431 @@
-from os import stat
+import os
 
 import numpy as np
 import pandas as pd
 from scipy import stats
 
+from concurrent.futures import ProcessPoolExecutor
+
+from src.fact_table import FactTable
+from src.group_index import group_values
+
+#==============================================================================
+# MOMENTOS SUFICIENTES POR GRUPO (n, SOMA, SOMA DOS QUADRADOS)
+
+class GroupMoments:
+    """
+    Momentos suficientes por grupo: n, soma e soma dos quadrados do fluxo.
+
+    Welch, Cohen's d, ANOVA e Eta^2 dependem só desses três valores, então
+    podem ser calculados sem os dados brutos. Momentos de anos, meses ou
+    blocos diferentes são combinados por soma (merge), o que permite
+    atualizar os resultados sem reler o histórico.
+    """
+
+    def __init__(self, names, n, total, total_sq):
+        self.names = list(names)
+        self.n = np.asarray(n, dtype=np.int64)
+        self.total = np.asarray(total, dtype=np.float64)
+        self.total_sq = np.asarray(total_sq, dtype=np.float64)
+        self._pos = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def from_codes(cls, values, codes, names) -> "GroupMoments":
+        """
+        Momentos de todos os grupos em uma única passada (bincount).
+        'codes' indica o grupo de cada valor (-1 = fora de qualquer grupo).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        codes = np.asarray(codes)
+
+        validos = codes >= 0
+        values = values[validos]
+        codes = codes[validos]
+        k = len(names)
+
+        return cls(
+            names,
+            np.bincount(codes, minlength=k),
+            np.bincount(codes, weights=values, minlength=k),
+            np.bincount(codes, weights=values * values, minlength=k)
+        )
+
+    @classmethod
+    def from_groups(cls, groups: dict) -> "GroupMoments":
+        """
+        Momentos a partir de um dicionário {nome: valores}.
+        """
+        values = [np.asarray(v, dtype=np.float64) for v in groups.values()]
+
+        return cls(
+            groups.keys(),
+            [len(v) for v in values],
+            [v.sum() for v in values],
+            [np.dot(v, v) for v in values]
+        )
+
+    @classmethod
+    def from_index(cls, index, names=None) -> "GroupMoments":
+        """
+        Momentos dos grupos de um GroupIndex (usa as views do fluxo).
+        """
+        names = index.names if names is None else names
+        return cls.from_groups({name: index.fluxo(name) for name in names})
+
+    def merge(self, other: "GroupMoments") -> "GroupMoments":
+        """
+        Soma os momentos de duas fontes (ex.: histórico + novo mês).
+        Grupos presentes em só uma das fontes são mantidos.
+        """
+        names = list(dict.fromkeys(self.names + other.names))
+        n = np.zeros(len(names), dtype=np.int64)
+        total = np.zeros(len(names))
+        total_sq = np.zeros(len(names))
+
+        for source in (self, other):
+            pos = [names.index(name) for name in source.names]
+            n[pos] += source.n
+            total[pos] += source.total
+            total_sq[pos] += source.total_sq
+
+        return GroupMoments(names, n, total, total_sq)
+
+    __add__ = merge
+
+    def select(self, names) -> "GroupMoments":
+        pos = [self._pos[name] for name in names]
+        return GroupMoments(names, self.n[pos], self.total[pos], self.total_sq[pos])
+
+    def count(self, name) -> int:
+        return int(self.n[self._pos[name]])
+
+    def mean(self, name) -> float:
+        i = self._pos[name]
+        return self.total[i] / self.n[i]
+
+    def ss(self, name) -> float:
+        """
+        Soma dos quadrados dos desvios em relação à média do grupo.
+        """
+        i = self._pos[name]
+        return self.total_sq[i] - self.total[i] ** 2 / self.n[i]
+
+    def var(self, name) -> float:
+        return self.ss(name) / (self.n[self._pos[name]] - 1)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"n": self.n, "soma": self.total, "soma_quadrados": self.total_sq},
+            index=pd.Index(self.names, name="grupo")
+        )
+
+
+def _welch(n1, mean1, var1, n2, mean2, var2):
+    """
+    Welch (t, p-valor bilateral) a partir de n, média e variância;
+    aceita escalares ou vetores (uma comparação por posição).
+    """
+    v1, v2 = var1 / n1, var2 / n2
+
+    stat = (mean1 - mean2) / np.sqrt(v1 + v2)
+
+    #GRAUS DE LIBERDADE DE WELCH-SATTERTHWAITE
+    dof = (v1 + v2) ** 2 / (v1 ** 2 / (n1 - 1) + v2 ** 2 / (n2 - 1))
+    p_value = 2 * stats.t.sf(np.abs(stat), dof)
+
+    return stat, p_value
+
+
+def _cohens_d(n1, mean1, ss1, n2, mean2, ss2):
+    """
+    Cohen's d (desvio padrão agrupado) a partir de n, média e soma dos
+    quadrados dos desvios; aceita escalares ou vetores.
+    """
+    pooled_std = np.sqrt((ss1 + ss2) / (n1 + n2 - 2))
+
+    return (mean1 - mean2) / pooled_std
+
+
+def welch_from_moments(moments: GroupMoments, name1: str, name2: str):
+    """
+    Estatística t e p-valor (bilateral) do teste de Welch a partir dos momentos.
+    """
+    return _welch(
+        moments.count(name1), moments.mean(name1), moments.var(name1),
+        moments.count(name2), moments.mean(name2), moments.var(name2)
+    )
+
+
+def cohens_d_from_moments(moments: GroupMoments, name1: str, name2: str) -> float:
+    """
+    Cohen's d (desvio padrão agrupado) a partir dos momentos.
+    """
+    return _cohens_d(
+        moments.count(name1), moments.mean(name1), moments.ss(name1),
+        moments.count(name2), moments.mean(name2), moments.ss(name2)
+    )
+
+
+def anova_from_moments(moments: GroupMoments, names=None):
+    """
+    ANOVA de um fator (F, p-valor, SS entre e SS total) a partir dos momentos.
+    """
+    moments = moments if names is None else moments.select(names)
+
+    n = moments.n.astype(np.float64)
+    means = moments.total / n
+    grand_mean = moments.total.sum() / n.sum()
+
+    ss_between = np.sum(n * (means - grand_mean) ** 2)
+    ss_within = np.sum(moments.total_sq - moments.total ** 2 / n)
+
+    df_between = len(n) - 1
+    df_within = n.sum() - len(n)
+
+    stat = (ss_between / df_between) / (ss_within / df_within)
+    p_value = stats.f.sf(stat, df_between, df_within)
+
+    return stat, p_value, ss_between, ss_between + ss_within
+
+
+def eta_squared_from_moments(moments: GroupMoments, names=None) -> float:
+    """
+    Eta^2 (SS entre / SS total) a partir dos momentos.
+    """
+    _, _, ss_between, ss_total = anova_from_moments(moments, names)
+    return ss_between / ss_total
+#==============================================================================
+
+
 #==============================================================================
 # TESTE DE NORMALIDADE
 
+#ACIMA DESTE n O P-VALOR DO SHAPIRO-WILK DO SCIPY NÃO É CONFIÁVEL
+SHAPIRO_MAX_N = 5000
+
+#D'AGOSTINO K^2 EXIGE n >= 8 (TESTE DE ASSIMETRIA)
+DAGOSTINO_MIN_N = 8
+
+
+def _dagostino_k2(n, skew, kurt):
+    """
+    Estatística K^2 de D'Agostino-Pearson (mesmas fórmulas de
+    stats.skewtest / stats.kurtosistest), vetorizada por grupo.
+    'skew' e 'kurt' são os momentos padronizados b1 e b2 (curtose de Pearson).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        #ASSIMETRIA
+        y = skew * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+        beta2 = (3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3)
+                / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9)))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alpha = np.sqrt(2.0 / (w2 - 1))
+        y = np.where(y == 0, 1, y)
+        z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+        #CURTOSE
+        e = 3.0 * (n - 1) / (n + 1)
+        var_b2 = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+        x = (kurt - e) / np.sqrt(var_b2)
+        sqrt_beta1 = (6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9))
+                    * np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3))))
+        a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / sqrt_beta1 ** 2))
+        term1 = 1 - 2 / (9.0 * a)
+        denom = 1 + x * np.sqrt(2 / (a - 4.0))
+        term2 = np.sign(denom) * np.where(
+            denom == 0.0, np.nan, ((1 - 2.0 / a) / np.abs(denom)) ** (1 / 3.0)
+        )
+        z_kurt = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+    k2 = z_skew ** 2 + z_kurt ** 2
+    k2 = np.where(n >= DAGOSTINO_MIN_N, k2, np.nan)
+
+    return k2, stats.chi2.sf(k2, 2)
+
+
+def _anderson_pvalue(a2, n):
+    """
+    P-valor aproximado do Anderson-Darling para normalidade com média e
+    variância estimadas (D'Agostino & Stephens, 1986), vetorizado.
+    """
+    a = a2 * (1 + 0.75 / n + 2.25 / n ** 2)
+
+    #A PARTIR DE A* = 153.467 A APROXIMAÇÃO DEIXA DE SER DECRESCENTE: p = 0
+    with np.errstate(over="ignore"):
+        return np.select(
+            [a >= 153.467, a >= 0.6, a >= 0.34, a >= 0.2],
+            [
+                0.0,
+                np.exp(1.2937 - 5.709 * a + 0.0186 * a ** 2),
+                np.exp(0.9177 - 4.279 * a - 1.38 * a ** 2),
+                1 - np.exp(-8.318 + 42.796 * a - 59.938 * a ** 2)
+            ],
+            default=1 - np.exp(-13.436 + 101.14 * a - 223.73 * a ** 2)
+        )
+
+
+def _shapiro_subsampled(values, rng, max_n: int, n_subsamples: int):
+    """
+    Shapiro-Wilk no grupo inteiro (n <= max_n) ou, acima disso, em
+    'n_subsamples' subamostras de tamanho max_n sem reposição.
+    Retorna a mediana da estatística W e do p-valor entre as subamostras.
+    """
+    if len(values) < 3:
+        return np.nan, np.nan, 0
+
+    if len(values) <= max_n:
+        stat, p_value = stats.shapiro(values)
+        return stat, p_value, 1
+
+    resultados = np.array([
+        stats.shapiro(values[rng.choice(len(values), size=max_n, replace=False)])
+        for _ in range(n_subsamples)
+    ])
+
+    return np.median(resultados[:, 0]), np.median(resultados[:, 1]), n_subsamples
+
+
+def assess_normality(values, labels,
+                    alpha: float = 0.05,
+                    shapiro_max_n: int = SHAPIRO_MAX_N,
+                    n_subsamples: int = 20,
+                    seed: int = 0,
+                    names=None) -> pd.DataFrame:
+    """
+    Avaliação de normalidade de vários grupos em uma única chamada.
+
+    'values' e 'labels' são alinhados (um rótulo por observação). Uma
+    ordenação única por (grupo, valor) dá os quantis de todos os grupos;
+    momentos, D'Agostino K^2 e Anderson-Darling saem de bincount sobre
+    esse array. O Shapiro-Wilk usa o grupo inteiro até shapiro_max_n e
+    subamostras reprodutíveis (semente por grupo) acima disso.
+
+    O teste de decisão depende do tamanho: Shapiro-Wilk até shapiro_max_n,
+    D'Agostino K^2 acima. Com 'names', 'labels' são códigos inteiros
+    (posição em 'names'). Retorna uma linha por grupo.
+    """
+    values = np.asarray(values, dtype=np.float64)
+
+    if names is None:
+        codes, uniques = pd.factorize(np.asarray(labels))
+    else:
+        codes, uniques = np.asarray(labels, dtype=np.int64), np.asarray(names, dtype=object)
+
+    #ORDENAÇÃO ÚNICA: GRUPOS CONTÍGUOS E VALORES CRESCENTES DENTRO DE CADA UM
+    order = np.lexsort((values, codes))
+    v = values[order]
+    c = codes[order]
+
+    n = np.bincount(c, minlength=len(uniques)).astype(np.float64)
+    starts = np.concatenate([[0], np.cumsum(n)[:-1]]).astype(np.int64)
+
+    mean = np.bincount(c, weights=v, minlength=len(uniques)) / n
+    d = v - mean[c]
+
+    m2 = np.bincount(c, weights=d ** 2, minlength=len(uniques)) / n
+    m3 = np.bincount(c, weights=d ** 3, minlength=len(uniques)) / n
+    m4 = np.bincount(c, weights=d ** 4, minlength=len(uniques)) / n
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        skew = m3 / m2 ** 1.5
+        kurt = m4 / m2 ** 2
+        std = np.sqrt(m2 * n / (n - 1))
+
+        #ANDERSON-DARLING: CADA VALOR ORDENADO PAREADO COM SEU ESPELHO NO GRUPO
+        z = d / std[c]
+        i = np.arange(len(v)) - starts[c]
+        espelho = starts[c] + n[c].astype(np.int64) - 1 - i
+        termos = (2 * i + 1) * (stats.norm.logcdf(z) + stats.norm.logsf(z[espelho]))
+        a2 = -n - np.bincount(c, weights=termos, minlength=len(uniques)) / n
+
+    k2, k2_p = _dagostino_k2(n, skew, kurt)
+    ad_p = _anderson_pvalue(a2, n)
+
+    #SHAPIRO-WILK: UMA SEMENTE INDEPENDENTE POR GRUPO
+    seeds = np.random.SeedSequence(seed).spawn(len(uniques))
+    shapiro = np.array([
+        _shapiro_subsampled(
+            v[starts[g]:starts[g] + int(n[g])],
+            np.random.default_rng(seeds[g]),
+            shapiro_max_n,
+            n_subsamples
+        )
+        for g in range(len(uniques))
+    ]).reshape(-1, 3)
+
+    metodo = np.where(
+        n < 3,
+        "insuficiente",
+        np.where(n <= shapiro_max_n, "shapiro", "dagostino")
+    )
+    p_valor = np.where(metodo == "shapiro", shapiro[:, 1], k2_p)
+    p_valor = np.where(metodo == "insuficiente", np.nan, p_valor)
+
+    return pd.DataFrame({
+        "grupo": uniques,
+        "n": n.astype(np.int64),
+        "media": mean,
+        "desvio": std,
+        "assimetria": skew,
+        "curtose": kurt - 3,
+        "shapiro_w": shapiro[:, 0],
+        "shapiro_p": shapiro[:, 1],
+        "shapiro_subamostras": shapiro[:, 2].astype(np.int64),
+        "k2": k2,
+        "k2_p": k2_p,
+        "anderson": a2,
+        "anderson_p": ad_p,
+        "metodo": metodo,
+        "p_valor": p_valor,
+        "normal": p_valor > alpha
+    })
+
+
+def normality_table(df, index, stations: bool = True, **kwargs) -> pd.DataFrame:
+    """
+    Normalidade de todos os grupos do GroupIndex e, opcionalmente, de
+    todas as estações (uma por plataforma linha/sigla, pelo station_id),
+    em uma única chamada de assess_normality com códigos inteiros.
+    A coluna 'nivel' indica se a linha é um grupo ou uma estação.
+    """
+    values = [index.fluxo(name) for name in index.names]
+    codes = [np.full(len(index.fluxo(name)), i) for i, name in enumerate(index.names)]
+    names = list(index.names)
+
+    if stations:
+        fact = df if isinstance(df, FactTable) else FactTable.from_frame(df)
+
+        values.append(fact.fluxo)
+        codes.append(len(names) + fact.station.astype(np.int64))
+        names += list(fact.stations["rotulo"].astype(object))
+
+    table = assess_normality(np.concatenate(values), np.concatenate(codes), names=names, **kwargs)
+    table.insert(0, "nivel", np.where(np.arange(len(table)) < len(index.names), "grupo", "estacao"))
+
+    #ESTAÇÕES DA DIMENSÃO SEM REGISTRO NO RECORTE FICAM DE FORA
+    table = table[(table["nivel"] == "grupo") | (table["n"] > 0)].reset_index(drop=True)
+
+    return table
+
+
 def test_normality(series: pd.Series, group_name: str):
     """
-    Aplica teste de Shapiro-Wilk para verificar normalidade da distribuição dos dados.
+    Avalia a normalidade da distribuição dos dados (assess_normality):
+    Shapiro-Wilk até 5000 observações, D'Agostino K^2 acima disso
+    (Shapiro-Wilk só em subamostras).
+    Aceita a série do grupo ou um GroupIndex (grupo selecionado pelo nome).
     """
-    stat, p_value = stats.shapiro(series)
-    
+    values = group_values(series, group_name)
+    row = assess_normality(values, np.zeros(len(values), dtype=np.int8)).iloc[0]
+
+    stat = row["shapiro_w"] if row["metodo"] == "shapiro" else row["k2"]
+    p_value = row["p_valor"]
+    teste = "Shapiro-Wilk" if row["metodo"] == "shapiro" else "D'Agostino K²"
+
     print(f"\nTeste de Normalidade - {group_name}")
     print("-" * 40)
+    print(f"Teste: {teste} (n = {row['n']})")
     print(f"Estatística:: {stat:.4f}")
     print(f"p-valor: {p_value:.6f}")
     
@@ -35,12 +446,16 @@ def welch_t_test(group1: pd.Series, group2: pd.Series,
     """
     Teste t de Welch para comparação de médias
     (não assume variâncias iguais).
+    Com GroupMoments (o mesmo objeto nos dois argumentos) usa só os momentos.
     """
-    stat, p_value = stats.ttest_ind(
-        group1,
-        group2,
-        equal_var=False
-    )
+    if isinstance(group1, GroupMoments):
+        stat, p_value = welch_from_moments(group1, name1, name2)
+    else:
+        stat, p_value = stats.ttest_ind(
+            group_values(group1, name1),
+            group_values(group2, name2),
+            equal_var=False
+        )
     
     print(f"\nTeste t (Welch) - {name1} vs {name2}")
     print("-" * 40)
@@ -67,8 +482,8 @@ def mann_whitney_test(group1: pd.Series,
     Teste não-paramétrico de Mann-Whitney
     para comapração de duas distribuições independentes.
     """
-    stat, p_value = stats.mannwhitneyu(group1, 
-                                    group2, 
+    stat, p_value = stats.mannwhitneyu(group_values(group1, name1), 
+                                    group_values(group2, name2), 
                                     alternative="two-sided"
     )
     
@@ -95,23 +510,30 @@ def cohens_d(group1: pd.Series,
             name2: str):
     """
     Cálculo do tamanho de efeito Cohen's d para comparação de duas médias.
+    Aceita as séries dos grupos, um GroupIndex ou um GroupMoments.
     """
-    mean1 = group1.mean()
-    mean2 = group2.mean()
-    
-    std1 = group1.std()
-    std2 = group2.std()
-    
-    n1 = len(group1)
-    n2 = len(group2)
-    
-    #Desvio padrão agrupado
-    pooled_std = np.sqrt(
-        ((n1 - 1) * std1**2 + (n2 - 1) * std2**2) /
-        (n1 + n2 - 2)
-    )
-    
-    d= (mean1 - mean2) / pooled_std
+    if isinstance(group1, GroupMoments):
+        d = cohens_d_from_moments(group1, name1, name2)
+    else:
+        group1 = group_values(group1, name1)
+        group2 = group_values(group2, name2)
+        
+        mean1 = group1.mean()
+        mean2 = group2.mean()
+        
+        std1 = group1.std(ddof=1)
+        std2 = group2.std(ddof=1)
+        
+        n1 = len(group1)
+        n2 = len(group2)
+        
+        #Desvio padrão agrupado
+        pooled_std = np.sqrt(
+            ((n1 - 1) * std1**2 + (n2 - 1) * std2**2) /
+            (n1 + n2 - 2)
+        )
+        
+        d= (mean1 - mean2) / pooled_std
     
     print(f"\nCohen's d - {name1} vs {name2}")
     print("-" * 40)
@@ -135,14 +557,228 @@ def cohens_d(group1: pd.Series,
 #==============================================================================
 
 
+#==============================================================================
+# COMPARAÇÕES EM LOTE: TODAS AS ESTAÇÕES E LINHAS
+
+#CORREÇÕES PARA COMPARAÇÕES MÚLTIPLAS ACEITAS EM adjust_pvalues
+CORRECTION_METHODS = ("bh", "holm")
+
+
+def adjust_pvalues(p_values, method: str = "bh") -> np.ndarray:
+    """
+    P-valores ajustados para comparações múltiplas: Benjamini-Hochberg
+    ('bh', controla a FDR) ou Holm ('holm', controla a FWER).
+    NaN fica de fora da família e é mantido no resultado.
+    """
+    if method not in CORRECTION_METHODS:
+        raise ValueError(f"Correção desconhecida: {method} (use {', '.join(CORRECTION_METHODS)})")
+
+    p_values = np.asarray(p_values, dtype=np.float64)
+    ajustados = np.full_like(p_values, np.nan)
+
+    validos = np.flatnonzero(~np.isnan(p_values))
+    m = len(validos)
+    if m == 0:
+        return ajustados
+
+    order = validos[np.argsort(p_values[validos], kind="stable")]
+    p = p_values[order]
+    posicao = np.arange(1, m + 1)
+
+    if method == "bh":
+        #MÍNIMO ACUMULADO DE TRÁS PARA FRENTE DE p * m / posição
+        ajuste = np.minimum.accumulate((p * m / posicao)[::-1])[::-1]
+    else:
+        #MÁXIMO ACUMULADO DE p * (m - posição + 1)
+        ajuste = np.maximum.accumulate(p * (m - posicao + 1))
+
+    ajustados[order] = np.minimum(ajuste, 1.0)
+
+    return ajustados
+
+
+def grouped_rank_sums(values, outer, inner, n_outer: int, n_inner: int):
+    """
+    Postos médios (empates com o posto médio) calculados dentro de cada
+    grupo 'outer' em uma única ordenação. Retorna a soma dos postos por
+    código 'inner' e o termo de empates sum(t^3 - t) por grupo 'outer'.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    outer = np.asarray(outer, dtype=np.int64)
+
+    order = np.lexsort((values, outer))
+    v = values[order]
+    o = outer[order]
+
+    #INÍCIO DE CADA GRUPO E DE CADA SEQUÊNCIA DE EMPATES (MESMO GRUPO E VALOR)
+    novo_grupo = np.r_[True, o[1:] != o[:-1]]
+    nova_sequencia = novo_grupo | np.r_[True, v[1:] != v[:-1]]
+
+    inicio_grupo = np.flatnonzero(novo_grupo)
+    inicio_seq = np.flatnonzero(nova_sequencia)
+    tamanho_seq = np.diff(np.r_[inicio_seq, len(v)])
+
+    #POSTO = POSIÇÃO NO GRUPO + 1; EMPATES RECEBEM A MÉDIA DA SEQUÊNCIA
+    grupo_seq = np.cumsum(novo_grupo)[inicio_seq] - 1
+    posto_seq = inicio_seq - inicio_grupo[grupo_seq] + (tamanho_seq + 1) / 2
+
+    postos = np.repeat(posto_seq, tamanho_seq)
+
+    soma_postos = np.bincount(np.asarray(inner)[order], weights=postos, minlength=n_inner)
+    empates = np.bincount(
+        o[inicio_seq],
+        weights=tamanho_seq.astype(np.float64) ** 3 - tamanho_seq,
+        minlength=n_outer
+    )
+
+    return soma_postos, empates
+
+
+def _rank_chunk(args):
+    values, outer, inner, n_outer, n_inner = args
+    return grouped_rank_sums(values, outer, inner, n_outer, n_inner)
+
+
+def _mann_whitney(n1, soma_postos, n2, empates):
+    """
+    Mann-Whitney (U de name1, p-valor bilateral) pela aproximação normal
+    com correção de continuidade e de empates (como stats.mannwhitneyu
+    com method='asymptotic'); vetorizado por comparação.
+    """
+    n = n1 + n2
+    u1 = soma_postos - n1 * (n1 + 1) / 2
+    u = np.maximum(u1, n1 * n2 - u1)
+
+    mu = n1 * n2 / 2
+    s = np.sqrt(n1 * n2 / 12 * ((n + 1) - empates / (n * (n - 1))))
+
+    z = (u - mu - 0.5) / s
+    p_value = np.minimum(2 * stats.norm.sf(z), 1.0)
+
+    return u1, p_value
+
+
+def batch_comparisons(df,
+                    correction: str = "bh",
+                    alpha: float = 0.05,
+                    max_workers: int = None) -> pd.DataFrame:
+    """
+    Welch, Mann-Whitney e Cohen's d de todas as estações contra o restante
+    da sua linha e de todas as linhas contra o restante do sistema, em
+    uma única chamada.
+
+    Os momentos (n, soma, soma dos quadrados) saem de um bincount por
+    estação; os de linha, sistema e complementos são somas e diferenças
+    desses. Os postos do Mann-Whitney são calculados uma vez por linha
+    (comparações estação vs linha) e uma vez no sistema (linha vs
+    sistema), divididos entre processos por grupos de linhas.
+    Os p-valores de cada teste são corrigidos ('bh' ou 'holm') sobre a
+    família de todas as comparações. Retorna uma linha por comparação.
+    """
+    #ESTAÇÃO = PLATAFORMA (station_id): TRANSFERÊNCIAS APARECEM UMA VEZ POR LINHA
+    fact = df if isinstance(df, FactTable) else FactTable.from_frame(df)
+
+    values = fact.fluxo.astype(np.float64)
+    estacao_codes = fact.station.astype(np.int64)
+    linha_estacao, linhas = pd.factorize(fact.stations["linha"].astype(object))
+    linha_codes = linha_estacao[estacao_codes]
+
+    linhas = np.asarray(linhas, dtype=object)
+    n_linhas, n_estacoes = len(linhas), len(fact.stations)
+    nome_estacao = fact.stations["estacao"].to_numpy(dtype=object)
+
+    #MOMENTOS POR ESTAÇÃO -> LINHA -> SISTEMA
+    moments = GroupMoments.from_codes(values, estacao_codes, list(range(n_estacoes)))
+
+    def por_linha(x):
+        return np.bincount(linha_estacao, weights=x, minlength=n_linhas)
+
+    n_est = moments.n.astype(np.float64)
+    n_lin = por_linha(n_est)
+    soma_lin, quad_lin = por_linha(moments.total), por_linha(moments.total_sq)
+
+    #POSTOS: SISTEMA INTEIRO (LINHAS) + DENTRO DE CADA LINHA (ESTAÇÕES), EM LOTES DE LINHAS
+    workers = max(1, min(max_workers or os.cpu_count() or 1, n_linhas))
+    lotes = np.array_split(np.argsort(-n_lin, kind="stable"), workers)
+
+    tarefas = [(values, np.zeros(len(values), dtype=np.int64), linha_codes, 1, n_linhas)]
+    for lote in lotes:
+        dentro = np.isin(linha_codes, lote)
+        tarefas.append((values[dentro], linha_codes[dentro], estacao_codes[dentro], n_linhas, n_estacoes))
+
+    if workers <= 1:
+        resultados = [_rank_chunk(tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            resultados = list(executor.map(_rank_chunk, tarefas))
+
+    postos_linha, empates_sistema = resultados[0]
+    postos_estacao = sum(r[0] for r in resultados[1:])
+    empates_linha = sum(r[1] for r in resultados[1:])
+
+    #COMPARAÇÃO = GRUPO vs COMPLEMENTO (ESTAÇÕES PRIMEIRO, DEPOIS LINHAS)
+    n1 = np.r_[n_est, n_lin]
+    soma1 = np.r_[moments.total, soma_lin]
+    quad1 = np.r_[moments.total_sq, quad_lin]
+
+    n_ref = np.r_[n_lin[linha_estacao], np.full(n_linhas, n_lin.sum())]
+    soma_ref = np.r_[soma_lin[linha_estacao], np.full(n_linhas, soma_lin.sum())]
+    quad_ref = np.r_[quad_lin[linha_estacao], np.full(n_linhas, quad_lin.sum())]
+
+    n2, soma2, quad2 = n_ref - n1, soma_ref - soma1, quad_ref - quad1
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media1, media2 = soma1 / n1, soma2 / n2
+        ss1, ss2 = quad1 - soma1 * media1, quad2 - soma2 * media2
+
+        welch_t, welch_p = _welch(n1, media1, ss1 / (n1 - 1), n2, media2, ss2 / (n2 - 1))
+        d = _cohens_d(n1, media1, ss1, n2, media2, ss2)
+
+        mw_u, mw_p = _mann_whitney(
+            n1,
+            np.r_[postos_estacao, postos_linha],
+            n2,
+            np.r_[empates_linha[linha_estacao], np.full(n_linhas, empates_sistema[0])]
+        )
+
+    welch_aj = adjust_pvalues(welch_p, correction)
+    mw_aj = adjust_pvalues(mw_p, correction)
+
+    tabela = pd.DataFrame({
+        "nivel": np.r_[np.repeat("estacao", n_estacoes), np.repeat("linha", n_linhas)],
+        "grupo": np.r_[nome_estacao, linhas],
+        "referencia": np.r_[linhas[linha_estacao], np.repeat("Sistema", n_linhas).astype(object)],
+        "n": n1.astype(np.int64),
+        "n_referencia": n2.astype(np.int64),
+        "media": media1,
+        "media_referencia": media2,
+        "welch_t": welch_t,
+        "welch_p": welch_p,
+        "welch_p_ajustado": welch_aj,
+        "mw_u": mw_u,
+        "mw_p": mw_p,
+        "mw_p_ajustado": mw_aj,
+        "cohens_d": d,
+        "significativo": (welch_aj < alpha) & (mw_aj < alpha)
+    })
+
+    #ESTAÇÕES DA DIMENSÃO SEM REGISTRO NO RECORTE FICAM DE FORA
+    return tabela[tabela["n"] > 0].reset_index(drop=True)
+#==============================================================================
+
+
 #==============================================================================
 # TESTE ANOVA
 
 def anova_teste(*groups):
     """
     ANOVA de um fator para comparar múltiplos grupos.
+    Também aceita anova_teste(momentos, "grupo 1", "grupo 2", ...).
     """
-    stat, p_value = stats.f_oneway(*groups)
+    if groups and isinstance(groups[0], GroupMoments):
+        stat, p_value, _, _ = anova_from_moments(groups[0], list(groups[1:]) or None)
+    else:
+        stat, p_value = stats.f_oneway(*groups)
     
     print("\nANOVA - Comparação entre múltiplos grupos")
     print("-" * 40)
@@ -165,23 +801,16 @@ def anova_eta_squared(*groups):
     """
     Cálculo do tamanho de efeito Eta^2 para ANOVA de um fator.
     Mede proporção da variância explicada pelo fator.
+    Também aceita anova_eta_squared(momentos, "grupo 1", "grupo 2", ...).
     """
-    #junta o sgrupos corretamente
-    all_data = np.concatenate(groups)
-    
-    grand_mean = np.mean(all_data)
-    
-    #Soma dos quadrados entre grupos (SS_between)
-    ss_between = sum(
-        len(group) * (np.mean(group) - grand_mean)**2
-        for group in groups
+    if groups and isinstance(groups[0], GroupMoments):
+        eta_sq = eta_squared_from_moments(groups[0], list(groups[1:]) or None)
+    else:
+        #MOMENTOS DE CADA GRUPO (SEM CONCATENAR TODOS OS DADOS)
+        eta_sq = eta_squared_from_moments(
+            GroupMoments.from_groups(dict(enumerate(groups)))
         )
     
-    #Soma dos quadrados total (SS_total)
-    ss_total = np.sum((all_data - grand_mean)**2 )
-    
-    eta_sq = ss_between / ss_total
-    
     print("\nTamanho de Efeito Eta^2 - ANOVA")
     print("-" * 40)
     print(f"Eta^2: {eta_sq:.4f}")
@@ -0,0 +1,415 @@
+import hashlib
+import json
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+#SÓ CAMINHOS NO IMPORT: PANDAS E O PARSER SÃO IMPORTADOS QUANDO HÁ PARSE,
+#ENTÃO UM INGEST SEM ANOS ALTERADOS NÃO CARREGA A PILHA DE DADOS
+from src.paths import (
+    PROCESSED_DIR,
+    HISTORICAL_DATASET,
+    CURRENT_YEAR_DATASET,
+    raw_file_path,
+    processed_path
+)
+
+#DIRETÓRIO DO CACHE DE REPROCESSAMENTO (POR ANO: PARQUET, TOTAIS E MANIFESTO)
+CACHE_DIR = PROCESSED_DIR / "cache"
+
+#CÓDIGO QUE DEFINE O ARTEFATO DO ANO: PARSER + MAPEAMENTO DE ESTAÇÕES (ARQUIVO
+#INTEIRO), CONVERSÃO PARA OS TIPOS DO ARMAZENAMENTO E A COLA DO PARSE
+#(SÓ AS FUNÇÕES, NO FORMATO DE Stage.code EM pipeline.py)
+_SRC_DIR = Path(__file__).resolve().parent
+PARSER_SOURCES = [
+    _SRC_DIR / "data_processing.py",
+    (_SRC_DIR / "storage.py", "as_sorted_category"),
+    (_SRC_DIR / "storage.py", "to_storage_types"),
+    (_SRC_DIR / "ingestion.py", "parse_year")
+]
+
+
+def file_hash(file_path) -> str:
+    """
+    Hash SHA-256 do conteúdo de um arquivo (lido em blocos).
+    """
+    digest = hashlib.sha256()
+
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def parser_version() -> str:
+    """
+    Carimbo de versão do parser: hash do código listado em
+    PARSER_SOURCES. Qualquer alteração nesse código invalida o cache.
+    """
+    from src.pipeline import code_hash
+
+    return code_hash(PARSER_SOURCES)
+
+
+def manifest_path(year) -> Path:
+    return CACHE_DIR / f"manifest_{year}.json"
+
+
+def load_manifest() -> dict:
+    """
+    Entradas do cache por ano ({'2024': {...}}), uma por arquivo
+    manifest_<ano>.json.
+    """
+    manifest = {}
+
+    for path in sorted(CACHE_DIR.glob("manifest_*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            manifest[path.stem.removeprefix("manifest_")] = json.load(f)
+
+    return manifest
+
+
+def save_manifest(manifest: dict, anos=None):
+    """
+    Grava a entrada de cada ano (todos, ou só os de 'anos') no seu
+    próprio arquivo, via arquivo temporário + os.replace. As etapas
+    ingest_<ano> do pipeline rodam em paralelo: cada uma grava só o
+    manifesto do seu ano, sem apagar a entrada que outra acabou de gravar.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    for ano in (manifest if anos is None else [str(ano) for ano in anos]):
+        path = manifest_path(ano)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest[ano], f, indent=2, sort_keys=True)
+
+        os.replace(tmp_path, path)
+
+
+def cache_entry(year) -> dict:
+    """
+    Chave do cache de um ano: hash do arquivo bruto + versão do parser.
+    """
+    return {
+        "raw_sha256": file_hash(raw_file_path(year)),
+        "parser_version": parser_version()
+    }
+
+
+def is_cached(year, manifest: dict = None) -> bool:
+    """
+    Verifica se o artefato do ano está em cache e atualizado.
+    """
+    manifest = load_manifest() if manifest is None else manifest
+    entry = manifest.get(str(year))
+
+    #ENTRADAS ANTIGAS (SEM A COLUNA TOTAL) SÃO REFEITAS
+    if entry is None or "totals" not in entry:
+        return False
+
+    artifacts = [CACHE_DIR / nome for nome in cache_files(entry) + cache_files(entry, totals=True)]
+
+    return all(path.exists() for path in artifacts) and all(
+        entry.get(key) == value for key, value in cache_entry(year).items()
+    )
+
+
+def cache_artifact_path(year) -> Path:
+    return CACHE_DIR / f"metro_{year}.parquet"
+
+
+def cache_totals_path(year) -> Path:
+    return CACHE_DIR / f"metro_{year}_totais.parquet"
+
+
+def cache_part_path(year, numero: int, totals: bool = False) -> Path:
+    sufixo = "_totais" if totals else ""
+    return CACHE_DIR / f"metro_{year}{sufixo}.part-{numero:04d}.parquet"
+
+
+def cache_files(entry: dict, totals: bool = False) -> list:
+    """
+    Arquivos do artefato de um ano (base ou totais): o do parse completo
+    e as partes acrescentadas pela ingestão incremental, na ordem de gravação.
+    """
+    chave = "totals" if totals else "artifact"
+    return [entry[chave]] + [parte[chave] for parte in entry.get("parts", [])]
+
+
+def read_cache(year, manifest: dict = None, totals: bool = False) -> "pd.DataFrame":
+    """
+    Lê o artefato do ano do cache. Com partes acrescentadas, intercala
+    os meses novos na ordem do parse completo (estação -> data), então o
+    resultado é o mesmo de reprocessar o arquivo inteiro.
+    """
+    import pandas as pd
+
+    from src.storage import as_sorted_category, canonical_order
+
+    manifest = load_manifest() if manifest is None else manifest
+    arquivos = cache_files(manifest[str(year)], totals)
+
+    frames = [pd.read_parquet(CACHE_DIR / nome) for nome in arquivos]
+
+    if len(frames) == 1:
+        return frames[0]
+
+    df = pd.concat(frames, ignore_index=True)
+
+    #CATEGORIAS DAS PARTES DIFEREM: REFAZER COMO NO PARSE DO ANO INTEIRO
+    for coluna in ["linha", "sigla", "estacao"]:
+        if coluna in df.columns:
+            df[coluna] = as_sorted_category(df[coluna])
+
+    return canonical_order(df, ["linha"] if totals else ["linha", "sigla"])
+
+
+def parse_year(year, months=None):
+    """
+    Parse de um ano já convertido para os tipos do armazenamento, junto
+    com a coluna TOTAL publicada: (df, totais). 'months' restringe o
+    parse a alguns meses (ex.: ['2025-10']).
+    É a unidade de trabalho executada nos processos do pool.
+    """
+    from src.data_processing import parse_raw_file
+    from src.storage import to_storage_types
+    
+    year = str(year)
+    df_year, totais = parse_raw_file(raw_file_path(year), year=year, totals=True, months=months)
+
+    return to_storage_types(df_year), totais
+
+
+def parse_years(anos, max_workers: int = None):
+    """
+    Faz o parse dos anos em paralelo (um processo por ano) e gera
+    (ano, (df, totais)) na mesma ordem de 'anos', independente de qual termina antes.
+    Com max_workers=1 roda em série no próprio processo.
+    """
+    anos = [str(ano) for ano in anos]
+    workers = min(max_workers or os.cpu_count() or 1, len(anos))
+
+    if workers <= 1:
+        for ano in anos:
+            yield ano, parse_year(ano)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from zip(anos, executor.map(parse_year, anos))
+
+
+def write_cache(year, df_year: "pd.DataFrame", totais: "pd.DataFrame", manifest: dict):
+    """
+    Grava os artefatos do ano (base e totais publicados) no cache e
+    registra no manifesto a chave e o hash de cada mês do arquivo bruto
+    (base da ingestão incremental).
+    """
+    from src.data_processing import raw_file_months
+
+    year = str(year)
+    artifact = cache_artifact_path(year)
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    df_year.to_parquet(artifact, index=False)
+    totais.to_parquet(cache_totals_path(year), index=False)
+
+    #O PARSE COMPLETO SUBSTITUI AS PARTES ACRESCENTADAS
+    for parte in manifest.get(year, {}).get("parts", []):
+        for nome in parte.values():
+            (CACHE_DIR / nome).unlink(missing_ok=True)
+
+    manifest[year] = {
+        **cache_entry(year),
+        "artifact": artifact.name,
+        "totals": cache_totals_path(year).name,
+        "months": raw_file_months(raw_file_path(year))
+    }
+
+
+def load_year(year, force: bool = False) -> "pd.DataFrame":
+    """
+    Retorna a base tipada de um ano.
+
+    Lê do cache quando o arquivo bruto e o código do parser não mudaram;
+    caso contrário roda parse_raw_file e atualiza o cache.
+    """
+    year = str(year)
+    manifest = load_manifest()
+
+    import pandas as pd
+    
+    if not force and is_cached(year, manifest):
+        return read_cache(year, manifest)
+
+    write_cache(year, *parse_year(year), manifest)
+    save_manifest(manifest, [year])
+
+    #RELIDO DO CACHE: MESMA REPRESENTAÇÃO COM OU SEM REPROCESSAMENTO
+    return pd.read_parquet(cache_artifact_path(year))
+
+
+def load_year_totals(year) -> "pd.DataFrame":
+    """
+    Coluna TOTAL publicada de um ano (data, linha, total), do cache;
+    refaz o parse do ano se o cache estiver desatualizado.
+    """
+    if not is_cached(year):
+        load_year(year)
+
+    return read_cache(year, totals=True)
+
+
+def ingest_years(anos,
+                name: str = HISTORICAL_DATASET,
+                force: bool = False,
+                max_workers: int = None) -> list:
+    """
+    Garante a base histórica atualizada para os anos informados.
+
+    Só reprocessa os anos cujo arquivo bruto ou código do parser mudou,
+    distribuindo esses anos entre processos. A base histórica é montada
+    ano a ano, na ordem de 'anos', então o resultado é idêntico ao da
+    execução em série (max_workers=1). Se nada mudou e a base histórica
+    já existe, não faz nenhum parse. Retorna a lista de anos reprocessados.
+    """
+    anos = [str(ano) for ano in anos]
+    manifest = load_manifest()
+
+    stale = [
+        ano for ano in anos
+        if force or not is_cached(ano, manifest)
+    ]
+
+    if not stale and processed_path(name).exists():
+        return []
+    
+    from src.storage import save_processed_parts
+
+    parsed = parse_years(stale, max_workers=max_workers)
+
+    def frames():
+        #UM ANO POR VEZ EM MEMÓRIA NO PROCESSO PRINCIPAL
+        for ano in anos:
+            if ano in stale:
+                _, (df_year, totais) = next(parsed)
+                write_cache(ano, df_year, totais, manifest)
+                print(f"Linhas processadas ({ano}):", len(df_year))
+            else:
+                df_year = read_cache(ano, manifest)
+
+            yield df_year
+
+    try:
+        total = save_processed_parts(frames(), name)
+    finally:
+        parsed.close()
+
+    save_manifest(manifest, stale)
+
+    print("\nTotal consolidado:", total)
+
+    return stale
+
+
+def append_months(anos,
+                name: str = HISTORICAL_DATASET,
+                current_name: str = CURRENT_YEAR_DATASET,
+                thresholds: dict = None):
+    """
+    Ingestão incremental do ano corrente (último de 'anos'), para o
+    arquivo que o Metrô republica a cada mês com um mês a mais.
+
+    Compara os meses do arquivo bruto com os registrados no manifesto e
+    faz o parse só dos meses novos. O trecho novo é validado (limites de
+    validation.py) e então gravado como nova parte no cache do ano e no
+    dataset histórico (sem reescrever o ano nem o consolidado); os CSVs
+    exportados têm só o trecho do ano corrente regravado e o cubo dia x
+    estação é atualizado no lugar. As leituras intercalam as partes na
+    ordem do parse completo: a base e os CSVs ficam iguais aos de um
+    reprocessamento completo.
+
+    Retorna os meses acrescentados ([] se não há mês novo) ou None quando
+    o modo incremental não se aplica: ano fora do cache, parser alterado,
+    outro ano desatualizado ou mês já armazenado republicado com outros
+    valores. Nesse caso o chamador faz a ingestão completa.
+    """
+    anos = [str(ano) for ano in anos]
+    ano = anos[-1]
+    manifest = load_manifest()
+    entry = manifest.get(ano)
+
+    if not processed_path(name).exists() or not all(is_cached(a, manifest) for a in anos[:-1]):
+        return None
+
+    if is_cached(ano, manifest):
+        return []
+
+    if entry is None or "months" not in entry or "totals" not in entry or entry.get("parser_version") != parser_version():
+        return None
+
+    from src.data_processing import raw_file_months
+
+    meses = raw_file_months(raw_file_path(ano))
+
+    if any(meses.get(mes) != digest for mes, digest in entry["months"].items()):
+        return None
+
+    novos = sorted(mes for mes in meses if mes not in entry["months"])
+
+    if novos:
+        from src.fact_table import FactTable
+        from src.flow_cube import update_flow_cube
+        from src.storage import append_processed, export_csv, load_processed, replace_csv_tail, dataset_signature
+        from src.validation import DataQualityError, quality_report, check_thresholds
+
+        df_novo, totais_novo = parse_year(ano, months=novos)
+
+        #VALIDAR O TRECHO NOVO ANTES DE GRAVAR QUALQUER ARTEFATO
+        report = quality_report(FactTable.from_frame(df_novo), totais_novo)
+        violacoes = check_thresholds(report, thresholds)
+
+        if violacoes:
+            raise DataQualityError(violacoes, report)
+
+        fonte = dataset_signature(name)
+        df_anterior = read_cache(ano, manifest)
+
+        #CACHE DO ANO: NOVA PARTE (O ARQUIVO DO PARSE COMPLETO NÃO É REGRAVADO)
+        numero = len(entry.get("parts", [])) + 1
+        parte = {
+            "artifact": cache_part_path(ano, numero).name,
+            "totals": cache_part_path(ano, numero, totals=True).name
+        }
+        df_novo.to_parquet(CACHE_DIR / parte["artifact"], index=False)
+        totais_novo.to_parquet(CACHE_DIR / parte["totals"], index=False)
+
+        entry.update(cache_entry(ano))
+        entry["months"] = meses
+        entry["parts"] = entry.get("parts", []) + [parte]
+
+        df_ano = read_cache(ano, manifest)
+
+        #DATASET HISTÓRICO: SÓ OS REGISTROS NOVOS
+        append_processed(df_novo, name)
+
+        #CSVs: O ANO CORRENTE FECHA O HISTÓRICO, SÓ ESSE TRECHO É REGRAVADO
+        if replace_csv_tail(df_anterior, df_ano, name) is None:
+            export_csv(load_processed(name), name)
+        export_csv(df_ano.drop(columns=["ano"]), current_name)
+
+        cubo = update_flow_cube(df_novo, fonte, name)
+
+        print(f"Linhas acrescentadas ({ano}, {', '.join(novos)}):", len(df_novo))
+        print("Cubo dia x estação:", "atualizado no lugar" if cubo else "será reconstruído na próxima leitura")
+    else:
+        #ARQUIVO ALTERADO FORA DOS DADOS (EX.: NOTAS DE RODAPÉ)
+        entry.update(cache_entry(ano))
+        entry["months"] = meses
+
+    save_manifest(manifest, [ano])
+
+    return novos
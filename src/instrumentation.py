@@ -0,0 +1,497 @@
+import functools
+import importlib
+import inspect
+import json
+import logging
+import multiprocessing
+import os
+import pkgutil
+import time
+import tracemalloc
+
+from pathlib import Path
+
+#LOGGER RAIZ DO PROJETO (MÓDULOS USAM get_logger -> 'metro.<módulo>')
+LOGGER_NAME = "metro"
+
+#VARIÁVEIS DE AMBIENTE: NÍVEL/FORMATO DO LOG E PERFIL (HERDADAS PELOS PROCESSOS FILHOS)
+LOG_LEVEL_ENV = "METRO_LOG_LEVEL"
+LOG_JSON_ENV = "METRO_LOG_JSON"
+PROFILE_ENV = "METRO_PROFILE"
+
+
+#==============================================================================
+# LOG ESTRUTURADO POR NÍVEIS
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Uma linha por evento: 'NÍVEL logger evento chave=valor ...' ou,
+    com as_json=True, um objeto JSON por linha.
+    """
+
+    def __init__(self, as_json: bool = False):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record) -> str:
+        fields = getattr(record, "fields", {})
+
+        if self.as_json:
+            return json.dumps({
+                "ts": record.created,
+                "nivel": record.levelname,
+                "logger": record.name,
+                "evento": record.getMessage(),
+                **fields
+            }, ensure_ascii=False, default=str)
+
+        pares = " ".join(f"{chave}={valor}" for chave, valor in fields.items())
+        return f"{record.levelname:<7} {record.name} {record.getMessage()} {pares}".rstrip()
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def configure_logging(level=None, as_json: bool = None, stream=None) -> logging.Logger:
+    """
+    Liga o log do projeto (stderr por padrão). Sem argumentos usa
+    METRO_LOG_LEVEL / METRO_LOG_JSON; sem configuração nenhuma, só
+    avisos e erros aparecem e eventos de debug não custam nada.
+    """
+    level = level or os.environ.get(LOG_LEVEL_ENV, "WARNING")
+    if as_json is None:
+        as_json = os.environ.get(LOG_JSON_ENV) == "1"
+
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(StructuredFormatter(as_json))
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+
+    #PROCESSOS DO POOL (SPAWN) REPETEM A CONFIGURAÇÃO
+    os.environ[LOG_LEVEL_ENV] = logging.getLevelName(logger.level)
+    os.environ[LOG_JSON_ENV] = "1" if as_json else "0"
+
+    return logger
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields):
+    """
+    Registra um evento com campos estruturados. Se o nível estiver
+    desligado nada é calculado: campos passados como função (ex.:
+    colunas=lambda: df.columns.tolist()) só são avaliados quando o
+    evento é emitido.
+    """
+    if not logger.isEnabledFor(level):
+        return
+
+    fields = {chave: (valor() if callable(valor) else valor) for chave, valor in fields.items()}
+    logger.log(level, event, extra={"fields": fields})
+#==============================================================================
+
+
+#==============================================================================
+# SPANS: TEMPO DE PAREDE, REGISTROS E MEMÓRIA POR CHAMADA
+
+def _count_rows(result):
+    """
+    Registros do resultado (tabelas, arrays, tabela fato); None para o resto.
+    """
+    shape = getattr(result, "shape", None)
+
+    if isinstance(shape, tuple) and shape:
+        return int(shape[0])
+
+    if hasattr(type(result), "__len__") and not isinstance(result, (str, bytes, dict, list, tuple, set)):
+        return len(result)
+
+    return None
+
+
+def _traced_mb():
+    return tracemalloc.get_traced_memory()[0] / 1e6 if tracemalloc.is_tracing() else None
+
+
+class Span:
+    """
+    Trecho medido: nome, início, duração, registros do resultado,
+    variação da memória alocada (tracemalloc) e spans filhos.
+    """
+
+    __slots__ = ["name", "inicio", "segundos", "linhas", "memoria_mb", "attrs", "filhos", "pai", "_memoria0"]
+
+    def __init__(self, name: str, pai=None, **attrs):
+        self.name = name
+        self.pai = pai
+        self.attrs = attrs
+        self.filhos = []
+        self.linhas = None
+        self.segundos = None
+        self.memoria_mb = None
+        self._memoria0 = _traced_mb()
+        self.inicio = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        return {
+            "nome": self.name,
+            "inicio": self.inicio,
+            "segundos": self.segundos,
+            "linhas": self.linhas,
+            "memoria_mb": self.memoria_mb,
+            **({"attrs": self.attrs} if self.attrs else {}),
+            "filhos": [filho.to_dict() for filho in self.filhos]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, pai=None) -> "Span":
+        span = cls.__new__(cls)
+        span.name = data["nome"]
+        span.pai = pai
+        span.attrs = data.get("attrs", {})
+        span.inicio = data["inicio"]
+        span.segundos = data["segundos"]
+        span.linhas = data["linhas"]
+        span.memoria_mb = data["memoria_mb"]
+        span._memoria0 = None
+        span.filhos = [cls.from_dict(filho, span) for filho in data["filhos"]]
+        return span
+
+
+class Profiler:
+    """
+    Árvore de spans do processo. Cada span novo vira filho do span aberto.
+    """
+
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self.roots = []
+        self.stack = []
+
+    def start(self, name: str, **attrs) -> Span:
+        pai = self.stack[-1] if self.stack else None
+        span = Span(name, pai, **attrs)
+
+        (pai.filhos if pai is not None else self.roots).append(span)
+        self.stack.append(span)
+
+        return span
+
+    def stop(self, span: Span, result=None):
+        span.segundos = time.perf_counter() - span.inicio
+
+        memoria = _traced_mb()
+        if memoria is not None and span._memoria0 is not None:
+            span.memoria_mb = memoria - span._memoria0
+
+        if result is not None and span.linhas is None:
+            span.linhas = _count_rows(result)
+
+        #FECHA TAMBÉM SPANS INTERNOS QUE FICARAM ABERTOS (EXCEÇÃO NO MEIO)
+        while self.stack:
+            if self.stack.pop() is span:
+                break
+
+    def attach(self, data: dict):
+        """
+        Acrescenta um span vindo de outro processo (dict de Span.to_dict).
+        """
+        pai = self.stack[-1] if self.stack else None
+        span = Span.from_dict(data, pai)
+        (pai.filhos if pai is not None else self.roots).append(span)
+
+    def detach(self, span: Span) -> dict:
+        """
+        Retira o span da árvore e o devolve como dict (para enviar
+        ao processo principal).
+        """
+        irmaos = span.pai.filhos if span.pai is not None else self.roots
+        if span in irmaos:
+            irmaos.remove(span)
+
+        return span.to_dict()
+
+
+#PERFIL ATIVO (None = DESLIGADO: WRAPPERS CHAMAM A FUNÇÃO DIRETO)
+_PROFILER = None
+
+
+class _SpanContext:
+    __slots__ = ["profiler", "name", "attrs", "span"]
+
+    def __init__(self, profiler, name, attrs):
+        self.profiler = profiler
+        self.name = name
+        self.attrs = attrs
+        self.span = None
+
+    def __enter__(self):
+        self.span = self.profiler.start(self.name, **self.attrs)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.stop(self.span)
+        return False
+
+    def rows(self, n):
+        self.span.linhas = n
+
+    def detach(self):
+        return self.profiler.detach(self.span)
+
+
+class _NullSpan:
+    """
+    Span do perfil desligado: não mede nem aloca nada.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def rows(self, n):
+        pass
+
+    def detach(self):
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **attrs):
+    """
+    Mede um trecho: with span("etapa.x") as s: ...; s.rows(n).
+    Com o perfil desligado devolve um contexto vazio compartilhado.
+    """
+    if _PROFILER is None:
+        return _NULL_SPAN
+
+    return _SpanContext(_PROFILER, name, attrs)
+
+
+def attach_span(data):
+    if _PROFILER is not None and data is not None:
+        _PROFILER.attach(data)
+
+
+def profiling_enabled() -> bool:
+    return _PROFILER is not None
+#==============================================================================
+
+
+#==============================================================================
+# INSTRUMENTAÇÃO DAS FUNÇÕES DE src/
+
+def instrument(func, name: str):
+    """
+    Envolve a função em um span com o nome dado. Com o perfil desligado
+    o wrapper só repassa a chamada.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _PROFILER
+
+        if profiler is None:
+            return func(*args, **kwargs)
+
+        registro = profiler.start(name)
+        result = None
+
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            profiler.stop(registro, result)
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def _instrumentable(obj) -> bool:
+    #GERADORES FICAM DE FORA: O SPAN MEDIRIA SÓ A CRIAÇÃO DO GERADOR
+    return (
+        inspect.isfunction(obj)
+        and not getattr(obj, "__instrumented__", False)
+        and not inspect.isgeneratorfunction(obj)
+    )
+
+
+def instrument_module(module, prefix: str = None) -> dict:
+    """
+    Instrumenta as funções e métodos definidos no módulo (não os
+    importados). Retorna {id(original): (original, wrapper)}.
+    """
+    prefix = prefix or module.__name__.rsplit(".", 1)[-1]
+    trocas = {}
+
+    for nome, obj in list(vars(module).items()):
+        if _instrumentable(obj) and obj.__module__ == module.__name__:
+            wrapper = instrument(obj, f"{prefix}.{nome}")
+            setattr(module, nome, wrapper)
+            trocas[id(obj)] = (obj, wrapper)
+
+        elif inspect.isclass(obj) and obj.__module__ == module.__name__:
+            for atributo, membro in list(vars(obj).items()):
+                if atributo.startswith("__"):
+                    continue
+
+                nome_span = f"{prefix}.{obj.__name__}.{atributo}"
+
+                if isinstance(membro, (classmethod, staticmethod)) and _instrumentable(membro.__func__):
+                    setattr(obj, atributo, type(membro)(instrument(membro.__func__, nome_span)))
+                elif _instrumentable(membro):
+                    setattr(obj, atributo, instrument(membro, nome_span))
+
+    return trocas
+
+
+def instrument_package(package: str = "src"):
+    """
+    Instrumenta todos os módulos do pacote e troca também as referências
+    importadas por nome entre eles (from src.x import f).
+    """
+    pacote = importlib.import_module(package)
+    modulos = [
+        importlib.import_module(f"{package}.{info.name}")
+        for info in pkgutil.iter_modules(pacote.__path__)
+        if f"{package}.{info.name}" != __name__
+    ]
+
+    trocas = {}
+    for module in modulos:
+        trocas.update(instrument_module(module))
+
+    for module in modulos:
+        for nome, obj in list(vars(module).items()):
+            troca = trocas.get(id(obj))
+            if troca is not None and troca[0] is obj:
+                setattr(module, nome, troca[1])
+
+
+def enable_profiling(memory: bool = True, package: str = "src") -> Profiler:
+    """
+    Liga o perfil: instrumenta o pacote e, com memory=True, rastreia a
+    memória alocada (tracemalloc; deixa a execução mais lenta).
+    """
+    global _PROFILER
+
+    if _PROFILER is None:
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        _PROFILER = Profiler(memory)
+        instrument_package(package)
+        os.environ[PROFILE_ENV] = "1" if memory else "nomem"
+
+    return _PROFILER
+
+
+def enable_profiling_from_env():
+    """
+    Em processos do pool: liga o perfil se o processo principal ligou.
+    """
+    modo = os.environ.get(PROFILE_ENV)
+
+    if modo and _PROFILER is None:
+        enable_profiling(memory=(modo == "1"))
+
+    if os.environ.get(LOG_LEVEL_ENV) and not logging.getLogger(LOGGER_NAME).handlers:
+        configure_logging()
+
+
+def in_worker_process() -> bool:
+    return multiprocessing.parent_process() is not None
+#==============================================================================
+
+
+#==============================================================================
+# EXPORTAÇÃO: JSON, FLAMEGRAPH (PILHAS DOBRADAS) E RESUMO
+
+def _walk(spans, caminho=()):
+    for registro in spans:
+        pilha = caminho + (registro.name,)
+        yield pilha, registro
+        yield from _walk(registro.filhos, pilha)
+
+
+def profile_to_dict(profiler: Profiler = None) -> dict:
+    profiler = profiler or _PROFILER
+    return {
+        "memoria": profiler.memory,
+        "spans": [registro.to_dict() for registro in profiler.roots]
+    }
+
+
+def folded_stacks(profiler: Profiler = None) -> list:
+    """
+    Linhas 'a;b;c microssegundos' com o tempo próprio de cada pilha
+    (formato de flamegraph.pl, speedscope e inferno).
+    """
+    profiler = profiler or _PROFILER
+    tempos = {}
+
+    for pilha, registro in _walk(profiler.roots):
+        proprio = (registro.segundos or 0) - sum(filho.segundos or 0 for filho in registro.filhos)
+        chave = ";".join(pilha)
+        tempos[chave] = tempos.get(chave, 0) + max(proprio, 0)
+
+    return [f"{pilha} {round(segundos * 1e6)}" for pilha, segundos in tempos.items()]
+
+
+def profile_summary(profiler: Profiler = None, top: int = 15) -> list:
+    """
+    Funções com maior tempo total: (nome, chamadas, segundos totais,
+    segundos próprios, registros máximos, maior variação de memória).
+    Chamadas recursivas entram uma vez no tempo total.
+    """
+    profiler = profiler or _PROFILER
+    resumo = {}
+
+    for pilha, registro in _walk(profiler.roots):
+        item = resumo.setdefault(registro.name, [0, 0.0, 0.0, None, None])
+        segundos = registro.segundos or 0
+
+        item[0] += 1
+        if registro.name not in pilha[:-1]:
+            item[1] += segundos
+        item[2] += max(segundos - sum(filho.segundos or 0 for filho in registro.filhos), 0)
+
+        if registro.linhas is not None:
+            item[3] = max(item[3] or 0, registro.linhas)
+        if registro.memoria_mb is not None:
+            item[4] = max(item[4] or 0, registro.memoria_mb)
+
+    linhas = [(nome, *valores) for nome, valores in resumo.items()]
+    return sorted(linhas, key=lambda linha: linha[2], reverse=True)[:top]
+
+
+def print_profile_summary(profiler: Profiler = None, top: int = 15, file=None):
+    print(f"\n{'função':<50}{'chamadas':>9}{'total (s)':>11}{'próprio (s)':>13}{'registros':>11}{'Δ mem (MB)':>12}", file=file)
+
+    for nome, chamadas, total, proprio, linhas, memoria in profile_summary(profiler, top):
+        linhas = "-" if linhas is None else linhas
+        memoria = "-" if memoria is None else f"{memoria:.1f}"
+        print(f"{nome:<50}{chamadas:>9}{total:>11.3f}{proprio:>13.3f}{linhas:>11}{memoria:>12}", file=file)
+
+
+def export_profile(path, profiler: Profiler = None) -> Path:
+    """
+    Grava o perfil: '.json' -> árvore de spans; '.folded' ou '.txt' ->
+    pilhas dobradas para flamegraph.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if path.suffix in (".folded", ".txt"):
+        path.write_text("\n".join(folded_stacks(profiler)) + "\n", encoding="utf-8")
+    else:
+        path.write_text(json.dumps(profile_to_dict(profiler), indent=2, ensure_ascii=False), encoding="utf-8")
+
+    return path
+#==============================================================================
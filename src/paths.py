@@ -0,0 +1,33 @@
+import os
+
+from pathlib import Path
+
+#CAMINHOS DO PROJETO (BASEADOS NA RAIZ, COMO EM visualization.py)
+#MÓDULO LEVE (SÓ pathlib): USADO NO CAMINHO RÁPIDO DO INGEST SEM IMPORTAR PANDAS
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+#PASTA DE DADOS (METRO_DATA_DIR TROCA A BASE INTEIRA, EX.: DADOS SINTÉTICOS DOS BENCHMARKS)
+DATA_DIR = Path(os.environ.get("METRO_DATA_DIR", PROJECT_ROOT / "data"))
+RAW_DIR = DATA_DIR / "raw"
+PROCESSED_DIR = DATA_DIR / "processed"
+
+#PASTA DOS GRÁFICOS (METRO_FIGURES_DIR PERMITE GRAVAR EM OUTRO LUGAR)
+FIGURES_DIR = Path(os.environ.get("METRO_FIGURES_DIR", PROJECT_ROOT / "outputs" / "figures"))
+
+#NOMES DOS DATASETS PROCESSADOS
+HISTORICAL_DATASET = "metro_2023_2024_2025_clean"
+CURRENT_YEAR_DATASET = "metro_2025_clean"
+
+
+def raw_file_path(year) -> Path:
+    """
+    Caminho do arquivo bruto anual do Metrô.
+    """
+    return RAW_DIR / f"passageiros_dia_{year}.csv"
+
+
+def processed_path(name: str, suffix: str = ".parquet") -> Path:
+    """
+    Caminho de um dataset processado (parquet por padrão).
+    """
+    return PROCESSED_DIR / f"{name}{suffix}"
@@ -0,0 +1,324 @@
+import ast
+import hashlib
+import inspect
+import io
+import json
+import logging
+import os
+import pickle
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from src.instrumentation import (
+    get_logger,
+    log_event,
+    span,
+    attach_span,
+    enable_profiling_from_env,
+    in_worker_process
+)
+from src.paths import PROCESSED_DIR
+
+logger = get_logger("pipeline")
+
+#ARTEFATOS DAS ETAPAS (UM PICKLE POR SAÍDA) + MANIFESTO DAS CHAVES
+PIPELINE_DIR = PROCESSED_DIR / "pipeline"
+PIPELINE_MANIFEST = PIPELINE_DIR / "manifest.json"
+
+
+#==============================================================================
+# HASH DE CÓDIGO, ARQUIVOS E ARTEFATOS
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def function_source(path, name: str) -> str:
+    """
+    Código-fonte de uma função de um arquivo, lido via ast (sem importar
+    o módulo). Permite que a chave de uma etapa dependa só da função que
+    ela usa, e não do arquivo inteiro.
+    """
+    source = Path(path).read_text(encoding="utf-8")
+
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name == name:
+            return ast.get_source_segment(source, node)
+
+    raise KeyError(f"{name} não encontrado em {path}")
+
+
+def code_hash(code) -> str:
+    """
+    Hash do código de que uma etapa depende. Cada item pode ser um
+    arquivo (Path), uma função (callable) ou um par (arquivo, nome da função).
+    """
+    digest = hashlib.sha256()
+
+    for item in code:
+        if isinstance(item, tuple):
+            digest.update(function_source(*item).encode())
+        elif callable(item):
+            digest.update(inspect.getsource(item).encode())
+        else:
+            digest.update(Path(item).read_bytes())
+
+    return digest.hexdigest()
+
+
+def artifact_path(name: str) -> Path:
+    return PIPELINE_DIR / f"{name}.pkl"
+
+
+def load_artifact(name: str):
+    with open(artifact_path(name), "rb") as f:
+        return pickle.load(f)
+
+
+def save_artifact(name: str, value) -> str:
+    """
+    Grava o artefato e devolve o hash do conteúdo serializado.
+    """
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    PIPELINE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = artifact_path(name).with_suffix(".pkl.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, artifact_path(name))
+
+    return _sha256(data)
+#==============================================================================
+
+
+#==============================================================================
+# ETAPAS
+
+class Stage:
+    """
+    Etapa do pipeline.
+
+    'func' recebe as entradas (artefatos de outras etapas) como argumentos
+    nomeados, mais 'params', e devolve um dict com as saídas declaradas.
+    'code' lista o código de que a etapa depende e 'files' arquivos externos
+    (ex.: arquivo bruto de um ano); ambos entram na chave do cache.
+    """
+
+    def __init__(self, name: str, func, inputs=(), outputs=(), code=(), files=(), params=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+        self.files = list(files)
+        self.params = dict(params or {})
+
+    def key(self, input_hashes: dict) -> str:
+        """
+        Chave da etapa: nome, parâmetros, código, arquivos externos e
+        hash do conteúdo de cada entrada.
+        """
+        digest = hashlib.sha256()
+
+        digest.update(self.name.encode())
+        digest.update(repr(sorted(self.params.items())).encode())
+        digest.update(code_hash(self.code).encode())
+
+        for file_path in self.files:
+            digest.update(_sha256(Path(file_path).read_bytes()).encode())
+
+        for name in self.inputs:
+            digest.update(f"{name}={input_hashes[name]}".encode())
+
+        return digest.hexdigest()
+
+
+def _run_stage(stage: Stage):
+    """
+    Executa a etapa (no processo atual ou em um processo do pool):
+    lê as entradas do disco, grava as saídas e devolve o hash de cada
+    saída, o relatório impresso pela etapa e, em um processo do pool
+    com perfil ligado, o span da etapa.
+    """
+    enable_profiling_from_env()
+
+    with span(f"etapa.{stage.name}") as registro:
+        inputs = {name: load_artifact(name) for name in stage.inputs}
+        report = io.StringIO()
+
+        with redirect_stdout(report):
+            outputs = stage.func(**inputs, **stage.params) or {}
+
+        faltando = set(stage.outputs) - set(outputs)
+        if faltando:
+            raise ValueError(f"Etapa '{stage.name}' não gerou as saídas: {sorted(faltando)}")
+
+        hashes = {name: save_artifact(name, outputs[name]) for name in stage.outputs}
+
+    #SPAN DE UM PROCESSO DO POOL VOLTA PARA A ÁRVORE DO PROCESSO PRINCIPAL
+    perfil = registro.detach() if in_worker_process() else None
+
+    return stage.name, hashes, report.getvalue(), perfil
+#==============================================================================
+
+
+#==============================================================================
+# EXECUÇÃO
+
+class Pipeline:
+    """
+    Grafo de etapas ligadas pelos nomes dos artefatos.
+
+    Uma etapa só roda quando sua chave (código + arquivos + hash das
+    entradas) muda; caso contrário reaproveita os artefatos gravados e
+    repete o relatório guardado. Como a chave usa o conteúdo das entradas,
+    uma etapa refeita que gera o mesmo resultado não propaga reexecuções.
+    Etapas independentes rodam em paralelo, em processos.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.producers = {
+            output: stage.name
+            for stage in self.stages
+            for output in stage.outputs
+        }
+
+        for stage in self.stages:
+            for name in stage.inputs:
+                if name not in self.producers:
+                    raise ValueError(f"Entrada '{name}' da etapa '{stage.name}' não é produzida por nenhuma etapa.")
+
+    def load_manifest(self) -> dict:
+        if not PIPELINE_MANIFEST.exists():
+            return {"stages": {}, "artifacts": {}}
+
+        with open(PIPELINE_MANIFEST, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest: dict):
+        PIPELINE_DIR.mkdir(parents=True, exist_ok=True)
+
+        with open(PIPELINE_MANIFEST, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    def run(self, targets=None, force=(), max_workers: int = None, verbose: bool = True) -> dict:
+        """
+        Executa as etapas necessárias para 'targets' (todas por padrão).
+        'force' lista etapas a refazer mesmo em cache. Os relatórios são
+        impressos na ordem declarada das etapas. Retorna
+        {etapa: 'executada' | 'em cache'}.
+        """
+        stages = self._select(targets)
+        manifest = self.load_manifest()
+        by_name = {stage.name: stage for stage in stages}
+
+        status = {}
+        reports = {}
+        hashes = {}
+        running = {}
+        pending = {}
+        printed = 0
+
+        workers = max_workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        def finish(name, output_hashes, report, situacao):
+            nonlocal printed
+
+            log_event(logger, logging.INFO, "etapa", etapa=name, situacao=situacao)
+
+            hashes.update(output_hashes)
+            reports[name] = report
+            status[name] = situacao
+
+            #CHAVE NOVA SÓ VAI PARA O MANIFESTO DEPOIS QUE A ETAPA TERMINOU
+            if name in pending:
+                manifest["stages"][name] = {"key": pending.pop(name), "report": report}
+
+            manifest["artifacts"].update(output_hashes)
+            self.save_manifest(manifest)
+
+            #RELATÓRIOS NA ORDEM DAS ETAPAS, ASSIM QUE OS ANTERIORES ESTÃO PRONTOS
+            while printed < len(stages) and stages[printed].name in reports:
+                if verbose:
+                    print(reports[stages[printed].name], end="")
+                printed += 1
+
+        try:
+            while len(status) < len(stages):
+                for stage in stages:
+                    if stage.name in status or stage.name in running.values():
+                        continue
+
+                    if not all(name in hashes for name in stage.inputs):
+                        continue
+
+                    key = stage.key(hashes)
+                    entry = manifest["stages"].get(stage.name, {})
+
+                    em_cache = (
+                        stage.name not in force
+                        and entry.get("key") == key
+                        and all(artifact_path(name).exists() for name in stage.outputs)
+                    )
+
+                    if em_cache:
+                        finish(
+                            stage.name,
+                            {name: manifest["artifacts"][name] for name in stage.outputs},
+                            entry.get("report", ""),
+                            "em cache"
+                        )
+                        continue
+
+                    pending[stage.name] = key
+
+                    if executor is None:
+                        name, output_hashes, report, _ = _run_stage(stage)
+                        finish(name, output_hashes, report, "executada")
+                    else:
+                        running[executor.submit(_run_stage, stage)] = stage.name
+
+                if running:
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        running.pop(future)
+                        name, output_hashes, report, perfil = future.result()
+                        attach_span(perfil)
+                        finish(name, output_hashes, report, "executada")
+                elif len(status) < len(stages) and not any(
+                    all(name in hashes for name in by_name[s].inputs)
+                    for s in by_name if s not in status
+                ):
+                    raise RuntimeError("Dependências circulares no pipeline.")
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        return status
+
+    def _select(self, targets) -> list:
+        """
+        Etapas necessárias para os alvos (eles e tudo o que está acima),
+        na ordem declarada.
+        """
+        if targets is None:
+            return self.stages
+
+        by_name = {stage.name: stage for stage in self.stages}
+        needed = set()
+        stack = list(targets)
+
+        while stack:
+            name = stack.pop()
+            if name in needed:
+                continue
+
+            needed.add(name)
+            stack.extend(self.producers[i] for i in by_name[name].inputs)
+
+        return [stage for stage in self.stages if stage.name in needed]
+#==============================================================================
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import multiprocessing
+import os
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.paths import FIGURES_DIR
+from src.pipeline import function_source
+
+#MESMA PASTA DE SAÍDA DAS FUNÇÕES DE visualization.py
+RENDER_MANIFEST = FIGURES_DIR / ".render_manifest.json"
+
+#ARQUIVO GERADO POR CADA FUNÇÃO DE GRÁFICO
+FIGURE_FILES = {
+    "plot_group_means": "comparacao_medias.png",
+    "plot_monthly_trends": "evolucao_mensal.png",
+    "plot_cluster_correlation": "heatmap_cluster_paulista.png",
+    "plot_group_boxplot": "boxplot_comparative.png",
+    "plot_interannual_comparison": "interannual_comparison.png"
+}
+
+#CÓDIGO E ESTILO DOS GRÁFICOS (rcParams, PALETAS, DPI) VIVEM NESTE ARQUIVO
+STYLE_SOURCE = Path(__file__).resolve().parent / "visualization.py"
+
+#FUNÇÕES COMPARTILHADAS POR TODOS OS GRÁFICOS (ESTILO GLOBAL E FINALIZAÇÃO)
+SHARED_STYLE_FUNCTIONS = ["apply_style", "show_figure", "group_summaries"]
+
+
+def figure_code(function: str) -> list:
+    """
+    Código de que um gráfico depende: a própria função e as funções de
+    estilo compartilhadas. Alterar o estilo de um gráfico não invalida os demais.
+    """
+    return [(STYLE_SOURCE, name) for name in [function] + SHARED_STYLE_FUNCTIONS]
+
+
+#==============================================================================
+# HASH DOS DADOS E DO ESTILO
+
+def _update_hash(digest, obj):
+    """
+    Alimenta o hash com o conteúdo (não a identidade) de arrays,
+    tabelas pandas, coleções e objetos com atributos (ex.: GroupIndex).
+    """
+    if isinstance(obj, np.ndarray):
+        digest.update(f"{obj.dtype}{obj.shape}".encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (pd.Series, pd.DataFrame, pd.Index)):
+        digest.update(type(obj).__name__.encode())
+        digest.update(repr(getattr(obj, "columns", getattr(obj, "name", None))).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=repr):
+            _update_hash(digest, key)
+            _update_hash(digest, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        digest.update(f"{type(obj).__name__}{len(obj)}".encode())
+        for item in obj:
+            _update_hash(digest, item)
+    elif hasattr(obj, "__dict__"):
+        digest.update(type(obj).__name__.encode())
+        _update_hash(digest, vars(obj))
+    else:
+        digest.update(repr(obj).encode())
+
+
+def figure_hash(function: str, args) -> str:
+    """
+    Chave de um gráfico: função, dados de entrada, código da função e do
+    estilo compartilhado (figure_code) e versão do matplotlib.
+    """
+    digest = hashlib.sha256()
+
+    digest.update(function.encode())
+    digest.update(matplotlib.__version__.encode())
+    for path, name in figure_code(function):
+        digest.update(function_source(path, name).encode())
+    _update_hash(digest, args)
+
+    return digest.hexdigest()
+
+
+def load_render_manifest() -> dict:
+    if not RENDER_MANIFEST.exists():
+        return {}
+
+    with open(RENDER_MANIFEST, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_render_manifest(manifest: dict):
+    FIGURES_DIR.mkdir(parents=True, exist_ok=True)
+
+    with open(RENDER_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+#==============================================================================
+
+
+#==============================================================================
+# RENDERIZAÇÃO SEM INTERFACE (AGG) EM PROCESSOS
+
+def _init_worker():
+    #BACKEND SEM JANELA ANTES DE QUALQUER IMPORT DO PYPLOT NO PROCESSO
+    matplotlib.use("Agg")
+
+
+def _render_job(job):
+    function, args = job
+
+    from src import visualization
+
+    getattr(visualization, function)(*args)
+    visualization.plt.close("all")
+
+    return function
+
+
+def render_figures(jobs, force: bool = False, max_workers: int = None) -> dict:
+    """
+    Renderiza os gráficos sem bloquear (backend Agg, sem plt.show()),
+    um processo por gráfico.
+
+    'jobs' é uma lista de (nome da função em visualization.py, argumentos).
+    Gráficos cujo hash (dados + estilo) não mudou desde a última execução
+    e cujo PNG ainda existe são pulados. Retorna {função: 'renderizado' | 'sem alteração'}.
+    """
+    manifest = load_render_manifest()
+    status = {}
+    pendentes = []
+
+    for function, args in jobs:
+        key = figure_hash(function, args)
+        output = FIGURES_DIR / FIGURE_FILES[function]
+
+        if not force and manifest.get(function) == key and output.exists():
+            status[function] = "sem alteração"
+            continue
+
+        pendentes.append((function, tuple(args)))
+        manifest[function] = key
+
+    workers = min(max_workers or os.cpu_count() or 1, len(pendentes))
+
+    if workers == 1:
+        _init_worker()
+        for job in pendentes:
+            status[_render_job(job)] = "renderizado"
+    elif workers > 1:
+        #'spawn': PROCESSOS NOVOS, SEM HERDAR UM BACKEND GRÁFICO JÁ ABERTO
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        ) as executor:
+            for function in executor.map(_render_job, pendentes):
+                status[function] = "renderizado"
+
+    save_render_manifest(manifest)
+
+    return status
+#==============================================================================
@@ -0,0 +1,267 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+
+#ORÇAMENTO DE MEMÓRIA PADRÃO POR LOTE DE RÉPLICAS (BYTES, POR PROCESSO)
+DEFAULT_MEMORY_BUDGET = 64 * 1024 ** 2
+
+
+#==============================================================================
+# MOMENTOS DIÁRIOS POR GRUPO
+
+def daily_moments(df, index, names) -> dict:
+    """
+    Momentos de cada grupo por data: n, soma e soma dos quadrados do fluxo
+    (matrizes grupos x datas), mais o fluxo total do sistema por data.
+
+    É a base do bootstrap por blocos de datas: uma réplica é só um vetor
+    de pesos por data, e as estatísticas saem de produtos matriciais.
+    """
+    datas, dia_codes = np.unique(np.asarray(df["data"]), return_inverse=True)
+    n_datas = len(datas)
+
+    n = np.zeros((len(names), n_datas))
+    soma = np.zeros((len(names), n_datas))
+    soma_sq = np.zeros((len(names), n_datas))
+
+    for g, name in enumerate(names):
+        codes = dia_codes[index.positions(name)]
+        values = index.fluxo(name).astype(np.float64)
+
+        n[g] = np.bincount(codes, minlength=n_datas)
+        soma[g] = np.bincount(codes, weights=values, minlength=n_datas)
+        soma_sq[g] = np.bincount(codes, weights=values * values, minlength=n_datas)
+
+    total = np.bincount(
+        dia_codes,
+        weights=np.asarray(df["fluxo"], dtype=np.float64),
+        minlength=n_datas
+    )
+
+    return {
+        "datas": datas,
+        "names": list(names),
+        "n": n,
+        "soma": soma,
+        "soma_sq": soma_sq,
+        "total": total
+    }
+#==============================================================================
+
+
+#==============================================================================
+# ESTATÍSTICAS A PARTIR DE PESOS POR DATA
+
+def weighted_statistics(weights: np.ndarray, daily: dict, i1: int, i2: int) -> np.ndarray:
+    """
+    Estatísticas de cada réplica (linhas de 'weights', réplicas x datas):
+    diferença de médias, Cohen's d e participação do grupo 1 no sistema.
+    """
+    n = weights @ daily["n"].T
+    soma = weights @ daily["soma"].T
+    soma_sq = weights @ daily["soma_sq"].T
+    total = weights @ daily["total"]
+
+    media1 = soma[:, i1] / n[:, i1]
+    media2 = soma[:, i2] / n[:, i2]
+
+    ss1 = soma_sq[:, i1] - soma[:, i1] ** 2 / n[:, i1]
+    ss2 = soma_sq[:, i2] - soma[:, i2] ** 2 / n[:, i2]
+    pooled_std = np.sqrt((ss1 + ss2) / (n[:, i1] + n[:, i2] - 2))
+
+    return np.column_stack([
+        media1 - media2,
+        (media1 - media2) / pooled_std,
+        soma[:, i1] / total
+    ])
+
+
+def block_bootstrap_weights(rng, n_replicas: int, n_datas: int, block_length: int) -> np.ndarray:
+    """
+    Pesos por data de 'n_replicas' réplicas do bootstrap circular por blocos:
+    cada réplica sorteia blocos de 'block_length' dias consecutivos até
+    completar o número de datas. Tudo em arrays de índices, sem laço por réplica.
+    """
+    n_blocos = -(-n_datas // block_length)
+
+    inicios = rng.integers(0, n_datas, size=(n_replicas, n_blocos))
+    indices = (inicios[:, :, None] + np.arange(block_length)) % n_datas
+    indices = indices.reshape(n_replicas, -1)[:, :n_datas]
+
+    #CONTAGEM DE CADA DATA POR RÉPLICA VIA UM ÚNICO BINCOUNT
+    offsets = np.arange(n_replicas)[:, None] * n_datas
+    weights = np.bincount((indices + offsets).ravel(), minlength=n_replicas * n_datas)
+
+    return weights.reshape(n_replicas, n_datas).astype(np.float64)
+
+
+def bootstrap_replica_bytes(n_datas: int, n_grupos: int, block_length: int) -> int:
+    """
+    Memória de trabalho de uma réplica do bootstrap por blocos, somando os
+    arrays alocados em block_bootstrap_weights e weighted_statistics:
+    inícios dos blocos e índices dos dias (int64, mais o temporário do
+    '% n_datas'), índices deslocados e saída do bincount (int64), pesos em
+    float64 e os produtos por grupo (n, soma, soma_sq, total e as 3
+    estatísticas, float64). Por data são 4 int64 + 1 float64 = 40 bytes.
+    """
+    int64 = np.dtype(np.int64).itemsize
+    float64 = np.dtype(np.float64).itemsize
+
+    n_blocos = -(-n_datas // block_length)
+
+    return (
+        n_blocos * int64
+        + 2 * n_blocos * block_length * int64
+        + 2 * n_datas * int64
+        + n_datas * float64
+        + (3 * n_grupos + 1 + 3) * float64
+    )
+
+
+def permutation_replica_bytes(n_valores: int, n1: int) -> int:
+    """
+    Memória de trabalho de uma réplica do teste de permutação, somando os
+    arrays alocados em _permutation_chunk: chaves aleatórias (float64) e
+    índices da ordenação (int64) para todos os valores, os n1 valores
+    reunidos por pooled[perm[:, :n1]] (float64) e soma, médias e
+    diferença da réplica (float64).
+    """
+    int64 = np.dtype(np.int64).itemsize
+    float64 = np.dtype(np.float64).itemsize
+
+    return n_valores * (float64 + int64) + n1 * float64 + 4 * float64
+
+
+def _bootstrap_chunk(args) -> np.ndarray:
+    seed, n_replicas, daily, i1, i2, block_length = args
+
+    rng = np.random.default_rng(seed)
+    weights = block_bootstrap_weights(rng, n_replicas, len(daily["total"]), block_length)
+
+    return weighted_statistics(weights, daily, i1, i2)
+
+
+def _permutation_chunk(args) -> np.ndarray:
+    seed, n_replicas, pooled, n1 = args
+
+    rng = np.random.default_rng(seed)
+
+    #PERMUTAÇÕES EM LOTE: ORDENAR CHAVES ALEATÓRIAS POR LINHA
+    perm = np.argsort(rng.random((n_replicas, len(pooled))), axis=1)
+    soma1 = pooled[perm[:, :n1]].sum(axis=1)
+
+    media1 = soma1 / n1
+    media2 = (pooled.sum() - soma1) / (len(pooled) - n1)
+
+    return media1 - media2
+#==============================================================================
+
+
+#==============================================================================
+# EXECUÇÃO EM LOTES (COM SEMENTES REPRODUTÍVEIS)
+
+def run_chunks(worker, make_args, n_replicas: int, chunk_size: int,
+            seed: int, max_workers: int = None) -> np.ndarray:
+    """
+    Divide as réplicas em lotes de tamanho fixo, cada um com sua própria
+    semente derivada de 'seed' (SeedSequence.spawn). O resultado não depende
+    do número de processos, só de 'seed' e 'chunk_size'.
+    """
+    tamanhos = [
+        min(chunk_size, n_replicas - inicio)
+        for inicio in range(0, n_replicas, chunk_size)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(tamanhos))
+    tarefas = [make_args(s, tamanho) for s, tamanho in zip(seeds, tamanhos)]
+
+    workers = min(max_workers or os.cpu_count() or 1, len(tarefas))
+
+    if workers <= 1:
+        return np.concatenate([worker(tarefa) for tarefa in tarefas])
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return np.concatenate(list(executor.map(worker, tarefas)))
+
+
+def block_bootstrap(daily: dict,
+                    name1: str,
+                    name2: str,
+                    n_replicas: int = 2000,
+                    block_length: int = 7,
+                    confidence: float = 0.95,
+                    seed: int = 0,
+                    max_workers: int = None,
+                    memory_budget: int = DEFAULT_MEMORY_BUDGET) -> pd.DataFrame:
+    """
+    Bootstrap circular por blocos de datas para a comparação name1 vs name2.
+
+    Reamostra dias inteiros (em blocos de 'block_length' dias consecutivos),
+    preservando a autocorrelação e a dependência entre estações no mesmo dia.
+    Retorna estimativa e intervalo percentil para diferença de médias,
+    Cohen's d e participação de name1 no fluxo total do sistema.
+    """
+    i1 = daily["names"].index(name1)
+    i2 = daily["names"].index(name2)
+    n_datas = len(daily["total"])
+
+    #RÉPLICAS POR LOTE LIMITADAS PELO ORÇAMENTO (~40 BYTES POR DATA E RÉPLICA,
+    #VER bootstrap_replica_bytes)
+    chunk_size = max(1, memory_budget // bootstrap_replica_bytes(n_datas, len(daily["names"]), block_length))
+
+    replicas = run_chunks(
+        _bootstrap_chunk,
+        lambda s, tamanho: (s, tamanho, daily, i1, i2, block_length),
+        n_replicas,
+        chunk_size,
+        seed,
+        max_workers
+    )
+
+    observado = weighted_statistics(np.ones((1, n_datas)), daily, i1, i2)[0]
+    alpha = (1 - confidence) / 2
+
+    return pd.DataFrame({
+        "estatistica": ["diferenca_medias", "cohens_d", f"participacao_{name1}"],
+        "estimativa": observado,
+        "ic_inferior": np.quantile(replicas, alpha, axis=0),
+        "ic_superior": np.quantile(replicas, 1 - alpha, axis=0),
+        "replicas": n_replicas
+    })
+
+
+def permutation_test(group1, group2,
+                    n_replicas: int = 2000,
+                    seed: int = 0,
+                    max_workers: int = None,
+                    memory_budget: int = DEFAULT_MEMORY_BUDGET):
+    """
+    Teste de permutação (bilateral) para a diferença de médias.
+    Retorna a diferença observada e o p-valor.
+    """
+    group1 = np.asarray(group1, dtype=np.float64)
+    group2 = np.asarray(group2, dtype=np.float64)
+
+    pooled = np.concatenate([group1, group2])
+    n1 = len(group1)
+
+    #RÉPLICAS POR LOTE LIMITADAS PELO ORÇAMENTO (CHAVES, ÍNDICES E VALORES
+    #REUNIDOS DO GRUPO 1, VER permutation_replica_bytes)
+    chunk_size = max(1, memory_budget // permutation_replica_bytes(len(pooled), n1))
+
+    replicas = run_chunks(
+        _permutation_chunk,
+        lambda s, tamanho: (s, tamanho, pooled, n1),
+        n_replicas,
+        chunk_size,
+        seed,
+        max_workers
+    )
+
+    observado = group1.mean() - group2.mean()
+    p_value = (1 + np.sum(np.abs(replicas) >= abs(observado))) / (n_replicas + 1)
+
+    return observado, p_value
+#==============================================================================
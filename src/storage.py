@@ -0,0 +1,265 @@
+import hashlib
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pathlib import Path
+
+from src.fact_table import FactTable
+from src.instrumentation import get_logger, log_event
+from src.paths import PROCESSED_DIR, HISTORICAL_DATASET, processed_path
+
+logger = get_logger("storage")
+
+#COLUNAS ARMAZENADAS COMO CATEGORIAS (DICIONÁRIO NO PARQUET)
+CATEGORICAL_COLUMNS = ["linha", "sigla", "estacao"]
+
+
+def as_sorted_category(series: pd.Series) -> pd.Categorical:
+    """
+    Converte para categoria com as categorias em ordem alfabética,
+    mantendo a mesma ordem de exibição das colunas de texto.
+    """
+    values = series.astype("category").array
+    return values.reorder_categories(sorted(values.categories))
+
+
+def to_storage_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte a tabela longa para os tipos do armazenamento colunar:
+    linha/sigla/estacao como categorias, fluxo int32, data datetime
+    e ano int16 (usado no filtro por ano na leitura).
+    """
+    #LINHAS SEM DATA VÁLIDA NÃO ENTRAM NO ARMAZENAMENTO
+    df = df[df["data"].notna()]
+
+    df_store = pd.DataFrame({
+        "data": pd.to_datetime(df["data"]).array,
+        "linha": as_sorted_category(df["linha"]),
+        "sigla": as_sorted_category(df["sigla"]),
+        "estacao": as_sorted_category(df["estacao"]),
+        "fluxo": df["fluxo"].to_numpy(dtype=np.int32),
+    })
+    df_store["ano"] = df_store["data"].dt.year.astype(np.int16)
+
+    return df_store
+
+
+def canonical_order(df: pd.DataFrame, keys) -> pd.DataFrame:
+    """
+    Reordena partes concatenadas para a ordem do parse completo: grupos
+    de 'keys' (ex.: linha, sigla) na ordem em que aparecem pela primeira
+    vez, que é a das colunas do arquivo bruto, e dentro de cada grupo a
+    ordem das partes (datas crescentes, os meses novos vêm depois).
+    """
+    grupo = df.groupby(keys, sort=False, observed=True).ngroup().to_numpy()
+    return df.iloc[np.argsort(grupo, kind="stable")].reset_index(drop=True)
+
+
+def delta_paths(name: str = HISTORICAL_DATASET) -> list:
+    """
+    Partes acrescentadas ao dataset pela ingestão incremental
+    ('{name}.delta-0001.parquet', ...), em ordem de gravação.
+    """
+    return sorted(PROCESSED_DIR.glob(f"{name}.delta-*.parquet"))
+
+
+def dataset_files(name: str = HISTORICAL_DATASET) -> list:
+    """
+    Arquivos que compõem o dataset: o parquet consolidado e as partes
+    acrescentadas depois dele.
+    """
+    return [processed_path(name)] + delta_paths(name)
+
+
+def dataset_signature(name: str = HISTORICAL_DATASET) -> str:
+    """
+    Assinatura do dataset (parquet consolidado + partes acrescentadas)
+    pelos metadados de cada arquivo: nome, tamanho, mtime em ns e inode.
+    Não lê o conteúdo, então conferir se o cubo está atualizado custa
+    um stat por arquivo. Regravar o dataset ou acrescentar uma parte
+    muda a assinatura.
+    """
+    partes = []
+
+    for path in dataset_files(name):
+        info = path.stat()
+        partes.append(f"{path.name}:{info.st_size}:{info.st_mtime_ns}:{info.st_ino}")
+
+    return hashlib.sha256("|".join(partes).encode()).hexdigest()
+
+
+def remove_deltas(name: str = HISTORICAL_DATASET):
+    for path in delta_paths(name):
+        path.unlink()
+
+
+def save_processed(df: pd.DataFrame, name: str = HISTORICAL_DATASET) -> Path:
+    """
+    Salva o dataset processado em parquet (colunar, tipado).
+    """
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+
+    file_path = processed_path(name)
+
+    to_storage_types(df).to_parquet(file_path, index=False)
+    remove_deltas(name)
+
+    return file_path
+
+
+def append_processed(df: pd.DataFrame, name: str = HISTORICAL_DATASET) -> Path:
+    """
+    Acrescenta registros ao dataset como uma nova parte, sem reescrever
+    o parquet consolidado (custo proporcional aos registros novos).
+    A próxima consolidação completa junta as partes ao arquivo principal.
+    """
+    numero = len(delta_paths(name)) + 1
+    file_path = processed_path(name, f".delta-{numero:04d}.parquet")
+
+    to_storage_types(df).to_parquet(file_path, index=False)
+
+    return file_path
+
+
+def save_processed_parts(frames, name: str = HISTORICAL_DATASET) -> int:
+    """
+    Salva o dataset processado a partir de partes (ex.: um DataFrame por ano),
+    escrevendo cada parte como um bloco do parquet assim que chega.
+    Só uma parte fica em memória por vez. Retorna o total de linhas.
+    """
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+
+    file_path = processed_path(name)
+    tmp_path = processed_path(name, ".parquet.tmp")
+
+    writer = None
+    total = 0
+
+    try:
+        for df in frames:
+            table = pa.Table.from_pandas(to_storage_types(df), preserve_index=False)
+
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+
+            #CATEGORIAS DIFEREM ENTRE PARTES: ALINHAR AO ESQUEMA DA PRIMEIRA
+            writer.write_table(table.cast(writer.schema))
+            total += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+
+    #SUBSTITUIR O ARQUIVO SÓ DEPOIS DE ESCRITO POR COMPLETO
+    #(A BASE CONSOLIDADA JÁ INCLUI AS PARTES ACRESCENTADAS)
+    if writer is not None:
+        os.replace(tmp_path, file_path)
+        remove_deltas(name)
+
+    return total
+
+
+def load_processed(name: str = HISTORICAL_DATASET,
+                columns=None,
+                anos=None,
+                linhas=None) -> pd.DataFrame:
+    """
+    Carrega um dataset processado do parquet.
+
+    Permite ler apenas algumas colunas e filtrar por ano e/ou linha
+    na própria leitura, sem carregar o restante da base. Inclui as
+    partes acrescentadas pela ingestão incremental.
+    """
+    filters = []
+
+    if anos is not None:
+        filters.append(("ano", "in", [int(ano) for ano in anos]))
+
+    if linhas is not None:
+        filters.append(("linha", "in", list(linhas)))
+
+    arquivos = dataset_files(name)
+
+    if len(arquivos) == 1:
+        df = pd.read_parquet(arquivos[0], columns=columns, filters=filters or None)
+        return df.reset_index(drop=True)
+
+    #PARTES ACRESCENTADAS: INTERCALAR NA ORDEM DA CONSOLIDAÇÃO COMPLETA
+    #(ANO -> LINHA/SIGLA -> DATA), LENDO AS CHAVES SE NÃO FORAM PEDIDAS
+    chaves = ["ano", "linha", "sigla"]
+    leitura = None if columns is None else list(columns) + [c for c in chaves if c not in columns]
+
+    df = pd.read_parquet([str(path) for path in arquivos], columns=leitura, filters=filters or None)
+    df = canonical_order(df, chaves)
+
+    return df if columns is None else df[list(columns)]
+
+
+def load_fact_table(name: str = HISTORICAL_DATASET,
+                    anos=None,
+                    linhas=None) -> FactTable:
+    """
+    Carrega o dataset processado como tabela fato compacta
+    (códigos inteiros + dimensões). A memória antes e depois vai para
+    o log (DEBUG).
+    """
+    df = load_processed(
+        name,
+        columns=["data", "linha", "sigla", "estacao", "fluxo"],
+        anos=anos,
+        linhas=linhas
+    )
+
+    fact = FactTable.from_frame(df)
+
+    log_event(
+        logger, logging.DEBUG, "memoria",
+        longa_mb=lambda: round(df.memory_usage(deep=True).sum() / 1e6, 2),
+        fato_mb=lambda: round(fact.memory_usage() / 1e6, 2)
+    )
+
+    return fact
+
+
+def export_csv(df: pd.DataFrame, name: str) -> Path:
+    """
+    Exporta um dataset processado em CSV (formato de exportação,
+    não é relido pelo pipeline).
+    """
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+
+    file_path = processed_path(name, ".csv")
+    df.to_csv(file_path, index=False)
+
+    return file_path
+
+
+def replace_csv_tail(anterior: pd.DataFrame, atual: pd.DataFrame, name: str):
+    """
+    Troca o trecho final do CSV exportado, igual a 'anterior' (ex.: o ano
+    corrente como foi exportado), por 'atual', sem reescrever o restante
+    do arquivo. Retorna None se o CSV não existe ou não termina em
+    'anterior' (o chamador exporta do zero).
+    """
+    file_path = processed_path(name, ".csv")
+
+    if not file_path.exists():
+        return None
+
+    trecho = anterior.to_csv(index=False, header=False).encode()
+
+    with open(file_path, "r+b") as f:
+        inicio = f.seek(0, os.SEEK_END) - len(trecho)
+
+        if inicio < 0 or f.seek(inicio) != inicio or f.read() != trecho:
+            return None
+
+        f.seek(inicio)
+        f.truncate()
+        f.write(atual.to_csv(index=False, header=False).encode())
+
+    return file_path
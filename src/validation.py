@@ -0,0 +1,280 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing import UNKNOWN_STATION
+from src.paths import PROCESSED_DIR
+
+#RELATÓRIO DE QUALIDADE DA ÚLTIMA VALIDAÇÃO (JSON)
+QUALITY_REPORT = PROCESSED_DIR / "quality_report.json"
+
+#ARREDONDAMENTO DO ARQUIVO: 0,1 MIL = 100 PASSAGEIROS POR VALOR PUBLICADO
+ROUNDING_STEP = 100
+
+#LIMITES ACEITOS ANTES DE INTERROMPER A EXECUÇÃO
+DEFAULT_THRESHOLDS = {
+    #PARES (LINHA, SIGLA) SEM ESTAÇÃO NO MAPEAMENTO
+    "pares_nao_mapeados": 0,
+    #REGISTROS REPETIDOS PARA A MESMA ESTAÇÃO NO MESMO DIA
+    "chaves_duplicadas": 0,
+    #% DE ESTAÇÃO-DIAS DO CALENDÁRIO SEM REGISTRO ('-' NO ARQUIVO, DIAS FALTANDO)
+    "dias_faltantes_pct": 1.0,
+    #% DE LINHA-DIAS CUJA SOMA DAS ESTAÇÕES FOGE DO TOTAL PUBLICADO
+    "divergencias_total_pct": 1.0
+}
+
+#EXEMPLOS GUARDADOS NO RELATÓRIO POR VERIFICAÇÃO
+MAX_EXAMPLES = 20
+
+
+class DataQualityError(ValueError):
+    """
+    Base fora dos limites de qualidade. 'report' traz o relatório completo.
+    """
+
+    def __init__(self, violacoes: list, report: dict):
+        super().__init__("Base fora dos limites de qualidade: " + "; ".join(violacoes))
+        self.violacoes = violacoes
+        self.report = report
+
+
+def _day_range(fact):
+    inicio = int(fact.day.min())
+    return inicio, int(fact.day.max()) - inicio + 1
+
+
+def _date(day) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+#==============================================================================
+# VERIFICAÇÕES (OPERAÇÕES AGRUPADAS SOBRE OS CÓDIGOS DA TABELA FATO)
+
+def unmapped_pairs(fact) -> list:
+    """
+    Pares (linha, sigla) sem nome de estação no mapeamento, com o número
+    de registros de cada um.
+    """
+    registros = np.bincount(fact.station, minlength=len(fact.stations))
+    desconhecidas = np.flatnonzero(fact.stations["estacao"].to_numpy(dtype=object) == UNKNOWN_STATION)
+
+    return [
+        {
+            "linha": str(fact.stations["linha"].iloc[i]),
+            "sigla": str(fact.stations["sigla"].iloc[i]),
+            "registros": int(registros[i])
+        }
+        for i in desconhecidas
+    ]
+
+
+def station_day_counts(fact) -> np.ndarray:
+    """
+    Matriz dia x estação com o número de registros de cada par, sobre o
+    calendário completo da base (uma passada de bincount).
+    """
+    inicio, n_dias = _day_range(fact)
+    n_estacoes = len(fact.stations)
+
+    chave = (fact.day.astype(np.int64) - inicio) * n_estacoes + fact.station
+    return np.bincount(chave, minlength=n_dias * n_estacoes).reshape(n_dias, n_estacoes)
+
+
+def duplicate_keys(fact, contagem: np.ndarray = None) -> dict:
+    """
+    Chaves (data, estação) com mais de um registro. Estação é o par
+    (linha, sigla): estações de transferência com o mesmo nome em linhas
+    diferentes não são duplicatas.
+    """
+    contagem = station_day_counts(fact) if contagem is None else contagem
+    inicio, _ = _day_range(fact)
+
+    dias, estacoes = np.nonzero(contagem > 1)
+
+    return {
+        "quantidade": int((contagem[dias, estacoes] - 1).sum()),
+        "exemplos": [
+            {
+                "data": _date(inicio + d),
+                "linha": str(fact.stations["linha"].iloc[e]),
+                "sigla": str(fact.stations["sigla"].iloc[e]),
+                "registros": int(contagem[d, e])
+            }
+            for d, e in zip(dias[:MAX_EXAMPLES], estacoes[:MAX_EXAMPLES])
+        ]
+    }
+
+
+def missing_days(fact, contagem: np.ndarray = None) -> dict:
+    """
+    Dias do calendário (do primeiro ao último dia da base) sem registro,
+    por estação.
+    """
+    contagem = station_day_counts(fact) if contagem is None else contagem
+    n_dias, n_estacoes = contagem.shape
+
+    faltantes = (contagem == 0).sum(axis=0)
+    com_falta = np.flatnonzero(faltantes)
+
+    return {
+        "total": int(faltantes.sum()),
+        "pct": float(100 * faltantes.sum() / (n_dias * n_estacoes)) if n_estacoes else 0.0,
+        "por_estacao": [
+            {
+                "linha": str(fact.stations["linha"].iloc[e]),
+                "sigla": str(fact.stations["sigla"].iloc[e]),
+                "estacao": str(fact.stations["estacao"].iloc[e]),
+                "faltantes": int(faltantes[e])
+            }
+            for e in com_falta[np.argsort(-faltantes[com_falta], kind="stable")]
+        ]
+    }
+
+
+def reconcile_totals(fact, totais: pd.DataFrame) -> dict:
+    """
+    Compara, por linha e dia, a soma das estações com a coluna TOTAL
+    publicada. Diferenças dentro do arredondamento do arquivo (meia
+    unidade de 0,1 mil por estação da linha) não contam como divergência.
+    """
+    inicio, n_dias = _day_range(fact)
+
+    linhas = pd.Index(fact.stations["linha"].astype(str).unique())
+    linha_estacao = linhas.get_indexer(fact.stations["linha"].astype(str))
+    n_linhas = len(linhas)
+
+    #SOMA DAS ESTAÇÕES POR (DIA, LINHA)
+    chave = (fact.day.astype(np.int64) - inicio) * n_linhas + linha_estacao[fact.station]
+    soma = np.bincount(chave, weights=fact.fluxo, minlength=n_dias * n_linhas)
+    registros = np.bincount(chave, minlength=n_dias * n_linhas)
+
+    #TOTAL PUBLICADO NO MESMO ESPAÇO DE CHAVES (LINHAS FORA DA BASE FICAM DE FORA)
+    dia_total = pd.to_datetime(totais["data"]).to_numpy().astype("datetime64[D]").astype(np.int64) - inicio
+    linha_total = linhas.get_indexer(totais["linha"].astype(str))
+    dentro = (linha_total >= 0) & (dia_total >= 0) & (dia_total < n_dias)
+
+    chave_total = dia_total[dentro] * n_linhas + linha_total[dentro]
+    publicado = np.bincount(chave_total, weights=totais["total"].to_numpy()[dentro], minlength=n_dias * n_linhas)
+    tem_total = np.bincount(chave_total, minlength=n_dias * n_linhas) > 0
+
+    #TOLERÂNCIA = ARREDONDAMENTO DE CADA ESTAÇÃO DA LINHA + O DO PRÓPRIO TOTAL
+    estacoes_linha = np.bincount(linha_estacao, minlength=n_linhas)
+    tolerancia = (np.tile(estacoes_linha, n_dias) + 1) * ROUNDING_STEP / 2
+
+    comparados = tem_total & (registros > 0)
+    diferenca = soma - publicado
+    divergente = comparados & (np.abs(diferenca) > tolerancia)
+
+    posicoes = np.flatnonzero(divergente)
+    posicoes = posicoes[np.argsort(-np.abs(diferenca[posicoes]), kind="stable")]
+
+    por_linha = np.bincount(np.flatnonzero(divergente) % n_linhas, minlength=n_linhas)
+
+    return {
+        "linha_dias": int(comparados.sum()),
+        "divergentes": int(divergente.sum()),
+        "pct": float(100 * divergente.sum() / comparados.sum()) if comparados.any() else 0.0,
+        "sem_total_publicado": int(((registros > 0) & ~tem_total).sum()),
+        "maior_diferenca": int(np.abs(diferenca[comparados]).max()) if comparados.any() else 0,
+        "por_linha": {linha: int(n) for linha, n in zip(linhas, por_linha)},
+        "exemplos": [
+            {
+                "data": _date(inicio + p // n_linhas),
+                "linha": linhas[p % n_linhas],
+                "soma_estacoes": int(soma[p]),
+                "total_publicado": int(publicado[p]),
+                "diferenca": int(diferenca[p])
+            }
+            for p in posicoes[:MAX_EXAMPLES]
+        ]
+    }
+#==============================================================================
+
+
+#==============================================================================
+# RELATÓRIO E LIMITES
+
+def quality_report(fact, totais: pd.DataFrame) -> dict:
+    """
+    Relatório de qualidade da base (dict serializável em JSON).
+    """
+    inicio, n_dias = _day_range(fact)
+    contagem = station_day_counts(fact)
+
+    return {
+        "registros": len(fact),
+        "estacoes": len(fact.stations),
+        "periodo": [_date(inicio), _date(inicio + n_dias - 1)],
+        "pares_nao_mapeados": unmapped_pairs(fact),
+        "chaves_duplicadas": duplicate_keys(fact, contagem),
+        "dias_faltantes": missing_days(fact, contagem),
+        "conciliacao_total": reconcile_totals(fact, totais)
+    }
+
+
+def check_thresholds(report: dict, thresholds: dict = None) -> list:
+    """
+    Lista as verificações acima dos limites (vazia = base aprovada).
+    """
+    limites = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+
+    medidas = {
+        "pares_nao_mapeados": len(report["pares_nao_mapeados"]),
+        "chaves_duplicadas": report["chaves_duplicadas"]["quantidade"],
+        "dias_faltantes_pct": report["dias_faltantes"]["pct"],
+        "divergencias_total_pct": report["conciliacao_total"]["pct"]
+    }
+
+    return [
+        f"{nome} = {medidas[nome]:.4g} (limite {limite})"
+        for nome, limite in limites.items()
+        if medidas[nome] > limite
+    ]
+
+
+def save_quality_report(report: dict, path=QUALITY_REPORT):
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    return path
+
+
+def validate(fact, totais: pd.DataFrame, thresholds: dict = None, fail: bool = True) -> dict:
+    """
+    Gera o relatório, registra as violações dos limites e o grava em
+    QUALITY_REPORT. Com fail=True levanta DataQualityError se algum
+    limite foi excedido.
+    """
+    report = quality_report(fact, totais)
+    report["limites"] = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    report["violacoes"] = check_thresholds(report, thresholds)
+    report["aprovada"] = not report["violacoes"]
+
+    save_quality_report(report)
+
+    if fail and report["violacoes"]:
+        raise DataQualityError(report["violacoes"], report)
+
+    return report
+
+
+def print_quality_report(report: dict):
+    conciliacao = report["conciliacao_total"]
+
+    print("\n" + "="*50)
+    print("QUALIDADE DA BASE")
+    print("="*50)
+
+    print(f"\nRegistros: {report['registros']} | Estações: {report['estacoes']} | Período: {report['periodo'][0]} a {report['periodo'][1]}")
+    print(f"Pares (linha, sigla) não mapeados: {len(report['pares_nao_mapeados'])}")
+    print(f"Chaves (data, estação) duplicadas: {report['chaves_duplicadas']['quantidade']}")
+    print(f"Estação-dias sem registro: {report['dias_faltantes']['total']} ({report['dias_faltantes']['pct']:.3f}%)")
+    print(
+        f"Linha-dias divergentes do TOTAL publicado: {conciliacao['divergentes']} de {conciliacao['linha_dias']} "
+        f"({conciliacao['pct']:.3f}%, maior diferença {conciliacao['maior_diferenca']} passageiros)"
+    )
+    print("Base aprovada" if report["aprovada"] else "VIOLAÇÕES: " + "; ".join(report["violacoes"]))
+#==============================================================================
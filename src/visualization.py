@@ -1,37 +1,66 @@
+import matplotlib
 import matplotlib.pyplot as plt
 import seaborn as sns
-import numpy as np
-import os
-import pandas as pd
 
-from pathlib import Path
+from src.descriptive_analysis import box_summary
+from src.group_index import ANALYSIS_GROUPS
+from src.paths import FIGURES_DIR
 
-plt.rcParams.update({
-    "font.family": "sans-serif",
-    "font.size": 11,
-    "axes.titlesize": 14,
-    "axes.labelsize": 11
-})
+def apply_style():
+    """
+    Estilo global dos gráficos (rcParams + tema do seaborn). Aplicado
+    pelas funções de gráfico, não no import do módulo.
+    """
+    plt.rcParams.update({
+        "font.family": "sans-serif",
+        "font.size": 11,
+        "axes.titlesize": 14,
+        "axes.labelsize": 11
+    })
+    
+    sns.set(style="whitegrid")
 
-sns.set(style="whitegrid")
+def show_figure():
+    """
+    Exibe o gráfico em backends interativos. No modo sem interface
+    (Agg, usado por src.rendering) apenas fecha a figura, sem bloquear.
+    """
+    if matplotlib.get_backend().lower() == "agg":
+        plt.close()
+    else:
+        plt.show()
+
+def group_summaries(df_paulista, df_linha2=None, df_outras=None):
+    """
+    Resumos dos três grupos da análise (box_summary: quartis, bigodes,
+    média e amostra limitada de outliers). Aceita os resumos já prontos
+    (lista devolvida por summarize_group), as três tabelas ou um único
+    GroupIndex no primeiro argumento.
+    """
+    if isinstance(df_paulista, list):
+        return df_paulista
+    
+    if df_linha2 is None and df_outras is None:
+        df_linha2 = df_outras = df_paulista
+    
+    return [
+        box_summary(data, name)
+        for data, name in zip([df_paulista, df_linha2, df_outras], ANALYSIS_GROUPS)
+    ]
 
 #----------comparação de médias por grupo---------------
-def plot_group_means(df_paulista, df_linha2, df_outras):
+def plot_group_means(df_paulista, df_linha2=None, df_outras=None):
     """
     Comparação Visual do fluxo médio diário entre grupos.
     """
     
-    means =  [
-        df_paulista["fluxo"].mean(),
-        df_linha2["fluxo"].mean(),
-        df_outras["fluxo"].mean()
-    ]
+    apply_style()
     
-    labels = [
-        "Cluster Paulista",
-        "Linha 2 (sem Paulista)",
-        "Outras Linhas"
-    ]
+    resumos = group_summaries(df_paulista, df_linha2, df_outras)
+    
+    means = [resumo["mean"] for resumo in resumos]
+    
+    labels = [resumo["label"] for resumo in resumos]
     
     colors = ["#1f77b4", "#ff7f0e", "#2ca02c"]
     
@@ -60,8 +89,7 @@ def plot_group_means(df_paulista, df_linha2, df_outras):
     plt.tight_layout()
     
     #Salvar automaticamente
-    project_root = Path(__file__).resolve().parents[1]
-    output_dir = project_root / "outputs" / "figures"
+    output_dir = FIGURES_DIR
     
     output_dir.mkdir(parents=True, exist_ok=True)
     
@@ -69,7 +97,7 @@ def plot_group_means(df_paulista, df_linha2, df_outras):
     
     plt.savefig(file_path, dpi=300, bbox_inches="tight")
     
-    plt.show()
+    show_figure()
 #-------------------------------------------------------
 
 
@@ -82,6 +110,8 @@ def plot_monthly_trends(media_paulista,
     Gráfico de linhas da evolução mensal
     """
     
+    apply_style()
+    
     plt.figure(figsize=(10, 6))
     
     plt.plot(media_paulista.index,
@@ -106,8 +136,7 @@ def plot_monthly_trends(media_paulista,
     plt.tight_layout()
     
     #salvar automaticamente
-    project_root = Path(__file__).resolve().parents[1]
-    output_dir = project_root / "outputs" / "figures"
+    output_dir = FIGURES_DIR
     
     output_dir.mkdir(parents=True, exist_ok=True)
     
@@ -115,7 +144,7 @@ def plot_monthly_trends(media_paulista,
     
     plt.savefig(file_path, dpi=300, bbox_inches="tight")
     
-    plt.show()
+    show_figure()
 #--------------------------------------------------
 
 
@@ -125,6 +154,8 @@ def plot_cluster_correlation(corr_matrix):
     Heatmap da correlação entre estações do Cluster Paulista.
     """
     
+    apply_style()
+    
     plt.figure(figsize=(7, 6))
     
     sns.heatmap(corr_matrix,
@@ -149,8 +180,7 @@ def plot_cluster_correlation(corr_matrix):
     plt.tight_layout()
     
     #Caminho absoluto baseado na raiz do projeto
-    project_root = Path(__file__).resolve().parents[1]
-    output_dir = project_root / "outputs" / "figures"
+    output_dir = FIGURES_DIR
     
     output_dir.mkdir(parents=True, exist_ok=True)
     
@@ -158,41 +188,35 @@ def plot_cluster_correlation(corr_matrix):
     
     plt.savefig(file_path, dpi=300, bbox_inches="tight")
     
-    plt.show()
+    show_figure()
 #--------------------------------------------------
 
 
 #------------Boxplot entre cluster e linhas--------
 
-def plot_group_boxplot(df_paulista, df_linha2, df_outras):
+def plot_group_boxplot(df_paulista, df_linha2=None, df_outras=None):
     """
     Boxplot comparando a distribuição do fluxo diário entre os grupos.
     """
     
-    #Criar dataframe consolidado
-    df_box = pd.DataFrame({
-        "fluxo": pd.concat([
-            df_paulista["fluxo"],
-            df_linha2["fluxo"],
-            df_outras["fluxo"]
-        ], ignore_index=True),
-        
-        "grupo": (
-            ["Cluster Paulista"] * len(df_paulista) +
-            ["Linha 2 (sem Paulista)"] * len(df_linha2) +
-            ["Outras Linhas"] * len(df_outras)
-        )
-    })
+    apply_style()
+    
+    #Quartis, bigodes e outliers já calculados: o custo não depende do n de linhas
+    resumos = group_summaries(df_paulista, df_linha2, df_outras)
     
     plt.figure(figsize=(9, 6))
     
-    sns.boxplot(
-        data=df_box,
-        x="grupo",
-        y="fluxo",
-        palette=["#1f77b4", "#ff7f0e", "#2ca02c"]
+    caixas = plt.gca().bxp(
+        resumos,
+        patch_artist=True,
+        widths=0.8,
+        medianprops={"color": "#3d3d3d"},
+        flierprops={"marker": "d", "markerfacecolor": "#3d3d3d", "markersize": 5}
     )
     
+    for caixa, cor in zip(caixas["boxes"], ["#1f77b4", "#ff7f0e", "#2ca02c"]):
+        caixa.set_facecolor(cor)
+    
     plt.title("Distribuição do Fluxo Diário por Grupo")
     plt.ylabel("Fluxo Diário (passageiros)")
     plt.xlabel("")
@@ -202,14 +226,13 @@ def plot_group_boxplot(df_paulista, df_linha2, df_outras):
     plt.tight_layout()
     
     #Salvar automaticamente
-    project_root = Path(__file__).resolve().parents[1]
-    output_dir = project_root /  "outputs" / "figures"
+    output_dir = FIGURES_DIR
     output_dir.mkdir(parents=True, exist_ok=True)
     
     file_path = output_dir / "boxplot_comparative.png"
     plt.savefig(file_path, dpi=300, bbox_inches="tight")
     
-    plt.show()
+    show_figure()
     
 #--------
 
@@ -217,8 +240,12 @@ def plot_interannual_comparison(media_cluster_ano):
     """
     Gráfico executivo de comparação interanual
     """
+    
+    apply_style()
 
-    os.makedirs("projeto-metro-sp/outputs/figures", exist_ok=True)
+    output_dir = FIGURES_DIR
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
 
     plt.figure(figsize=(8, 5))
 
@@ -245,8 +272,8 @@ def plot_interannual_comparison(media_cluster_ano):
     plt.tight_layout()
 
     plt.savefig(
-        "projeto-metro-sp/outputs/figures/interannual_comparison.png",
+        output_dir / "interannual_comparison.png",
         dpi=300
     )
 
-    plt.show()
\ No newline at end of file
+    show_figure()
\ No newline at end of file
@@ -0,0 +1,185 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pathlib import Path
+
+from benchmarks.synthetic import synthetic_lines, station_levels, write_synthetic_year
+from src.data_processing import STATION_MAPPING
+
+#RAIZ DO PROJETO (main.py RODA A PARTIR DAQUI NOS TESTES DE PONTA A PONTA)
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+#PASTAS DA BASE (RELATIVAS À PASTA DO TESTE) GUARDADAS EM CONSTANTES DOS MÓDULOS DE src
+DATA_DIR_ATTRS = {
+    "RAW_DIR": Path("raw"),
+    "PROCESSED_DIR": Path("processed"),
+    "CACHE_DIR": Path("processed") / "cache",
+    "CUBE_DIR": Path("processed") / "cube"
+}
+
+#SIGLAS DOS MESES COMO NAS FAIXAS DO ARQUIVO BRUTO ('JAN/2024')
+MONTH_NAMES = ["JAN", "FEV", "MAR", "ABR", "MAI", "JUN", "JUL", "AGO", "SET", "OUT", "NOV", "DEZ"]
+
+#LINHAS PUBLICADAS NOS ARQUIVOS 2023-2025 (O 15-PRATA VEM COM SIGLAS ENTRE ESPAÇOS: ' VPM ')
+RAW_LINES = ["1-AZUL", "2-VERDE", "3-VERMELHA", "15-PRATA"]
+
+
+def write_raw_file(path, year: int, months=(1, 2), days: int = 4, edits=None, linhas=RAW_LINES):
+    """
+    Arquivo bruto pequeno no layout do Metrô (latin-1, blocos por linha
+    separados por ';;', faixa com mês/ano, cabeçalho DIA, vírgula decimal).
+    'linhas' escolhe os blocos e 'edits' = {(mês, dia, linha, posição no
+    bloco): texto} substitui campos (posição 0 = DIA). Retorna
+    {(data, linha, sigla): fluxo em passageiros} dos valores numéricos.
+    """
+    edits = edits or {}
+    registros = {}
+
+    saida = ["METRÔ DE SÃO PAULO" + ";" * 20, ";" * 20]
+
+    for mes in months:
+        faixa = [
+            ";".join([f"ENTRADAS POR ESTAÇÃO - LINHA {linha} - {MONTH_NAMES[mes - 1]}/{year} (MIL)"] + [""] * (len(STATION_MAPPING[linha]) + 1))
+            for linha in linhas
+        ]
+        cabecalho = [
+            ";".join(["DIA", *(f" {sigla} " if linha == "15-PRATA" else sigla for sigla in STATION_MAPPING[linha]), "TOTAL"])
+            for linha in linhas
+        ]
+        saida += [";;".join(faixa), ";;".join(cabecalho)]
+
+        for dia in range(1, days + 1):
+            blocos = []
+            for k, linha in enumerate(linhas):
+                campos = [str(dia)]
+                for j, sigla in enumerate(STATION_MAPPING[linha]):
+                    #MILHARES COM UMA CASA DECIMAL (EX.: '12,3')
+                    valor = 10 * (k + 1) + j + dia + mes / 10
+                    campos.append(f"{valor:.1f}".replace(".", ","))
+                campos.append("999,9")
+
+                for (m, d, nome, posicao), texto in edits.items():
+                    if (m, d, nome) == (mes, dia, linha):
+                        campos[posicao] = texto
+
+                for j, sigla in enumerate(STATION_MAPPING[linha]):
+                    try:
+                        valor = float(campos[j + 1].replace(",", "."))
+                    except ValueError:
+                        continue
+                    registros[(pd.Timestamp(year, mes, dia), linha, sigla)] = round(valor * 1000)
+
+                blocos.append(";".join(campos))
+            saida.append(";;".join(blocos))
+
+        total = [";".join(["Total"] + [""] * (len(STATION_MAPPING[linha]) + 1)) for linha in linhas]
+        saida += [";;".join(total), ";" * 20]
+
+    saida.append("* Greve dos metroviários" + ";" * 20)
+
+    Path(path).write_text("\n".join(saida) + "\n", encoding="latin-1")
+    return registros
+
+
+def write_year(path, year, linhas=None, seed=0) -> Path:
+    """
+    Arquivo bruto sintético de um ano no layout do Metrô. 'linhas' filtra
+    as linhas do modelo (todas por padrão).
+    """
+    modelo = synthetic_lines(1)
+    if linhas is not None:
+        modelo = [(nome, siglas) for nome, siglas in modelo if nome in linhas]
+
+    rng = np.random.default_rng(seed)
+    write_synthetic_year(path, year, modelo, station_levels(modelo, rng), rng)
+
+    return Path(path)
+
+
+def edit_data_row(path, mes: str, dia: int, edits: dict):
+    """
+    Altera campos da linha de dados do dia 'dia' no bloco do mês 'mes'
+    (ex.: 'MAR/2024'). 'edits' = {posição do campo: novo texto}.
+    Retorna a linha original, separada em campos.
+    """
+    linhas = Path(path).read_text(encoding="latin-1").splitlines(keepends=True)
+
+    faixa = next(i for i, linha in enumerate(linhas) if f"{mes} (MIL)" in linha)
+    i = next(j for j in range(faixa, len(linhas)) if linhas[j].split(";", 1)[0] == str(dia))
+
+    campos = linhas[i].rstrip("\n").split(";")
+    original = list(campos)
+
+    for posicao, texto in edits.items():
+        campos[posicao] = texto
+
+    linhas[i] = ";".join(campos) + "\n"
+    Path(path).write_text("".join(linhas), encoding="latin-1", newline="")
+
+    return original
+
+
+def run_main(data_dir, *args) -> subprocess.CompletedProcess:
+    """
+    Executa main.py com a base em 'data_dir' (METRO_DATA_DIR).
+    """
+    return subprocess.run(
+        [sys.executable, "main.py", *args],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "METRO_DATA_DIR": str(data_dir)},
+        capture_output=True,
+        text=True
+    )
+
+
+def run_python(data_dir, code: str) -> subprocess.CompletedProcess:
+    """
+    Executa um trecho de código com a base em 'data_dir'.
+    """
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "METRO_DATA_DIR": str(data_dir)},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+
+def as_records(df) -> dict:
+    return {
+        (pd.Timestamp(data), linha, sigla): fluxo
+        for data, linha, sigla, fluxo in zip(df["data"], df["linha"], df["sigla"], df["fluxo"])
+    }
+
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    Base bruta e processada em pasta temporária: troca os caminhos em
+    todos os módulos de src já importados que guardam uma cópia deles.
+    """
+    for nome, modulo in list(sys.modules.items()):
+        if nome == "src" or not nome.startswith("src."):
+            continue
+        for atributo, relativo in DATA_DIR_ATTRS.items():
+            if hasattr(modulo, atributo):
+                monkeypatch.setattr(modulo, atributo, tmp_path / relativo)
+
+    (tmp_path / "raw").mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def raw_year(tmp_path):
+    """
+    Ano sintético pequeno (2024, bissexto) com uma linha comum e uma de
+    siglas com espaços (' VPM '), separadas por ';;'.
+    """
+    return write_year(tmp_path / "passageiros_dia_2024.csv", 2024, linhas=["1-AZUL", "15-PRATA"])
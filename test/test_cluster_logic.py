@@ -0,0 +1,248 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.clusters import CLUSTER_DEFINITIONS, SYSTEM_CLUSTER, cluster_statistics, present_clusters, register_cluster
+from src.data_processing import (
+    CANONICAL_STATION_NAMES,
+    PAULISTA_STATIONS,
+    STATION_DIMENSION,
+    STATION_MAPPING,
+    create_analysis_groups,
+    create_paulista_dummy
+)
+from src.fact_table import FactTable
+from src.flow_cube import MISSING, FlowCube
+from src.group_index import ANALYSIS_GROUPS, GroupIndex, build_group_index
+
+
+@pytest.fixture
+def base():
+    """
+    Linhas 1-AZUL e 2-VERDE completas, dois meses, com ~5% dos
+    registros faltando.
+    """
+    rng = np.random.default_rng(11)
+    datas = pd.date_range("2024-01-01", "2024-02-29")
+
+    partes = [
+        pd.DataFrame({
+            "data": datas,
+            "linha": linha,
+            "sigla": sigla,
+            "estacao": estacao,
+            "fluxo": rng.integers(5_000, 80_000, len(datas))
+        })
+        for linha in ["1-AZUL", "2-VERDE"]
+        for sigla, estacao in STATION_MAPPING[linha].items()
+    ]
+
+    df = pd.concat(partes, ignore_index=True)
+    return df[rng.random(len(df)) > 0.05].reset_index(drop=True)
+
+
+def in_memory_cube(fact: FactTable) -> FlowCube:
+    """
+    Cubo dia x estação montado em memória (mesma regra de build_flow_cube).
+    """
+    inicio = int(fact.day.min())
+    values = np.full((int(fact.day.max()) - inicio + 1, len(fact.stations)), MISSING, dtype=np.int32)
+    values[fact.day - inicio, fact.station] = fact.fluxo
+
+    return FlowCube(values, np.datetime64(inicio, "D"), fact.stations.reset_index(drop=True))
+
+
+#==============================================================================
+# TABELA FATO, DUMMY E GRUPOS DA ANÁLISE
+
+def test_fact_table_rebuilds_long_table(base):
+    fact = FactTable.from_frame(base)
+
+    assert len(fact.stations) == len(STATION_MAPPING["1-AZUL"]) + len(STATION_MAPPING["2-VERDE"])
+
+    #NOMES PELA DIMENSÃO DE ESTAÇÕES (GRAFIA CANÔNICA)
+    frame = fact.to_frame()
+    base = base.assign(estacao=base["estacao"].replace(CANONICAL_STATION_NAMES))
+    for coluna in ["linha", "sigla", "estacao"]:
+        assert frame[coluna].astype(str).tolist() == base[coluna].tolist()
+
+    np.testing.assert_array_equal(frame["data"], base["data"])
+    np.testing.assert_array_equal(frame["fluxo"], base["fluxo"])
+
+    #MÁSCARA E GROUPBY COMO NA TABELA LONGA
+    verde = fact[fact["linha"] == "2-VERDE"]
+    assert len(verde) == (base["linha"] == "2-VERDE").sum()
+
+    pd.testing.assert_series_equal(
+        fact.groupby("linha")["fluxo"].sum().rename(index=str),
+        base.groupby("linha")["fluxo"].sum(),
+        check_dtype=False,
+        check_index_type=False
+    )
+
+
+def test_station_dimension_keys():
+    dimensao = STATION_DIMENSION.set_index(["linha", "sigla"])
+
+    #PLATAFORMAS DO MESMO NOME EM LINHAS DIFERENTES = UM COMPLEXO
+    vila_prudente = dimensao.loc[[("2-VERDE", "VPT"), ("15-PRATA", "VPM")]]
+    assert vila_prudente["complex_id"].nunique() == 1 and vila_prudente["station_id"].nunique() == 2
+    assert vila_prudente["rotulo"].tolist() == ["Vila Prudente (2-VERDE)", "Vila Prudente (15-PRATA)"]
+
+    #CONSOLAÇÃO E PAULISTA: COMPLEXOS DIFERENTES NO MESMO GRUPO DE TRANSFERÊNCIA
+    paulista = STATION_DIMENSION[STATION_DIMENSION["estacao"].isin(["Consolação", "Paulista"])]
+    assert paulista["complex_id"].nunique() == 2 and paulista["transfer_group_id"].nunique() == 1
+
+    assert "CHácara Klabin" not in set(STATION_DIMENSION["estacao"])
+    assert STATION_DIMENSION["station_id"].tolist() == list(range(len(STATION_DIMENSION)))
+
+
+def test_fact_table_codes_independent_of_record_order(base):
+    fact = FactTable.from_frame(base)
+    embaralhada = FactTable.from_frame(base.sample(frac=1, random_state=3))
+
+    #DIMENSÃO EM ORDEM DE station_id, QUALQUER QUE SEJA A ORDEM DOS REGISTROS
+    pd.testing.assert_frame_equal(fact.stations, embaralhada.stations)
+    assert fact.stations["station_id"].is_monotonic_increasing
+
+    codes, labels = fact.codes("complex_id")
+    esperado, rotulos = pd.factorize(fact["complex_id"], sort=True)
+
+    np.testing.assert_array_equal(codes, esperado)
+    np.testing.assert_array_equal(labels, rotulos)
+
+
+def test_paulista_dummy_on_frame_and_fact_table(base):
+    df = create_paulista_dummy(base.copy())
+    fact = create_paulista_dummy(FactTable.from_frame(base))
+
+    assert set(df.loc[df["cluster_paulista"] == 1, "estacao"]) == {"Brigadeiro", "Consolação", "Trianon-MASP"}
+    assert set(df.loc[df["cluster_paulista"] == 1, "estacao"]) <= set(PAULISTA_STATIONS)
+
+    #MESMO RESULTADO NA TABELA FATO (REGISTROS NA ORDEM DA TABELA LONGA)
+    np.testing.assert_array_equal(np.asarray(fact["cluster_paulista"]), df["cluster_paulista"].to_numpy())
+
+    for grupo_fato, grupo in zip(create_analysis_groups(fact), create_analysis_groups(df)):
+        np.testing.assert_array_equal(np.asarray(grupo_fato["fluxo"]), grupo["fluxo"].to_numpy())
+
+
+def test_group_index_matches_analysis_groups(base):
+    df = create_paulista_dummy(base.copy())
+    index = build_group_index(create_paulista_dummy(FactTable.from_frame(base)))
+
+    for nome, grupo in zip(ANALYSIS_GROUPS, create_analysis_groups(df)):
+        np.testing.assert_array_equal(np.sort(index.fluxo(nome)), np.sort(grupo["fluxo"].to_numpy()))
+
+    for linha in ["1-AZUL", "2-VERDE"]:
+        np.testing.assert_array_equal(
+            np.sort(index.fluxo(linha)),
+            np.sort(df.loc[df["linha"] == linha, "fluxo"].to_numpy())
+        )
+
+
+def test_group_index_code_partition_skips_minus_one():
+    df = pd.DataFrame({"fluxo": np.arange(10, 16)})
+
+    #-1 NÃO É UM CÓDIGO: AS LINHAS FICAM FORA (NÃO VIRAM O ÚLTIMO NOME)
+    index = GroupIndex(df, {"grupo": (np.array([-1, 1, 0, -1, 1, 0]), ["a", "b", "c"])})
+
+    assert index.names == ["b", "a"] and "c" not in index
+    np.testing.assert_array_equal(index.fluxo("b"), [11, 14])
+    np.testing.assert_array_equal(index.fluxo("a"), [12, 15])
+
+
+def test_outras_linhas_keeps_baseline_definition(base):
+    #ESTAÇÃO DO CLUSTER FORA DA LINHA 2 (PAULISTA, 4-AMARELA)
+    amarela = base[base["linha"] == "1-AZUL"].head(30).assign(linha="4-AMARELA", sigla="PTA", estacao="Paulista")
+    df = create_paulista_dummy(pd.concat([base, amarela], ignore_index=True))
+
+    index = build_group_index(create_paulista_dummy(FactTable.from_frame(df)))
+    cluster, linha2, outras = create_analysis_groups(df)
+
+    #OUTRAS LINHAS = linha != '2-VERDE', COMO NA BASE ORIGINAL (INCLUI A PAULISTA)
+    assert len(index.fluxo("Outras Linhas")) == len(outras) == (df["linha"] != "2-VERDE").sum()
+    assert len(index.fluxo("Cluster Paulista")) == len(cluster)
+    np.testing.assert_array_equal(np.sort(index.fluxo("Outras Linhas")), np.sort(outras["fluxo"].to_numpy()))
+    np.testing.assert_array_equal(np.sort(index.fluxo("Linha 2 (sem Paulista)")), np.sort(linha2["fluxo"].to_numpy()))
+
+
+def test_group_index_views_and_mean_by(base):
+    index = GroupIndex(base, {"linha": base["linha"].to_numpy()})
+
+    #INTERVALO CONTÍGUO DO ARRAY DA PARTIÇÃO (VIEW, SEM CÓPIA)
+    assert index.fluxo("1-AZUL").base is not None
+    np.testing.assert_array_equal(index.take(base, "2-VERDE")["fluxo"], base.loc[base["linha"] == "2-VERDE", "fluxo"])
+
+    mes = base["data"].dt.month.rename("mes")
+    esperado = base[base["linha"] == "2-VERDE"].groupby(mes)["fluxo"].mean()
+
+    np.testing.assert_allclose(index.mean_by("2-VERDE", mes).to_numpy(), esperado.to_numpy())
+#==============================================================================
+
+
+#==============================================================================
+# ESTATÍSTICAS DOS CLUSTERS (PRODUTO ESPARSO x GROUPBY)
+
+CLUSTERS = {
+    "Cluster Paulista": PAULISTA_STATIONS,
+    "Centro": ["Sé", "São Bento", "Liberdade", "República"],
+    "Sem estações": ["Pinheiros", "Butantã"]
+}
+
+
+@pytest.mark.parametrize("freq,periodo", [("month", "M"), ("year", "Y")])
+def test_cluster_statistics_matches_groupby(base, freq, periodo):
+    fact = FactTable.from_frame(base)
+    tabela = cluster_statistics(in_memory_cube(fact), freq, clusters=CLUSTERS, block_days=13)
+
+    #CLUSTER SEM ESTAÇÃO NA BASE NÃO ENTRA (PARTICIPAÇÃO 0% NÃO É MEDIDA)
+    assert set(tabela["cluster"]) == {"Cluster Paulista", "Centro", SYSTEM_CLUSTER}
+
+    df = base.assign(periodo=base["data"].dt.to_period(periodo), estacao=fact["estacao"].astype(str))
+    sistema = df.groupby("periodo")["fluxo"].sum()
+
+    for nome in ["Cluster Paulista", "Centro"]:
+        membros = df[df["estacao"].isin(CLUSTERS[nome])]
+        esperado = membros.groupby("periodo")["fluxo"].agg(["sum", "mean"])
+
+        obtido = tabela[tabela["cluster"] == nome].set_index("periodo")
+
+        assert (obtido["estacoes"] == membros[["linha", "sigla"]].drop_duplicates().shape[0]).all()
+        np.testing.assert_array_equal(obtido["fluxo"].to_numpy(), esperado["sum"].to_numpy())
+        np.testing.assert_allclose(obtido["media"].to_numpy(), esperado["mean"].to_numpy())
+        np.testing.assert_allclose(obtido["participacao"].to_numpy(), (esperado["sum"] / sistema).to_numpy())
+
+        crescimento = (esperado["mean"] / esperado["mean"].shift(1) - 1) * 100
+        np.testing.assert_allclose(obtido["crescimento_pct"].to_numpy(), crescimento.to_numpy())
+
+    total = tabela[tabela["cluster"] == SYSTEM_CLUSTER]
+    np.testing.assert_array_equal(total["fluxo"].to_numpy(), sistema.to_numpy())
+    np.testing.assert_allclose(total["participacao"].to_numpy(), 1.0)
+
+
+def test_present_clusters_drops_empty_definitions(base):
+    stations = FactTable.from_frame(base).stations
+
+    assert list(present_clusters(stations, CLUSTERS)) == ["Cluster Paulista", "Centro"]
+
+
+def test_present_clusters_warns_only_for_configured_absent_clusters(base, caplog, monkeypatch):
+    stations = FactTable.from_frame(base).stations
+    avisos = lambda: [r for r in caplog.records if r.getMessage() == "clusters sem estacoes na base"]
+
+    #REGISTRO PADRÃO: TODOS OS CLUSTERS TÊM ESTAÇÕES NA BASE, NENHUM AVISO A CADA EXECUÇÃO
+    with caplog.at_level(logging.WARNING, logger="metro"):
+        assert list(present_clusters(stations)) == list(CLUSTER_DEFINITIONS)
+    assert avisos() == []
+
+    #CLUSTER INCLUÍDO PELO USUÁRIO SEM ESTAÇÕES NA BASE: AVISO
+    monkeypatch.setattr("src.clusters.CLUSTER_DEFINITIONS", dict(CLUSTER_DEFINITIONS))
+    register_cluster("Polo Pinheiros", ["Pinheiros", "Butantã"])
+
+    with caplog.at_level(logging.WARNING, logger="metro"):
+        assert "Polo Pinheiros" not in present_clusters(stations)
+    [aviso] = avisos()
+    assert aviso.levelno == logging.WARNING and aviso.fields["clusters"] == ["Polo Pinheiros"]
+#==============================================================================
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scipy import stats
+
+from src.correlation import correlation_inference, pairwise_correlation
+
+
+@pytest.fixture
+def matriz():
+    """
+    Datas x estações com escalas bem diferentes, colunas correlacionadas
+    e ~15% de dias sem registro (NaN).
+    """
+    rng = np.random.default_rng(3)
+    base = rng.normal(size=(90, 1))
+
+    valores = 40_000 + 5_000 * (base + rng.normal(scale=[0.2, 0.5, 1.0, 2.0, 0.1, 3.0], size=(90, 6)))
+    valores[:, 4] *= 1e3
+    valores[rng.random(valores.shape) < 0.15] = np.nan
+
+    return valores
+
+
+@pytest.mark.parametrize("block_rows", [7, 1000])
+def test_pairwise_correlation_matches_pandas(matriz, block_rows):
+    r, n = pairwise_correlation(matriz, block_rows=block_rows)
+
+    #PARES COMPLETOS, COMO DataFrame.corr
+    esperado = pd.DataFrame(matriz).corr().to_numpy()
+    presentes = (~np.isnan(matriz)).astype(np.int64)
+
+    np.testing.assert_allclose(r, esperado, rtol=1e-10, atol=1e-12)
+    np.testing.assert_array_equal(n, presentes.T @ presentes)
+
+
+def test_pairwise_correlation_constant_column_is_nan(matriz):
+    matriz[:, 2] = 7.0
+
+    r, _ = pairwise_correlation(matriz)
+
+    assert np.isnan(r[2]).all() and np.isnan(r[:, 2]).all()
+    assert pd.DataFrame(matriz).corr().iloc[:, 2].isna().all()
+
+
+def test_correlation_inference_matches_pearsonr(matriz):
+    r, n = pairwise_correlation(matriz)
+    inferencia = correlation_inference(r, n)
+
+    for i, j in [(0, 1), (2, 5), (3, 4)]:
+        completos = ~np.isnan(matriz[:, i]) & ~np.isnan(matriz[:, j])
+        esperado = stats.pearsonr(matriz[completos, i], matriz[completos, j])
+        ic = esperado.confidence_interval(0.95)
+
+        np.testing.assert_allclose(inferencia["p_valor"][i, j], esperado.pvalue, rtol=1e-7, atol=1e-300)
+        np.testing.assert_allclose(
+            [inferencia["ic_inferior"][i, j], inferencia["ic_superior"][i, j]],
+            [ic.low, ic.high],
+            rtol=1e-9
+        )
@@ -0,0 +1,325 @@
+import logging
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+
+from benchmarks.synthetic import MONTH_NAMES
+from src.data_processing import (
+    STATION_MAPPING,
+    UNKNOWN_STATION,
+    map_station_names,
+    parse_raw_file,
+    raw_file_months,
+    read_raw_file
+)
+
+from conftest import RAW_LINES, as_records, edit_data_row, run_main, run_python, write_raw_file, write_year
+
+#DIA DE GREVE MARCADO ('2*'), CÉLULAS AUSENTES ('-', '') E VALOR INTEIRO NO 1-AZUL
+EDITS = {
+    (1, 2, "1-AZUL", 0): "2*",
+    (1, 2, "1-AZUL", 1): "-",
+    (1, 3, "1-AZUL", 2): "",
+    (2, 1, "1-AZUL", 3): "7"
+}
+
+#DATASETS GRAVADOS PELO INGEST (HISTÓRICO E ANO CORRENTE)
+NAME = "metro_2023_2024_2025_clean"
+CURRENT = "metro_2025_clean"
+
+
+def test_read_raw_file_typed_columns(tmp_path):
+    arquivo = tmp_path / "passageiros_dia_2024.csv"
+    write_raw_file(arquivo, 2024, edits=EDITS)
+
+    df = read_raw_file(arquivo)
+
+    #SÓ AS LINHAS DE DADOS: 2 MESES x 4 DIAS, INCLUSIVE A DO DIA '2*'
+    assert len(df) == 8
+    assert df[("1-AZUL", "DIA")].tolist() == [1, 2, 3, 4, 1, 2, 3, 4]
+
+    #MÊS DE CADA LINHA DE DADOS VEM DA FAIXA 'JAN/2024' ACIMA DO BLOCO
+    assert df.index.strftime("%Y-%m").tolist() == ["2024-01"] * 4 + ["2024-02"] * 4
+
+    #UM BLOCO POR LINHA DA FAIXA, COM AS SIGLAS DO CABEÇALHO (SEM ESPAÇOS)
+    assert list(dict.fromkeys(df.columns.get_level_values("linha"))) == RAW_LINES
+    assert list(df["15-PRATA"].columns) == ["DIA", *STATION_MAPPING["15-PRATA"], "TOTAL"]
+
+    azul = df["1-AZUL"]
+    siglas = list(STATION_MAPPING["1-AZUL"])
+    assert azul[siglas[0]].dtype == np.float64
+    assert np.isnan(azul[siglas[0]].iloc[1]) and np.isnan(azul[siglas[1]].iloc[2])
+    assert azul[siglas[2]].iloc[4] == 7.0
+
+
+def test_parse_matches_written_values(tmp_path):
+    arquivo = tmp_path / "passageiros_dia_2024.csv"
+    esperado = write_raw_file(arquivo, 2024, edits=EDITS)
+
+    df = parse_raw_file(arquivo, "2024")
+
+    assert as_records(df) == esperado
+    assert df["fluxo"].dtype == np.int64
+
+    #O DIA DE GREVE ENTRA COM AS DEMAIS ESTAÇÕES DA LINHA
+    greve = df[(df["data"] == pd.Timestamp("2024-01-02")) & (df["linha"] == "1-AZUL")]
+    assert len(greve) == len(STATION_MAPPING["1-AZUL"]) - 1
+
+
+def test_parse_detects_blocks_from_banner(tmp_path):
+    #OUTRO CONJUNTO E OUTRA ORDEM DE LINHAS: OS BLOCOS VÊM DA FAIXA, NÃO DA POSIÇÃO
+    arquivo = tmp_path / "passageiros_dia_2024.csv"
+    esperado = write_raw_file(arquivo, 2024, linhas=["15-PRATA", "2-VERDE"])
+
+    df = parse_raw_file(arquivo, "2024")
+
+    assert as_records(df) == esperado
+    assert set(df["linha"]) == {"15-PRATA", "2-VERDE"}
+
+
+def test_parse_dates_from_banner_months(tmp_path):
+    #MESES FORA DE ORDEM E 29/02 DE ANO BISSEXTO: A DATA VEM DA FAIXA, NÃO DA CONTAGEM
+    arquivo = tmp_path / "passageiros_dia_2024.csv"
+    esperado = write_raw_file(arquivo, 2024, months=(3, 2, 11), days=29)
+
+    df = parse_raw_file(arquivo, "2024")
+
+    assert as_records(df) == esperado
+    assert df["data"].dt.month.unique().tolist() == [3, 2, 11]
+    assert pd.Timestamp("2024-02-29") in set(df["data"])
+
+
+def test_map_station_names_matches_mapping():
+    linha = ["1-AZUL", "2-VERDE", "1-AZUL", "9-INEXISTENTE", "2-VERDE"]
+    sigla = ["PSE", "ANR", "ANR", "PSE", "XXX"]
+
+    nomes = map_station_names(linha, sigla)
+
+    esperado = [STATION_MAPPING.get(l, {}).get(s, UNKNOWN_STATION) for l, s in zip(linha, sigla)]
+    assert list(nomes) == esperado
+    assert esperado[-2:] == [UNKNOWN_STATION, UNKNOWN_STATION]
+
+
+#==============================================================================
+# ARQUIVOS SINTÉTICOS DO BENCHMARK
+
+def reference_records(path) -> dict:
+    """
+    Leitura direta do arquivo (sem o parser do projeto):
+    {(data, linha, sigla): fluxo em passageiros}.
+    """
+    siglas = {linha: list(mapa) for linha, mapa in STATION_MAPPING.items()}
+    meses = {sigla: mes for mes, sigla in MONTH_NAMES.items()}
+
+    registros = {}
+    blocos = None
+    mes = None
+
+    for linha in Path(path).read_text(encoding="latin-1").splitlines():
+        campos = linha.split(";")
+
+        faixa = re.findall(r"LINHA (\S+)[^;]* - (\w{3})/(\d{4}) \(MIL\)", linha)
+        if faixa:
+            blocos = [nome for nome, _, _ in faixa]
+            mes = (int(faixa[0][2]), meses[faixa[0][1]])
+            continue
+
+        dia = re.match(r"^(\d+)", campos[0])
+        if mes is None or dia is None:
+            continue
+
+        inicio = 0
+        for nome in blocos:
+            data = pd.Timestamp(mes[0], mes[1], int(re.match(r"\d+", campos[inicio]).group()))
+
+            for j, sigla in enumerate(siglas[nome]):
+                try:
+                    valor = float(campos[inicio + 1 + j].replace(",", "."))
+                except ValueError:
+                    #'' / '-' / TEXTO: SEM REGISTRO
+                    continue
+                registros[(data, nome, sigla)] = round(valor * 1000)
+
+            inicio += len(siglas[nome]) + 3
+
+    return registros
+
+
+def test_parse_matches_direct_reading(raw_year):
+    #DIA COM MARCA ('23*'), CÉLULA '-' E VALOR COM VÍRGULA DECIMAL NO 1-AZUL
+    original = edit_data_row(raw_year, "MAR/2024", 23, {0: "23*", 1: "-", 2: "12,3"})
+
+    df = parse_raw_file(raw_year, "2024")
+
+    assert as_records(df) == reference_records(raw_year)
+
+    dia = df[df["data"] == pd.Timestamp("2024-03-23")]
+    azul = list(STATION_MAPPING["1-AZUL"])
+
+    assert azul[0] not in set(dia.loc[dia["linha"] == "1-AZUL", "sigla"])
+    assert dia.loc[(dia["linha"] == "1-AZUL") & (dia["sigla"] == azul[1]), "fluxo"].tolist() == [12300]
+    assert original[0] == "23"
+
+
+def test_parse_calendar_and_station_names(raw_year):
+    df = parse_raw_file(raw_year, "2024")
+
+    #2024 É BISSEXTO: 29/02 ENTRA, LINHAS VAZIAS DE 30 E 31/02 NÃO
+    assert df["data"].dt.normalize().nunique() == 366
+    assert df["data"].min() == pd.Timestamp("2024-01-01")
+    assert df["data"].max() == pd.Timestamp("2024-12-31")
+
+    #SIGLAS COM ESPAÇOS (' VPM ') SAEM LIMPAS E TODAS AS ESTAÇÕES SÃO MAPEADAS
+    assert set(df.loc[df["linha"] == "15-PRATA", "sigla"]) == set(STATION_MAPPING["15-PRATA"])
+    assert UNKNOWN_STATION not in set(df["estacao"])
+    assert df["fluxo"].dtype == np.int64
+
+
+def test_stray_text_cell_becomes_missing(raw_year, caplog):
+    edit_data_row(raw_year, "MAI/2024", 5, {2: "n/d"})
+
+    with caplog.at_level(logging.WARNING, logger="metro"):
+        df = parse_raw_file(raw_year, "2024")
+
+    sigla = list(STATION_MAPPING["1-AZUL"])[1]
+    dia = df[(df["data"] == pd.Timestamp("2024-05-05")) & (df["linha"] == "1-AZUL")]
+
+    assert sigla not in set(dia["sigla"])
+    assert as_records(df) == reference_records(raw_year)
+    assert any(r.getMessage() == "celulas invalidas" for r in caplog.records)
+
+
+def test_parse_selected_months(raw_year):
+    meses = raw_file_months(raw_year)
+    assert sorted(meses) == [f"2024-{m:02d}" for m in range(1, 13)]
+
+    completo = parse_raw_file(raw_year, "2024")
+    marco = parse_raw_file(raw_year, "2024", months=["2024-03"])
+
+    esperado = completo[completo["data"].dt.month == 3].reset_index(drop=True)
+    pd.testing.assert_frame_equal(marco.reset_index(drop=True), esperado, check_categorical=False)
+#==============================================================================
+
+
+#==============================================================================
+# INGESTÃO INCREMENTAL (PONTA A PONTA, BASE SINTÉTICA EM METRO_DATA_DIR)
+
+def truncate_after(path, mes: str):
+    """
+    Remove do arquivo os blocos a partir da faixa de 'mes' (ex.: 'OUT/2025'),
+    mantendo as notas de rodapé.
+    """
+    linhas = Path(path).read_text(encoding="latin-1").splitlines(keepends=True)
+
+    inicio = next(i for i, linha in enumerate(linhas) if f"{mes} (MIL)" in linha)
+    rodape = next(i for i, linha in enumerate(linhas) if linha.startswith("¹"))
+
+    Path(path).write_text("".join(linhas[:inicio] + linhas[rodape - 1:]), encoding="latin-1", newline="")
+
+
+def processed_frame(data_dir) -> pd.DataFrame:
+    """
+    Dataset processado (parquet base + partes delta) em ordem canônica.
+    """
+    arquivos = sorted((data_dir / "processed").glob(f"{NAME}*.parquet"))
+    df = pd.concat([pd.read_parquet(arquivo) for arquivo in arquivos], ignore_index=True)
+    return canonical(df)
+
+
+def canonical(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.astype({coluna: str for coluna in ["linha", "sigla", "estacao"]})
+    return df.sort_values(["data", "linha", "sigla"]).reset_index(drop=True)
+
+
+def build_cube(data_dir):
+    run_python(data_dir, "from src.flow_cube import load_flow_cube; load_flow_cube()")
+    return np.load(data_dir / "processed" / "cube" / f"{NAME}.npy")
+
+
+def stored_frames(data_dir) -> dict:
+    """
+    Base histórica (parquet + partes) e cache do ano corrente como as
+    leituras do pipeline os devolvem, sem reordenar.
+    """
+    saida = data_dir / "frames.pkl"
+    run_python(data_dir, (
+        "import pandas as pd; from src.storage import load_processed; "
+        "from src.ingestion import load_year, load_year_totals; "
+        f"pd.to_pickle({{'historico': load_processed(), 'ano': load_year('2025'), "
+        f"'totais': load_year_totals('2025')}}, r'{saida}')"
+    ))
+    return pd.read_pickle(saida)
+
+
+def test_append_months_matches_full_ingest(tmp_path):
+    completo, incremental = tmp_path / "completo", tmp_path / "incremental"
+
+    for ano in ["2023", "2024", "2025"]:
+        write_year(completo / "raw" / f"passageiros_dia_{ano}.csv", ano, seed=int(ano))
+
+    shutil.copytree(completo / "raw", incremental / "raw")
+    atual = incremental / "raw" / "passageiros_dia_2025.csv"
+    truncate_after(atual, "OUT/2025")
+
+    #BASE ATÉ SETEMBRO (COM CUBO), DEPOIS CHEGAM OUTUBRO E, NUM SEGUNDO APPEND, NOVEMBRO E DEZEMBRO
+    assert run_main(incremental, "ingest").returncode == 0
+    build_cube(incremental)
+
+    shutil.copy(completo / "raw" / "passageiros_dia_2025.csv", atual)
+    truncate_after(atual, "NOV/2025")
+    saida = run_main(incremental, "ingest", "--append")
+
+    assert saida.returncode == 0, saida.stderr
+    assert "Meses acrescentados: ['2025-10']" in saida.stdout
+
+    shutil.copy(completo / "raw" / "passageiros_dia_2025.csv", atual)
+    saida = run_main(incremental, "ingest", "--append")
+
+    assert saida.returncode == 0, saida.stderr
+    assert "Meses acrescentados: ['2025-11', '2025-12']" in saida.stdout
+    assert "atualizado no lugar" in saida.stdout
+    assert len(list((incremental / "processed").glob(f"{NAME}.delta-*.parquet"))) == 2
+
+    #O ARQUIVO DO PARSE COMPLETO DO ANO NÃO É REGRAVADO: OS MESES NOVOS FICAM EM PARTES
+    assert len(list((incremental / "processed" / "cache").glob("metro_2025.part-*.parquet"))) == 2
+
+    assert run_main(completo, "ingest", "--force").returncode == 0
+
+    #MESMA ORDEM DE UM REPROCESSAMENTO COMPLETO: CSVs IDÊNTICOS BYTE A BYTE
+    for nome in [NAME, CURRENT]:
+        arquivo = Path("processed") / f"{nome}.csv"
+        assert (incremental / arquivo).read_bytes() == (completo / arquivo).read_bytes()
+
+    esperado, obtido = stored_frames(completo), stored_frames(incremental)
+    for chave in esperado:
+        pd.testing.assert_frame_equal(obtido[chave], esperado[chave], check_categorical=False)
+
+    #CUBO ATUALIZADO NO LUGAR = CUBO MONTADO DO ZERO
+    cubo = np.load(incremental / "processed" / "cube" / f"{NAME}.npy")
+    np.testing.assert_array_equal(cubo, build_cube(completo))
+
+    #SEM MESES NOVOS: NADA A FAZER
+    assert "Nenhum mês novo" in run_main(incremental, "ingest", "--append").stdout
+
+
+def test_append_falls_back_when_stored_month_changes(tmp_path):
+    for ano in ["2023", "2024", "2025"]:
+        write_year(tmp_path / "raw" / f"passageiros_dia_{ano}.csv", ano, seed=int(ano))
+
+    assert run_main(tmp_path, "ingest").returncode == 0
+
+    edit_data_row(tmp_path / "raw" / "passageiros_dia_2025.csv", "FEV/2025", 3, {1: "99,9"})
+    saida = run_main(tmp_path, "ingest", "--append")
+
+    assert saida.returncode == 0, saida.stderr
+    assert "reprocessamento completo" in saida.stdout
+    assert "Anos reprocessados: ['2025']" in saida.stdout
+
+    df = processed_frame(tmp_path)
+    sigla = list(STATION_MAPPING["1-AZUL"])[0]
+    assert df.loc[(df["data"] == "2025-02-03") & (df["sigla"] == sigla) & (df["linha"] == "1-AZUL"), "fluxo"].tolist() == [99900]
+#==============================================================================
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.descriptive_analysis import box_summary, calculate_descriptive_stats, summarize_group
+from src.group_index import GroupIndex
+
+
+@pytest.fixture
+def fluxo():
+    #CAUDA LONGA (LOGNORMAL) PARA GERAR OUTLIERS ACIMA DO BIGODE
+    rng = np.random.default_rng(5)
+    return pd.DataFrame({"fluxo": np.rint(rng.lognormal(10, 0.6, 3000)).astype(np.int64)})
+
+
+def test_descriptive_stats_from_frame_and_group_index(fluxo):
+    esperado = fluxo["fluxo"].describe()
+
+    pd.testing.assert_series_equal(calculate_descriptive_stats(fluxo), esperado)
+
+    #MESMO RESULTADO PELO ÍNDICE DE GRUPOS (GRUPO = METADE DAS LINHAS)
+    grupo = np.where(np.arange(len(fluxo)) % 2 == 0, "par", "impar")
+    index = GroupIndex(fluxo, {"grupo": grupo})
+
+    pd.testing.assert_series_equal(
+        calculate_descriptive_stats(index, "par"),
+        fluxo["fluxo"].iloc[::2].describe()
+    )
+
+
+def test_box_summary_quartiles_and_whiskers(fluxo):
+    x = fluxo["fluxo"].to_numpy(dtype=np.float64)
+    resumo = box_summary(fluxo, "todos", max_outliers=10_000)
+
+    q1, med, q3 = np.percentile(x, [25, 50, 75])
+    dentro = x[(x >= q1 - 1.5 * (q3 - q1)) & (x <= q3 + 1.5 * (q3 - q1))]
+
+    assert (resumo["q1"], resumo["med"], resumo["q3"]) == (q1, med, q3)
+    assert (resumo["whislo"], resumo["whishi"]) == (dentro.min(), dentro.max())
+    assert resumo["n"] == len(x)
+    np.testing.assert_allclose([resumo["mean"], resumo["std"]], [x.mean(), x.std(ddof=1)])
+
+    #SEM LIMITE EFETIVO: TODOS OS OUTLIERS, ORDENADOS
+    np.testing.assert_array_equal(resumo["fliers"], np.sort(x[(x < dentro.min()) | (x > dentro.max())]))
+
+
+def test_box_summary_outlier_sample_keeps_extremes(fluxo):
+    completo = box_summary(fluxo, "todos", max_outliers=10_000)["fliers"]
+    assert len(completo) > 20
+
+    amostra = box_summary(fluxo, "todos", max_outliers=20, seed=1)["fliers"]
+
+    assert len(amostra) == 20
+    assert amostra[0] == completo[0] and amostra[-1] == completo[-1]
+    assert np.isin(amostra, completo).all()
+    np.testing.assert_array_equal(amostra, box_summary(fluxo, "todos", max_outliers=20, seed=1)["fliers"])
+
+
+def test_summarize_group_prints_and_returns_box_summary(fluxo, capsys):
+    resumo = summarize_group(fluxo, "Grupo")
+
+    saida = capsys.readouterr().out
+    assert "Observações: 3,000" in saida
+    assert resumo["label"] == "Grupo" and resumo["n"] == 3000
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.flow_cube as flow_cube
+
+from src.correlation import correlation_pairs_by_year, station_matrix
+from src.data_processing import PAULISTA_STATIONS, STATION_MAPPING
+from src.fact_table import FactTable
+from src.flow_cube import MISSING, load_flow_cube
+from src.storage import append_processed, save_processed
+
+NAME = "teste"
+
+
+def long_table(seed: int) -> pd.DataFrame:
+    """
+    Linhas 1-AZUL e 2-VERDE de dez/2023 a fev/2024, com ~5% dos
+    registros faltando.
+    """
+    rng = np.random.default_rng(seed)
+    datas = pd.date_range("2023-12-01", "2024-02-29")
+
+    df = pd.concat([
+        pd.DataFrame({"data": datas, "linha": linha, "sigla": sigla, "estacao": estacao,
+                    "fluxo": rng.integers(1_000, 90_000, len(datas))})
+        for linha in ["1-AZUL", "2-VERDE"]
+        for sigla, estacao in STATION_MAPPING[linha].items()
+    ], ignore_index=True)
+
+    return df[rng.random(len(df)) > 0.05].reset_index(drop=True)
+
+
+@pytest.fixture
+def base(data_dir):
+    df = long_table(0)
+    save_processed(df, NAME)
+    return df
+
+
+def test_cube_matches_long_table(base):
+    cube = load_flow_cube(NAME)
+
+    assert isinstance(cube.values, np.memmap)
+    assert cube.shape == (91, len(STATION_MAPPING["1-AZUL"]) + len(STATION_MAPPING["2-VERDE"]))
+
+    #MATRIZ DATA x ESTAÇÃO = PIVOT DA TABELA LONGA (NaN NOS DIAS SEM REGISTRO)
+    pivot = base.pivot_table(index="data", columns=["linha", "sigla"], values="fluxo")
+    matriz = pd.DataFrame(
+        cube.as_float(),
+        index=pd.DatetimeIndex(cube.dates),
+        columns=pd.MultiIndex.from_frame(cube.stations[["linha", "sigla"]].astype(str))
+    )
+    pd.testing.assert_frame_equal(matriz, pivot.reindex_like(matriz), check_names=False, check_freq=False)
+
+
+def test_cube_reductions_match_groupby(base):
+    cube = load_flow_cube(NAME)
+    mes = base["data"].dt.month
+
+    np.testing.assert_allclose(cube.mean_by(cube.day_keys("month")), base.groupby(mes)["fluxo"].mean())
+
+    _, soma, contagem = cube.sum_by(cube.day_keys("year"))
+    np.testing.assert_array_equal(soma, base.groupby(base["data"].dt.year)["fluxo"].sum())
+    np.testing.assert_array_equal(contagem, base.groupby(base["data"].dt.year)["fluxo"].count())
+
+    #PARTICIPAÇÃO DO CLUSTER PAULISTA NO FLUXO DE CADA MÊS
+    cluster = base["estacao"].isin(PAULISTA_STATIONS)
+    esperado = base[cluster].groupby(mes)["fluxo"].sum() / base.groupby(mes)["fluxo"].sum()
+
+    colunas = cube.stations["cluster_paulista"].to_numpy() == 1
+    np.testing.assert_allclose(cube.share_by(cube.day_keys("month"), colunas), esperado)
+
+
+def test_cube_slice(base):
+    cube = load_flow_cube(NAME)
+
+    recorte = cube.slice("2024-01-10", "2024-02-05", linhas=["2-VERDE"])
+
+    assert recorte.dates[0] == np.datetime64("2024-01-10") and recorte.dates[-1] == np.datetime64("2024-02-05")
+    assert set(recorte.stations["linha"]) == {"2-VERDE"}
+
+    verde = base[(base["linha"] == "2-VERDE") & base["data"].between("2024-01-10", "2024-02-05")]
+    assert recorte.sum_by(np.zeros(recorte.shape[0]))[1][0] == verde["fluxo"].sum()
+    assert (recorte.values != MISSING).sum() == len(verde)
+
+    #SÓ O CLUSTER
+    cluster = cube.slice(cluster=True)
+    assert set(cluster.stations["estacao"]) == {"Brigadeiro", "Consolação", "Trianon-MASP"}
+    assert cluster.shape[0] == cube.shape[0]
+
+
+def test_cube_rebuilt_when_dataset_changes(base):
+    antes = np.array(load_flow_cube(NAME).values)
+
+    #MESMO DATASET: ABRE O CUBO GRAVADO
+    assert np.array_equal(load_flow_cube(NAME).values, antes)
+
+    novo = long_table(1)
+    save_processed(novo, NAME)
+    depois = load_flow_cube(NAME)
+
+    assert not np.array_equal(depois.values, antes)
+    assert depois.sum_by(np.zeros(depois.shape[0]))[1][0] == novo["fluxo"].sum()
+
+
+def test_fresh_cube_opens_without_reading_dataset(base, monkeypatch):
+    load_flow_cube(NAME)
+
+    #ASSINATURA PELOS METADADOS DOS ARQUIVOS: NADA É LIDO NEM RECONSTRUÍDO
+    def falha(*args, **kwargs):
+        raise AssertionError("dataset lido ao abrir o cubo")
+
+    monkeypatch.setattr(flow_cube, "build_flow_cube", falha)
+    monkeypatch.setattr("src.ingestion.file_hash", falha)
+
+    assert load_flow_cube(NAME).shape[0] == 91
+
+
+def test_cube_rebuilt_after_appended_part(base):
+    load_flow_cube(NAME)
+
+    extra = long_table(2)
+    extra = extra[extra["data"] == extra["data"].max()].assign(data=pd.Timestamp("2024-03-01"))
+    append_processed(extra, NAME)
+
+    cube = load_flow_cube(NAME)
+
+    assert cube.dates[-1] == np.datetime64("2024-03-01")
+    assert cube.sum_by(np.zeros(cube.shape[0]))[1][0] == base["fluxo"].sum() + extra["fluxo"].sum()
+
+
+def test_mean_matrix_and_yearly_pairs_match_fact_table(base):
+    cube = load_flow_cube(NAME)
+    fact = FactTable.from_frame(base)
+
+    #DIAS SEM NENHUM REGISTRO SÓ EXISTEM NO CUBO (CALENDÁRIO CONTÍNUO)
+    esperado = station_matrix(fact)
+    matriz = cube.mean_matrix().dropna(how="all")
+
+    pd.testing.assert_frame_equal(matriz, esperado, check_index_type=False, check_freq=False)
+
+    pd.testing.assert_frame_equal(
+        correlation_pairs_by_year(cube),
+        correlation_pairs_by_year(fact),
+        rtol=1e-10
+    )
@@ -0,0 +1,288 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scipy import stats
+
+from src.data_processing import STATION_MAPPING
+from src.inferential_analysis import (
+    DAGOSTINO_MIN_N,
+    GroupMoments,
+    _anderson_pvalue,
+    _dagostino_k2,
+    adjust_pvalues,
+    anova_from_moments,
+    assess_normality,
+    batch_comparisons,
+    cohens_d_from_moments,
+    eta_squared_from_moments,
+    welch_from_moments
+)
+
+
+#==============================================================================
+# MOMENTOS SUFICIENTES x SCIPY
+
+@pytest.fixture
+def grupos():
+    """
+    Três grupos de tamanhos, médias e variâncias diferentes, na escala
+    do fluxo diário (dezenas de milhares de passageiros).
+    """
+    rng = np.random.default_rng(13)
+    return {
+        "a": rng.normal(50_000, 20_000, 400).round(),
+        "b": rng.normal(24_000, 9_000, 1500).round(),
+        "c": rng.normal(27_000, 30_000, 90).round()
+    }
+
+
+def test_moments_from_codes_match_from_groups(grupos):
+    valores = np.concatenate(list(grupos.values()))
+    codes = np.repeat([0, 1, 2], [len(v) for v in grupos.values()])
+
+    #CÓDIGO -1 FICA FORA DE QUALQUER GRUPO
+    valores = np.append(valores, 1e9)
+    codes = np.append(codes, -1)
+
+    por_codigo = GroupMoments.from_codes(valores, codes, list(grupos))
+    por_grupo = GroupMoments.from_groups(grupos)
+
+    np.testing.assert_array_equal(por_codigo.n, por_grupo.n)
+    np.testing.assert_allclose(por_codigo.total, por_grupo.total)
+    np.testing.assert_allclose(por_codigo.total_sq, por_grupo.total_sq)
+
+    for nome, x in grupos.items():
+        np.testing.assert_allclose(por_grupo.mean(nome), x.mean())
+        np.testing.assert_allclose(por_grupo.var(nome), x.var(ddof=1))
+
+
+def test_moments_merge_and_select(grupos):
+    #HISTÓRICO (a, b) + NOVO BLOCO (b, c) = MOMENTOS DE TUDO JUNTO
+    corte = 1000
+    historico = GroupMoments.from_groups({"a": grupos["a"], "b": grupos["b"][:corte]})
+    novo = GroupMoments.from_groups({"b": grupos["b"][corte:], "c": grupos["c"]})
+
+    juntos = historico + novo
+    esperado = GroupMoments.from_groups(grupos)
+
+    assert juntos.names == ["a", "b", "c"]
+    np.testing.assert_array_equal(juntos.n, esperado.n)
+    np.testing.assert_allclose(juntos.total, esperado.total)
+    np.testing.assert_allclose(juntos.total_sq, esperado.total_sq)
+
+    selecionados = juntos.select(["c", "a"])
+    assert selecionados.names == ["c", "a"]
+    assert selecionados.count("c") == len(grupos["c"]) and selecionados.count("a") == len(grupos["a"])
+
+
+def test_welch_and_cohens_d_match_scipy(grupos):
+    momentos = GroupMoments.from_groups(grupos)
+
+    for x, y in [("a", "b"), ("b", "c"), ("c", "a")]:
+        esperado = stats.ttest_ind(grupos[x], grupos[y], equal_var=False)
+        t, p = welch_from_moments(momentos, x, y)
+
+        np.testing.assert_allclose(t, esperado.statistic, rtol=1e-9)
+        np.testing.assert_allclose(p, esperado.pvalue, rtol=1e-7, atol=1e-300)
+
+        n1, n2 = len(grupos[x]), len(grupos[y])
+        pooled = np.sqrt(((n1 - 1) * grupos[x].var(ddof=1) + (n2 - 1) * grupos[y].var(ddof=1)) / (n1 + n2 - 2))
+        np.testing.assert_allclose(cohens_d_from_moments(momentos, x, y), (grupos[x].mean() - grupos[y].mean()) / pooled)
+
+
+def test_anova_and_eta_squared_match_scipy(grupos):
+    momentos = GroupMoments.from_groups(grupos)
+
+    esperado = stats.f_oneway(*grupos.values())
+    f, p, ss_entre, ss_total = anova_from_moments(momentos)
+
+    np.testing.assert_allclose(f, esperado.statistic, rtol=1e-9)
+    np.testing.assert_allclose(p, esperado.pvalue, rtol=1e-7, atol=1e-300)
+
+    todos = np.concatenate(list(grupos.values()))
+    np.testing.assert_allclose(ss_total, ((todos - todos.mean()) ** 2).sum(), rtol=1e-9)
+    np.testing.assert_allclose(eta_squared_from_moments(momentos), ss_entre / ss_total)
+
+    #SUBCONJUNTO DE GRUPOS PELO NOME
+    parcial = stats.f_oneway(grupos["a"], grupos["c"])
+    np.testing.assert_allclose(anova_from_moments(momentos, ["a", "c"])[0], parcial.statistic, rtol=1e-9)
+#==============================================================================
+
+
+#==============================================================================
+# CORREÇÃO PARA COMPARAÇÕES MÚLTIPLAS
+
+def test_adjust_pvalues_known_values():
+    p = [0.01, 0.04, 0.03, 0.005]
+
+    #BH: p * m / posição, mínimo acumulado a partir do maior
+    np.testing.assert_allclose(adjust_pvalues(p, "bh"), [0.02, 0.04, 0.04, 0.02])
+
+    #HOLM: p * (m - posição + 1), máximo acumulado a partir do menor
+    np.testing.assert_allclose(adjust_pvalues(p, "holm"), [0.03, 0.06, 0.06, 0.02])
+
+
+def test_adjust_pvalues_nan_and_cap():
+    ajustados = adjust_pvalues([0.5, np.nan, 0.9, 0.01], "holm")
+
+    #NaN FICA FORA DA FAMÍLIA (m = 3) E O AJUSTE NÃO PASSA DE 1
+    assert np.isnan(ajustados[1])
+    np.testing.assert_allclose(ajustados[[0, 2, 3]], [1.0, 1.0, 0.03])
+
+    with pytest.raises(ValueError):
+        adjust_pvalues([0.1], "bonferroni")
+#==============================================================================
+
+
+#==============================================================================
+# COMPARAÇÕES EM LOTE x SCIPY
+
+@pytest.fixture
+def base_linhas():
+    """
+    Duas linhas com fluxos inteiros em faixa estreita (muitos empates)
+    e cerca de 10% dos registros faltando.
+    """
+    rng = np.random.default_rng(7)
+    datas = pd.date_range("2024-01-01", periods=60)
+
+    partes = []
+    for linha, n_estacoes in [("1-AZUL", 4), ("2-VERDE", 3)]:
+        for k, (sigla, estacao) in enumerate(list(STATION_MAPPING[linha].items())[:n_estacoes]):
+            partes.append(pd.DataFrame({
+                "data": datas,
+                "linha": linha,
+                "sigla": sigla,
+                "estacao": estacao,
+                "fluxo": rng.integers(1000, 1040, len(datas)) + 5 * k
+            }))
+
+    df = pd.concat(partes, ignore_index=True)
+    return df[rng.random(len(df)) > 0.1].reset_index(drop=True)
+
+
+def pooled_d(x, y):
+    n1, n2 = len(x), len(y)
+    pooled = np.sqrt(((n1 - 1) * x.var(ddof=1) + (n2 - 1) * y.var(ddof=1)) / (n1 + n2 - 2))
+    return (x.mean() - y.mean()) / pooled
+
+
+def test_batch_comparisons_match_scipy(base_linhas):
+    df = base_linhas
+    tabela = batch_comparisons(df, correction="bh", max_workers=1).set_index(["nivel", "referencia", "grupo"])
+
+    casos = []
+    for (linha, sigla), grupo in df.groupby(["linha", "sigla"], observed=True):
+        resto = df[(df["linha"] == linha) & (df["sigla"] != sigla)]
+        casos.append((("estacao", linha, grupo["estacao"].iloc[0]), grupo["fluxo"], resto["fluxo"]))
+
+    for linha, grupo in df.groupby("linha", observed=True):
+        casos.append((("linha", "Sistema", linha), grupo["fluxo"], df.loc[df["linha"] != linha, "fluxo"]))
+
+    assert len(tabela) == len(casos)
+
+    for chave, x, y in casos:
+        x, y = x.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64)
+        linha = tabela.loc[chave]
+
+        welch = stats.ttest_ind(x, y, equal_var=False)
+        mw = stats.mannwhitneyu(x, y, alternative="two-sided", method="asymptotic", use_continuity=True)
+
+        assert linha["n"] == len(x) and linha["n_referencia"] == len(y)
+        np.testing.assert_allclose(linha["welch_t"], welch.statistic, rtol=1e-9)
+        np.testing.assert_allclose(linha["welch_p"], welch.pvalue, rtol=1e-9)
+        np.testing.assert_allclose(linha["mw_u"], mw.statistic, rtol=1e-12)
+        np.testing.assert_allclose(linha["mw_p"], mw.pvalue, rtol=1e-9)
+        np.testing.assert_allclose(linha["cohens_d"], pooled_d(x, y), rtol=1e-9)
+
+    #AJUSTE SOBRE A FAMÍLIA INTEIRA DE COMPARAÇÕES
+    np.testing.assert_allclose(tabela["welch_p_ajustado"], adjust_pvalues(tabela["welch_p"], "bh"))
+    np.testing.assert_allclose(tabela["mw_p_ajustado"], adjust_pvalues(tabela["mw_p"], "bh"))
+
+
+def test_batch_comparisons_independent_of_workers(base_linhas):
+    serie = batch_comparisons(base_linhas, max_workers=1)
+    paralelo = batch_comparisons(base_linhas, max_workers=2)
+
+    pd.testing.assert_frame_equal(serie, paralelo)
+#==============================================================================
+
+
+#==============================================================================
+# NORMALIDADE x SCIPY
+
+@pytest.mark.parametrize("n", [DAGOSTINO_MIN_N, 50, 500, 5000])
+def test_dagostino_k2_matches_normaltest(n):
+    rng = np.random.default_rng(n)
+    amostras = [rng.normal(size=n), rng.exponential(size=n), rng.uniform(size=n), rng.integers(0, 5, n) * 1.0]
+
+    tamanhos = np.array([n] * len(amostras), dtype=np.float64)
+    skew = np.array([stats.skew(x) for x in amostras])
+    kurt = np.array([stats.kurtosis(x, fisher=False) for x in amostras])
+
+    k2, p = _dagostino_k2(tamanhos, skew, kurt)
+
+    for i, x in enumerate(amostras):
+        esperado = stats.normaltest(x)
+        np.testing.assert_allclose(k2[i], esperado.statistic, rtol=1e-9)
+        np.testing.assert_allclose(p[i], esperado.pvalue, rtol=1e-9, atol=1e-300)
+
+
+def test_dagostino_k2_small_sample_is_nan():
+    k2, p = _dagostino_k2(np.array([DAGOSTINO_MIN_N - 1.0]), np.array([0.1]), np.array([2.9]))
+
+    assert np.isnan(k2[0]) and np.isnan(p[0])
+
+
+def anderson_statistic(x) -> float:
+    """
+    A^2 de Anderson-Darling para normalidade (média e desvio estimados),
+    direto da definição, grupo a grupo.
+    """
+    z = np.sort((x - x.mean()) / x.std(ddof=1))
+    i = np.arange(1, len(z) + 1)
+    return -len(z) - np.mean((2 * i - 1) * (stats.norm.logcdf(z) + stats.norm.logsf(z[::-1])))
+
+
+def test_anderson_darling_path():
+    rng = np.random.default_rng(21)
+    amostras = {"normal": rng.normal(size=300), "exponencial": rng.exponential(size=1200), "uniforme": rng.uniform(size=40)}
+
+    #TODOS OS GRUPOS EM UMA CHAMADA, OBSERVAÇÕES INTERCALADAS
+    valores = np.concatenate(list(amostras.values()))
+    rotulos = np.repeat(list(amostras), [len(x) for x in amostras.values()])
+    ordem = rng.permutation(len(valores))
+
+    tabela = assess_normality(valores[ordem], rotulos[ordem]).set_index("grupo")
+
+    for nome, x in amostras.items():
+        np.testing.assert_allclose(tabela.loc[nome, "anderson"], anderson_statistic(x), rtol=1e-9)
+
+    assert tabela.loc["exponencial", "anderson_p"] < 1e-6 < tabela.loc["normal", "anderson_p"]
+
+    #NOS VALORES CRÍTICOS TABELADOS DE A* O P-VALOR APROXIMADO FICA PERTO DO NÍVEL
+    #DE SIGNIFICÂNCIA (A APROXIMAÇÃO EXPONENCIAL ERRA ATÉ ~30% NA CAUDA)
+    n = 500
+    criticos = np.array([0.576, 0.656, 0.787, 0.918, 1.092]) / (1 + 0.75 / n + 2.25 / n ** 2)
+    p = _anderson_pvalue(criticos, n)
+
+    np.testing.assert_allclose(p, [0.15, 0.10, 0.05, 0.025, 0.01], rtol=0.3)
+    assert np.all(np.diff(p) < 0)
+
+
+def test_assess_normality_method_by_size():
+    rng = np.random.default_rng(4)
+    valores = np.concatenate([rng.normal(size=2), rng.normal(size=200), rng.normal(size=700)])
+    rotulos = np.repeat(["poucos", "medio", "grande"], [2, 200, 700])
+
+    tabela = assess_normality(valores, rotulos, shapiro_max_n=500, n_subsamples=5).set_index("grupo")
+
+    assert tabela["metodo"].to_dict() == {"poucos": "insuficiente", "medio": "shapiro", "grande": "dagostino"}
+    assert tabela.loc["grande", "shapiro_subamostras"] == 5
+    assert np.isnan(tabela.loc["poucos", "p_valor"])
+
+    medio = stats.shapiro(valores[2:202])
+    np.testing.assert_allclose(tabela.loc["medio", ["shapiro_w", "p_valor"]].astype(float), [medio.statistic, medio.pvalue])
+    np.testing.assert_allclose(tabela.loc["grande", "p_valor"], stats.normaltest(valores[202:]).pvalue, rtol=1e-9)
+#==============================================================================
@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from concurrent.futures import ProcessPoolExecutor
+
+from src.ingestion import (
+    ingest_years,
+    is_cached,
+    load_manifest,
+    load_year,
+    parse_year,
+    save_manifest,
+    write_cache
+)
+from src.storage import load_processed
+
+from conftest import write_raw_file
+
+
+@pytest.fixture
+def anos(data_dir):
+    #BASE BRUTA DE 2023 E 2024
+    for ano in [2023, 2024]:
+        write_raw_file(data_dir / "raw" / f"passageiros_dia_{ano}.csv", ano)
+
+    return ["2023", "2024"]
+
+
+def test_ingest_parses_only_changed_years(data_dir, anos, capsys):
+    assert ingest_years(anos) == anos
+    base = load_processed()
+
+    #NADA MUDOU: NENHUM PARSE
+    capsys.readouterr()
+    assert ingest_years(anos) == []
+    assert "Reprocessamento" not in capsys.readouterr().out
+
+    #SÓ O ANO CUJO ARQUIVO BRUTO MUDOU É REPROCESSADO
+    write_raw_file(data_dir / "raw" / "passageiros_dia_2024.csv", 2024, edits={(1, 1, "1-AZUL", 1): "0,5"})
+    assert ingest_years(anos) == ["2024"]
+
+    novo = load_processed()
+    mudou = (novo["fluxo"] != base["fluxo"]).to_numpy()
+
+    assert mudou.sum() == 1
+    assert novo.loc[mudou, "fluxo"].tolist() == [500]
+    assert novo.loc[mudou, "data"].tolist() == [pd.Timestamp("2024-01-01")]
+
+
+def test_ingest_force_reparses(anos):
+    ingest_years(anos)
+
+    assert ingest_years(anos, force=True) == anos
+
+
+def test_parallel_ingest_matches_serial(data_dir, anos):
+    write_raw_file(data_dir / "raw" / "passageiros_dia_2025.csv", 2025, months=(1, 2, 3))
+    anos = anos + ["2025"]
+
+    ingest_years(anos, max_workers=1)
+    serie = {arquivo.name: arquivo.read_bytes() for arquivo in (data_dir / "processed").rglob("*.parquet")}
+
+    ingest_years(anos, force=True, max_workers=3)
+    paralelo = {arquivo.name: arquivo.read_bytes() for arquivo in (data_dir / "processed").rglob("*.parquet")}
+
+    #BASE HISTÓRICA, CACHE POR ANO E TOTAIS PUBLICADOS IDÊNTICOS, BYTE A BYTE
+    assert len(serie) == 7
+    assert paralelo == serie
+
+
+def test_year_manifests_do_not_overwrite_each_other(data_dir, anos):
+    #ETAPA ingest_2023 LÊ O MANIFESTO ANTES DE ingest_2024 TERMINAR
+    manifest_2023 = load_manifest()
+    load_year("2024")
+
+    write_cache("2023", *parse_year("2023"), manifest_2023)
+    save_manifest(manifest_2023, ["2023"])
+
+    assert sorted(load_manifest()) == anos
+    assert all(is_cached(ano) for ano in anos)
+
+
+def test_parallel_year_loads_keep_every_entry(data_dir, anos):
+    write_raw_file(data_dir / "raw" / "passageiros_dia_2025.csv", 2025)
+    anos = anos + ["2025"]
+
+    #COMO AS ETAPAS ingest_<ano> DO PIPELINE: UM PROCESSO POR ANO (fork HERDA OS CAMINHOS)
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        list(executor.map(load_year, anos))
+
+    assert sorted(load_manifest()) == anos
+    assert all(is_cached(ano) for ano in anos)
+    assert not list((data_dir / "processed" / "cache").glob("*.tmp"))
@@ -0,0 +1,135 @@
+import io
+import json
+import logging
+
+from src import instrumentation
+from src.instrumentation import (
+    Profiler,
+    Span,
+    StructuredFormatter,
+    folded_stacks,
+    log_event,
+    profile_summary,
+    span
+)
+
+
+def record(**fields) -> logging.LogRecord:
+    registro = logging.LogRecord("metro.teste", logging.INFO, __file__, 1, "arquivo_lido", None, None)
+    registro.fields = fields
+    return registro
+
+
+def tree(data: dict) -> Profiler:
+    #PERFIL MONTADO À MÃO, COM DURAÇÕES CONHECIDAS
+    profiler = Profiler(memory=False)
+    profiler.roots.append(Span.from_dict(data))
+    return profiler
+
+
+def node(nome, segundos, *filhos, linhas=None) -> dict:
+    return {
+        "nome": nome,
+        "inicio": 0.0,
+        "segundos": segundos,
+        "linhas": linhas,
+        "memoria_mb": None,
+        "filhos": list(filhos)
+    }
+
+
+#==============================================================================
+# LOG ESTRUTURADO
+
+def test_structured_formatter_text_and_json():
+    registro = record(ano=2024, linhas=3)
+
+    assert StructuredFormatter().format(registro) == "INFO    metro.teste arquivo_lido ano=2024 linhas=3"
+
+    evento = json.loads(StructuredFormatter(as_json=True).format(registro))
+    assert evento["nivel"] == "INFO" and evento["logger"] == "metro.teste"
+    assert evento["evento"] == "arquivo_lido"
+    assert (evento["ano"], evento["linhas"]) == (2024, 3)
+
+    #SEM CAMPOS: SEM ESPAÇO SOBRANDO NO FIM
+    assert StructuredFormatter().format(record()) == "INFO    metro.teste arquivo_lido"
+
+
+def test_log_event_evaluates_fields_only_when_enabled():
+    chamadas = []
+
+    def colunas():
+        chamadas.append(1)
+        return ["DIA", "TUC"]
+
+    logger = logging.getLogger("metro.teste_log_event")
+    saida = io.StringIO()
+    handler = logging.StreamHandler(saida)
+    handler.setFormatter(StructuredFormatter())
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    try:
+        logger.setLevel(logging.INFO)
+        log_event(logger, logging.DEBUG, "colunas", colunas=colunas)
+        assert chamadas == [] and saida.getvalue() == ""
+
+        logger.setLevel(logging.DEBUG)
+        log_event(logger, logging.DEBUG, "colunas", colunas=colunas)
+        assert chamadas == [1]
+        assert "colunas=['DIA', 'TUC']" in saida.getvalue()
+    finally:
+        logger.removeHandler(handler)
+#==============================================================================
+
+
+#==============================================================================
+# SPANS E EXPORTAÇÃO
+
+def test_span_is_shared_noop_when_profiling_off(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_PROFILER", None)
+
+    with span("etapa.x") as s:
+        s.rows(10)
+
+    assert span("etapa.y") is span("etapa.x")
+    assert s.detach() is None
+
+
+def test_span_nesting_records_rows(monkeypatch):
+    profiler = Profiler(memory=False)
+    monkeypatch.setattr(instrumentation, "_PROFILER", profiler)
+
+    with span("etapa") as externo:
+        with span("parse") as interno:
+            interno.rows(42)
+        externo.rows(7)
+
+    [raiz] = profiler.roots
+    assert raiz.name == "etapa" and raiz.linhas == 7
+    assert [filho.name for filho in raiz.filhos] == ["parse"] and raiz.filhos[0].linhas == 42
+    assert raiz.segundos >= raiz.filhos[0].segundos >= 0
+
+
+def test_folded_stacks_self_time():
+    profiler = tree(node("main", 1.0, node("parse", 0.4, node("read", 0.1)), node("plot", 0.25)))
+
+    assert sorted(folded_stacks(profiler)) == sorted([
+        "main 350000",
+        "main;parse 300000",
+        "main;parse;read 100000",
+        "main;plot 250000"
+    ])
+
+
+def test_folded_stacks_merges_repeated_stacks_and_summary():
+    profiler = tree(node("main", 1.0, node("parse", 0.3, linhas=10), node("parse", 0.2, linhas=20)))
+
+    assert sorted(folded_stacks(profiler)) == ["main 500000", "main;parse 500000"]
+
+    resumo = {nome: valores for nome, *valores in profile_summary(profiler)}
+    chamadas, total, proprio, linhas, _ = resumo["parse"]
+
+    assert (chamadas, linhas) == (2, 20)
+    assert round(total, 9) == round(proprio, 9) == 0.5
+#==============================================================================
@@ -0,0 +1,54 @@
+import subprocess
+import sys
+
+from src.ingestion import ingest_years
+
+from conftest import PROJECT_ROOT, run_main, write_raw_file, write_year
+
+#INGEST EM OUTRO PROCESSO, COM A BASE NA PASTA DO TESTE (CAMINHOS TROCADOS ANTES DOS IMPORTS)
+INGEST_SCRIPT = """
+import sys
+from pathlib import Path
+
+import src.paths as paths
+paths.RAW_DIR = Path(sys.argv[1]) / "raw"
+paths.PROCESSED_DIR = Path(sys.argv[1]) / "processed"
+
+import main
+main.main(["ingest"])
+
+pesados = [nome for nome in ["pandas", "numpy", "scipy", "matplotlib"] if nome in sys.modules]
+print("Bibliotecas carregadas:", pesados)
+"""
+
+
+def test_cached_ingest_skips_data_stack(data_dir):
+    anos = ["2023", "2024", "2025"]
+    for ano in anos:
+        write_raw_file(data_dir / "raw" / f"passageiros_dia_{ano}.csv", int(ano))
+
+    ingest_years(anos)
+
+    saida = subprocess.run(
+        [sys.executable, "-c", INGEST_SCRIPT, str(data_dir)],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+
+    assert "nenhum reprocessamento necessário" in saida
+    assert "Bibliotecas carregadas: []" in saida
+    assert "Tempo do ingest:" in saida
+
+
+def test_cached_ingest_within_startup_budget(tmp_path):
+    for ano in [2023, 2024, 2025]:
+        write_year(tmp_path / "raw" / f"passageiros_dia_{ano}.csv", ano)
+
+    assert run_main(tmp_path, "ingest").returncode == 0
+
+    #COM A BASE EM CACHE, ACIMA DO ORÇAMENTO O COMANDO SAI COM CÓDIGO 1
+    saida = run_main(tmp_path, "ingest")
+    assert saida.returncode == 0, saida.stdout + saida.stderr
+    assert "dentro do orçamento" in saida.stdout
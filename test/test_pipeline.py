@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+from pathlib import Path
+
+import src.pipeline as pipeline
+
+from src.pipeline import Pipeline, Stage, load_artifact
+
+
+@pytest.fixture(autouse=True)
+def pipeline_dir(tmp_path, monkeypatch):
+    #ARTEFATOS E MANIFESTO EM PASTA TEMPORÁRIA (PROCESSOS DO POOL HERDAM VIA fork)
+    monkeypatch.setattr(pipeline, "PIPELINE_DIR", tmp_path / "pipeline")
+    monkeypatch.setattr(pipeline, "PIPELINE_MANIFEST", tmp_path / "pipeline" / "manifest.json")
+    return tmp_path
+
+
+#ETAPAS DE BRINQUEDO: O "CÓDIGO" DE CADA UMA É UM ARQUIVO DE TEXTO
+def make_x(fonte):
+    return {"x": Path(fonte).read_text().strip()}
+
+
+def make_y(x, fonte):
+    codigo = Path(fonte).read_text()
+
+    if "falha" in codigo:
+        #FALHA DEPOIS QUE AS ETAPAS IRMÃS JÁ TERMINARAM
+        time.sleep(0.3)
+        raise RuntimeError("etapa y falhou")
+
+    return {"y": f"{x}|{codigo}"}
+
+
+def make_z():
+    return {"z": "z"}
+
+
+def build(tmp_path, fonte_x, fonte_y) -> Pipeline:
+    return Pipeline([
+        Stage("x", make_x, outputs=["x"], code=[fonte_x], params={"fonte": str(fonte_x)}),
+        Stage("y", make_y, inputs=["x"], outputs=["y"], code=[fonte_y], params={"fonte": str(fonte_y)}),
+        Stage("z", make_z, outputs=["z"])
+    ])
+
+
+def write(path, texto) -> Path:
+    path.write_text(texto)
+    return path
+
+
+def test_code_change_invalidates_stage_and_dependents(tmp_path):
+    fonte_x = write(tmp_path / "x.py", "v1")
+    fonte_y = write(tmp_path / "y.py", "v1")
+
+    status = build(tmp_path, fonte_x, fonte_y).run(max_workers=1, verbose=False)
+    assert set(status.values()) == {"executada"}
+
+    status = build(tmp_path, fonte_x, fonte_y).run(max_workers=1, verbose=False)
+    assert set(status.values()) == {"em cache"}
+
+    #MUDANÇA NO CÓDIGO DE x REFAZ x E y (ENTRADA NOVA); z CONTINUA EM CACHE
+    write(fonte_x, "v2")
+    status = build(tmp_path, fonte_x, fonte_y).run(max_workers=1, verbose=False)
+
+    assert status == {"x": "executada", "y": "executada", "z": "em cache"}
+    assert load_artifact("y") == "v2|v1"
+
+
+def test_identical_output_keeps_dependents_cached(tmp_path):
+    fonte_x = write(tmp_path / "x.py", "v1")
+    fonte_y = write(tmp_path / "y.py", "v1")
+
+    build(tmp_path, fonte_x, fonte_y).run(max_workers=1, verbose=False)
+
+    #x MUDA (É REFEITA) MAS PRODUZ O MESMO ARTEFATO: y NÃO É REFEITA
+    write(fonte_x, "v1\n\n")
+    status = build(tmp_path, fonte_x, fonte_y).run(max_workers=1, verbose=False)
+
+    assert status == {"x": "executada", "y": "em cache", "z": "em cache"}
+
+
+def test_forced_stage_reruns(tmp_path):
+    fonte_x = write(tmp_path / "x.py", "v1")
+    fonte_y = write(tmp_path / "y.py", "v1")
+
+    build(tmp_path, fonte_x, fonte_y).run(max_workers=1, verbose=False)
+    status = build(tmp_path, fonte_x, fonte_y).run(force=["z"], max_workers=1, verbose=False)
+
+    assert status == {"x": "em cache", "y": "em cache", "z": "executada"}
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_failed_stage_is_not_cached(tmp_path, max_workers):
+    fonte_x = write(tmp_path / "x.py", "v1")
+    fonte_y = write(tmp_path / "y.py", "v1")
+
+    build(tmp_path, fonte_x, fonte_y).run(max_workers=max_workers, verbose=False)
+    assert load_artifact("y") == "v1|v1"
+
+    #y MUDA E FALHA; AS OUTRAS ETAPAS (EM CACHE) GRAVAM O MANIFESTO ENQUANTO ISSO
+    write(fonte_y, "v2 falha")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="etapa y falhou"):
+            build(tmp_path, fonte_x, fonte_y).run(max_workers=max_workers, verbose=False)
+
+    #O ARTEFATO ANTIGO NÃO É SERVIDO COMO SE FOSSE DO CÓDIGO NOVO
+    write(fonte_y, "v2")
+    status = build(tmp_path, fonte_x, fonte_y).run(max_workers=max_workers, verbose=False)
+
+    assert status["y"] == "executada"
+    assert load_artifact("y") == "v1|v2"
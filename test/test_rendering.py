@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.rendering as rendering
+
+from src.rendering import FIGURE_FILES, render_figures
+
+
+#visualization.py DE BRINQUEDO: FUNÇÕES DOS GRÁFICOS E ESTILO COMPARTILHADO
+STYLE = """
+def apply_style():
+    return "v1"
+
+def show_figure():
+    pass
+
+def group_summaries():
+    pass
+
+def plot_group_means(medias):
+    return "v1"
+
+def plot_interannual_comparison(tabela):
+    return "v1"
+"""
+
+
+@pytest.fixture
+def renders(tmp_path, monkeypatch):
+    """
+    Pasta de figuras temporária e renderização substituída por um PNG
+    vazio; a lista devolvida registra as funções renderizadas.
+    """
+    chamadas = []
+
+    def render_job(job):
+        function, _ = job
+        (tmp_path / FIGURE_FILES[function]).write_bytes(b"png")
+        chamadas.append(function)
+        return function
+
+    estilo = tmp_path / "visualization.py"
+    estilo.write_text(STYLE)
+
+    monkeypatch.setattr(rendering, "FIGURES_DIR", tmp_path)
+    monkeypatch.setattr(rendering, "RENDER_MANIFEST", tmp_path / ".render_manifest.json")
+    monkeypatch.setattr(rendering, "STYLE_SOURCE", estilo)
+    monkeypatch.setattr(rendering, "_render_job", render_job)
+
+    return chamadas
+
+
+def jobs(media=1.0):
+    return [
+        ("plot_group_means", (np.array([media, 2.0, 3.0]),)),
+        ("plot_interannual_comparison", (pd.DataFrame({0: [1.0, 2.0], 1: [3.0, 4.0]}, index=[2023, 2024]),))
+    ]
+
+
+def test_render_manifest_hit_and_miss(renders, tmp_path):
+    assert set(render_figures(jobs(), max_workers=1).values()) == {"renderizado"}
+
+    #MESMOS DADOS E ESTILO: NADA É RENDERIZADO
+    renders.clear()
+    assert set(render_figures(jobs(), max_workers=1).values()) == {"sem alteração"}
+    assert renders == []
+
+    #DADOS NOVOS EM UM GRÁFICO: SÓ ELE
+    status = render_figures(jobs(media=1.5), max_workers=1)
+    assert status == {"plot_group_means": "renderizado", "plot_interannual_comparison": "sem alteração"}
+
+    #PNG APAGADO: RENDERIZA DE NOVO
+    (tmp_path / FIGURE_FILES["plot_interannual_comparison"]).unlink()
+    assert render_figures(jobs(media=1.5), max_workers=1)["plot_interannual_comparison"] == "renderizado"
+
+
+def test_code_change_and_force(renders, tmp_path):
+    estilo = tmp_path / "visualization.py"
+    render_figures(jobs(), max_workers=1)
+
+    #CÓDIGO DE UM GRÁFICO: SÓ ELE
+    estilo.write_text(STYLE.replace('return "v1"\n\ndef plot_interannual', 'return "v2"\n\ndef plot_interannual'))
+    status = render_figures(jobs(), max_workers=1)
+    assert status == {"plot_group_means": "renderizado", "plot_interannual_comparison": "sem alteração"}
+
+    #ESTILO COMPARTILHADO: TODOS
+    estilo.write_text(estilo.read_text().replace('def apply_style():\n    return "v1"', 'def apply_style():\n    return "v2"'))
+    assert set(render_figures(jobs(), max_workers=1).values()) == {"renderizado"}
+
+    assert set(render_figures(jobs(), force=True, max_workers=1).values()) == {"renderizado"}
+    assert len(renders) == 7
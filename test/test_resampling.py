@@ -0,0 +1,99 @@
+import itertools
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.group_index import GroupIndex
+from src.resampling import (
+    _permutation_chunk,
+    block_bootstrap,
+    daily_moments,
+    permutation_replica_bytes,
+    permutation_test
+)
+
+
+@pytest.fixture
+def daily():
+    """
+    Dois grupos de estações ao longo de 60 dias, com ~10% dos registros
+    faltando, reduzidos aos momentos diários.
+    """
+    rng = np.random.default_rng(17)
+    datas = pd.date_range("2024-01-01", periods=60)
+
+    df = pd.DataFrame({
+        "data": np.repeat(datas, 5),
+        "grupo": np.tile(["a", "a", "b", "b", "b"], len(datas)),
+        "fluxo": rng.integers(5_000, 60_000, 5 * len(datas))
+    })
+    df = df[rng.random(len(df)) > 0.1].reset_index(drop=True)
+
+    index = GroupIndex(df, {"grupo": df["grupo"].to_numpy()})
+    return df, daily_moments(df, index, ["a", "b"])
+
+
+def test_block_bootstrap_estimates(daily):
+    df, momentos = daily
+    tabela = block_bootstrap(momentos, "a", "b", n_replicas=200, max_workers=1).set_index("estatistica")
+
+    a = df.loc[df["grupo"] == "a", "fluxo"]
+    b = df.loc[df["grupo"] == "b", "fluxo"]
+
+    np.testing.assert_allclose(tabela.loc["diferenca_medias", "estimativa"], a.mean() - b.mean())
+    np.testing.assert_allclose(tabela.loc["participacao_a", "estimativa"], a.sum() / df["fluxo"].sum())
+    assert (tabela["ic_inferior"] <= tabela["estimativa"]).all() and (tabela["estimativa"] <= tabela["ic_superior"]).all()
+
+
+@pytest.mark.parametrize("max_workers", [2, 3])
+def test_block_bootstrap_independent_of_workers(daily, max_workers):
+    _, momentos = daily
+
+    #ORÇAMENTO PEQUENO: VÁRIOS LOTES, CADA UM COM SUA SEMENTE
+    opcoes = dict(n_replicas=500, seed=3, memory_budget=20_000)
+
+    pd.testing.assert_frame_equal(
+        block_bootstrap(momentos, "a", "b", max_workers=max_workers, **opcoes),
+        block_bootstrap(momentos, "a", "b", max_workers=1, **opcoes)
+    )
+
+
+def test_permutation_test_matches_exact_enumeration():
+    x = np.array([12.0, 15.0, 9.0, 20.0])
+    y = np.array([8.0, 7.0, 11.0, 6.0])
+
+    #TODAS AS C(8, 4) = 70 DIVISÕES DOS VALORES EM DOIS GRUPOS
+    pooled = np.concatenate([x, y])
+    diferencas = np.array([
+        pooled[list(idx)].mean() - np.delete(pooled, list(idx)).mean()
+        for idx in itertools.combinations(range(8), 4)
+    ])
+    exato = np.mean(np.abs(diferencas) >= abs(x.mean() - y.mean()) - 1e-12)
+
+    observado, p = permutation_test(x, y, n_replicas=20_000, seed=1, max_workers=1)
+
+    assert observado == x.mean() - y.mean()
+    assert abs(p - exato) < 0.01
+
+    #MESMO RESULTADO COM OUTRO NÚMERO DE PROCESSOS E LOTES PEQUENOS
+    assert permutation_test(x, y, n_replicas=2000, seed=1, max_workers=1, memory_budget=4096) == \
+        permutation_test(x, y, n_replicas=2000, seed=1, max_workers=2, memory_budget=4096)
+
+
+def test_permutation_replica_bytes_bounds_chunk_memory():
+    rng = np.random.default_rng(4)
+    pooled = rng.normal(size=5000)
+    n1 = 4000
+
+    #PICO DE MEMÓRIA DE UM LOTE (tracemalloc ACOMPANHA AS ALOCAÇÕES DO NUMPY)
+    tracemalloc.start()
+    _permutation_chunk((np.random.SeedSequence(0), 50, pooled, n1))
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    estimativa = 50 * permutation_replica_bytes(len(pooled), n1)
+
+    #A ESTIMATIVA COBRE O PICO E INCLUI A CÓPIA pooled[perm[:, :n1]]
+    assert 0.5 * estimativa <= pico <= estimativa
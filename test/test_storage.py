@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.storage import load_processed, save_processed
+
+
+@pytest.fixture
+def base(data_dir):
+    """
+    Tabela longa de 2023 e 2024 (duas linhas) gravada no parquet de
+    uma pasta temporária.
+    """
+    datas = pd.date_range("2023-12-25", "2024-01-05")
+    df = pd.DataFrame({
+        "data": np.repeat(datas, 3),
+        "linha": ["1-AZUL", "1-AZUL", "2-VERDE"] * len(datas),
+        "sigla": ["JAB", "PSE", "CNS"] * len(datas),
+        "estacao": ["Jabaquara", "Sé", "Consolação"] * len(datas),
+        "fluxo": np.arange(3 * len(datas)) * 1000
+    })
+
+    save_processed(df, "teste")
+    return df
+
+
+def test_load_processed_round_trip(base):
+    df = load_processed("teste")
+
+    assert list(df.columns) == ["data", "linha", "sigla", "estacao", "fluxo", "ano"]
+    assert df["fluxo"].dtype == np.int32 and df["ano"].dtype == np.int16
+
+    np.testing.assert_array_equal(df["fluxo"], base["fluxo"])
+    assert df["estacao"].astype(str).tolist() == base["estacao"].tolist()
+
+
+def test_load_processed_filters(base):
+    df = load_processed("teste", columns=["data", "fluxo"], anos=["2024"], linhas=["1-AZUL"])
+
+    esperado = base[(base["data"].dt.year == 2024) & (base["linha"] == "1-AZUL")]
+
+    assert list(df.columns) == ["data", "fluxo"]
+    np.testing.assert_array_equal(df["fluxo"], esperado["fluxo"])
+    np.testing.assert_array_equal(df["data"], esperado["data"])
+
+    #FILTRO SEM CORRESPONDÊNCIA: TABELA VAZIA, MESMAS COLUNAS
+    vazio = load_processed("teste", columns=["fluxo"], anos=[2022])
+    assert vazio.empty and list(vazio.columns) == ["fluxo"]
@@ -0,0 +1,125 @@
+import pandas as pd
+import pytest
+
+from src import validation
+from src.data_processing import STATION_MAPPING, parse_raw_file
+from src.fact_table import FactTable
+from src.validation import (
+    ROUNDING_STEP,
+    DataQualityError,
+    check_thresholds,
+    quality_report,
+    reconcile_totals,
+    validate
+)
+
+from conftest import write_raw_file
+
+
+@pytest.fixture
+def base(tmp_path):
+    """
+    Ano pequeno (2 meses x 4 dias, 4 linhas) com a coluna TOTAL do
+    arquivo e a soma exata das estações por linha e dia.
+    """
+    arquivo = tmp_path / "passageiros_dia_2024.csv"
+    write_raw_file(arquivo, 2024)
+
+    df, publicados = parse_raw_file(arquivo, "2024", totals=True)
+    somas = df.groupby(["data", "linha"], observed=True)["fluxo"].sum().rename("total").reset_index()
+
+    return df, publicados, somas
+
+
+def shifted(totais, data, linha, delta):
+    totais = totais.copy()
+    alvo = (totais["data"] == pd.Timestamp(data)) & (totais["linha"] == linha)
+    totais.loc[alvo, "total"] += delta
+    return totais
+
+
+#==============================================================================
+# CONCILIAÇÃO COM A COLUNA TOTAL
+
+def test_parse_keeps_published_total_column(base):
+    df, publicados, _ = base
+
+    #UM TOTAL POR LINHA E DIA ('999,9' NO ARQUIVO DE TESTE)
+    assert len(publicados) == 2 * 4 * 4
+    assert set(publicados["total"]) == {999_900}
+    assert set(publicados["linha"].astype(str)) == set(df["linha"].astype(str))
+
+
+def test_reconcile_totals_rounding_tolerance(base):
+    df, _, somas = base
+    fact = FactTable.from_frame(df)
+
+    exato = reconcile_totals(fact, somas)
+    assert (exato["linha_dias"], exato["divergentes"], exato["maior_diferenca"]) == (32, 0, 0)
+
+    #ATÉ MEIA UNIDADE DE 0,1 MIL POR ESTAÇÃO DA LINHA (+ A DO TOTAL) NÃO DIVERGE
+    tolerancia = (len(STATION_MAPPING["2-VERDE"]) + 1) * ROUNDING_STEP // 2
+
+    dentro = reconcile_totals(fact, shifted(somas, "2024-01-02", "2-VERDE", tolerancia))
+    assert dentro["divergentes"] == 0 and dentro["maior_diferenca"] == tolerancia
+
+    fora = reconcile_totals(fact, shifted(somas, "2024-01-02", "2-VERDE", -(tolerancia + 1)))
+    assert fora["divergentes"] == 1 and fora["por_linha"]["2-VERDE"] == 1
+    [exemplo] = fora["exemplos"]
+    assert (exemplo["data"], exemplo["linha"], exemplo["diferenca"]) == ("2024-01-02", "2-VERDE", tolerancia + 1)
+    assert exemplo["soma_estacoes"] - exemplo["total_publicado"] == tolerancia + 1
+
+
+def test_reconcile_totals_line_day_without_total(base):
+    df, _, somas = base
+
+    resultado = reconcile_totals(FactTable.from_frame(df), somas.iloc[1:])
+
+    assert resultado["linha_dias"] == 31 and resultado["sem_total_publicado"] == 1
+#==============================================================================
+
+
+#==============================================================================
+# RELATÓRIO E LIMITES
+
+def test_quality_report_duplicates_and_missing_days(base):
+    df, _, somas = base
+
+    #UMA ESTAÇÃO SEM UM DIA E OUTRA COM O MESMO DIA REPETIDO
+    azul = list(STATION_MAPPING["1-AZUL"])
+    falta = (df["sigla"] == azul[0]) & (df["data"] == pd.Timestamp("2024-01-03"))
+    repetido = df[(df["sigla"] == azul[1]) & (df["data"] == pd.Timestamp("2024-02-01"))]
+
+    report = quality_report(FactTable.from_frame(pd.concat([df[~falta], repetido], ignore_index=True)), somas)
+
+    assert report["chaves_duplicadas"]["quantidade"] == 1
+    assert report["chaves_duplicadas"]["exemplos"][0]["sigla"] == azul[1]
+
+    #CALENDÁRIO COMPLETO DE 01/01 A 04/02: OS DIAS 05-31/01 FALTAM EM TODAS AS ESTAÇÕES
+    estacoes = sum(len(STATION_MAPPING[linha]) for linha in ["1-AZUL", "2-VERDE", "3-VERMELHA", "15-PRATA"])
+    assert report["dias_faltantes"]["total"] == 27 * estacoes + 1
+    assert report["dias_faltantes"]["por_estacao"][0]["sigla"] == azul[0]
+    assert report["pares_nao_mapeados"] == []
+
+
+def test_check_thresholds_and_data_quality_error(base, monkeypatch):
+    df, publicados, somas = base
+    fact = FactTable.from_frame(df)
+
+    #NÃO GRAVA O RELATÓRIO EM data/processed
+    monkeypatch.setattr(validation, "save_quality_report", lambda report: None)
+
+    report = quality_report(fact, somas)
+    assert check_thresholds(report, {"dias_faltantes_pct": 100.0}) == []
+    assert [v.split(" ")[0] for v in check_thresholds(report)] == ["dias_faltantes_pct"]
+
+    #TOTAL DO ARQUIVO DE TESTE NÃO BATE COM A SOMA DAS ESTAÇÕES
+    with pytest.raises(DataQualityError) as erro:
+        validate(fact, publicados, {"dias_faltantes_pct": 100.0})
+
+    assert [v.split(" ")[0] for v in erro.value.violacoes] == ["divergencias_total_pct"]
+    assert erro.value.report["aprovada"] is False
+
+    aprovada = validate(fact, somas, {"dias_faltantes_pct": 100.0})
+    assert aprovada["aprovada"] and aprovada["violacoes"] == []
+#==============================================================================